@@ -0,0 +1,653 @@
+"""
+운동인증방 봇 오프라인 벤치마크
+Google Sheets REST API와 Discord Interaction을 흉내 낸 가짜 객체로
+실제 슬래시 커맨드 핸들러를 실행해 지연시간/API 호출 수를 측정한다.
+
+사용 예:
+    python benchmark.py --members 50 --records 2000 --iterations 30 --latency-ms 150
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+import gspread
+import pytz
+from gspread.utils import a1_to_rowcol, rowcol_to_a1
+from requests import Response
+
+import quota
+from config import WEEKLY_REQUIRED_COUNT
+from metrics import metrics
+import sheets
+from quota import QuotaAwareHTTPClient, TokenBucket
+from sheets import (
+    RECORD_SHEET,
+    RECORD_HEADERS,
+    MEMBER_SHEET,
+    MEMBER_HEADERS,
+    AsyncSheetsManager,
+    SheetsManager
+)
+from storage import get_week_info
+
+import bot
+
+SPREADSHEET_ID = "benchmark-spreadsheet"
+
+# Discord 메시지 제한
+DISCORD_CONTENT_LIMIT = 2000
+DISCORD_FIELD_LIMIT = 1024
+
+
+# --- 가짜 Google Sheets 서버 ---
+
+def _make_response(status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Response:
+    response = Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode("utf-8")
+    response.headers["Content-Type"] = "application/json"
+    for key, value in (headers or {}).items():
+        response.headers[key] = value
+    return response
+
+
+def _split_range(range_name: str) -> Tuple[str, str]:
+    """'시트'!A1:B2 형식을 (시트명, A1 범위)로 분리"""
+    if range_name.startswith("'"):
+        end = 1
+        while True:
+            end = range_name.index("'", end)
+            if range_name[end + 1:end + 2] == "'":
+                end += 2
+                continue
+            break
+        title = range_name[1:end].replace("''", "'")
+        rest = range_name[end + 1:]
+    else:
+        title, _, rest = range_name.partition("!")
+        rest = "!" + rest if rest else ""
+    return title, rest.lstrip("!")
+
+
+def _parse_cell(cell: str) -> Tuple[Optional[int], Optional[int]]:
+    """A1 셀 표기를 (행, 열)로 변환 (생략된 부분은 None)"""
+    match = re.fullmatch(r"([A-Z]*)(\d*)", cell)
+    column = a1_to_rowcol(match.group(1) + "1")[1] if match.group(1) else None
+    row = int(match.group(2)) if match.group(2) else None
+    return row, column
+
+
+class FakeSheet:
+    """워크시트 하나 (값은 표시 형식 문자열로 보관)"""
+    
+    def __init__(self, sheet_id: int, title: str, index: int, rows: int = 1000, cols: int = 26):
+        self.sheet_id = sheet_id
+        self.title = title
+        self.index = index
+        self.row_count = rows
+        self.col_count = cols
+        self.data: List[List[str]] = []
+    
+    def properties(self) -> Dict[str, Any]:
+        return {
+            "sheetId": self.sheet_id,
+            "title": self.title,
+            "index": self.index,
+            "sheetType": "GRID",
+            "gridProperties": {"rowCount": self.row_count, "columnCount": self.col_count}
+        }
+    
+    def _bounds(self, a1: str) -> Tuple[int, int, int, int]:
+        if not a1:
+            return 1, 1, len(self.data), self.col_count
+        start, _, end = a1.partition(":")
+        row1, col1 = _parse_cell(start)
+        row2, col2 = _parse_cell(end) if end else (row1, col1)
+        return (
+            row1 or 1,
+            col1 or 1,
+            row2 or max(len(self.data), row1 or 1),
+            col2 or self.col_count
+        )
+    
+    def read(self, a1: str) -> List[List[str]]:
+        row1, col1, row2, col2 = self._bounds(a1)
+        values = []
+        for row in self.data[row1 - 1:row2]:
+            cells = row[col1 - 1:col2]
+            while cells and cells[-1] == "":
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+    
+    def write(self, a1: str, values: List[List[Any]]) -> None:
+        row1, col1, _, _ = self._bounds(a1.partition(":")[0])
+        for r, row in enumerate(values):
+            target = row1 - 1 + r
+            while len(self.data) <= target:
+                self.data.append([])
+            cells = self.data[target]
+            for c, value in enumerate(row):
+                col = col1 - 1 + c
+                if len(cells) <= col:
+                    cells.extend([""] * (col + 1 - len(cells)))
+                cells[col] = "" if value is None else str(value)
+        self.row_count = max(self.row_count, len(self.data))
+    
+    def append(self, values: List[List[Any]]) -> int:
+        """마지막 데이터 행 다음에 추가 (시작 행 번호 반환)"""
+        last = len(self.data)
+        while last and not any(self.data[last - 1]):
+            last -= 1
+        del self.data[last:]
+        start = last + 1
+        self.write(rowcol_to_a1(start, 1), values)
+        return start
+    
+    def delete_rows(self, start_index: int, end_index: int) -> None:
+        del self.data[start_index:end_index]
+        self.row_count -= end_index - start_index
+
+
+class FakeSheetsServer:
+    """Sheets/Drive REST API를 흉내 내는 메모리 서버
+    
+    gspread가 보내는 요청을 requests.Session 계층에서 받아 처리한다.
+    latency_ms만큼 호출 스레드를 재우고, quota_per_minute을 넘으면 429를 돌려준다.
+    """
+    
+    def __init__(self, latency_ms: float = 0, quota_per_minute: int = 0, seed: int = 0):
+        self.latency = latency_ms / 1000
+        self.quota = quota_per_minute
+        self.sheets: Dict[int, FakeSheet] = {}
+        self.calls: Counter = Counter()
+        self.throttled = 0
+        self.modified_time = datetime.utcnow()
+        self._windows = {"read": deque(), "write": deque()}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    # --- 데이터 준비 ---
+    
+    def add_sheet(self, title: str, rows: int = 1000, cols: int = 26) -> FakeSheet:
+        sheet_id = len(self.sheets) + 1
+        sheet = FakeSheet(sheet_id, title, len(self.sheets), rows, cols)
+        self.sheets[sheet_id] = sheet
+        return sheet
+    
+    def find(self, title: str) -> FakeSheet:
+        for sheet in self.sheets.values():
+            if sheet.title == title:
+                return sheet
+        raise KeyError(title)
+    
+    def edit_externally(self, title: str, a1: str, values: List[List[Any]]) -> None:
+        """관리자가 스프레드시트를 직접 고친 것처럼 쓰기 (API 호출 수에는 넣지 않음)"""
+        with self._lock:
+            self.find(title).write(a1, values)
+            self.modified_time = datetime.utcnow()
+    
+    def total_calls(self) -> Dict[str, int]:
+        with self._lock:
+            return {"read": self.calls["read"], "write": self.calls["write"]}
+    
+    # --- 요청 처리 ---
+    
+    def _admit(self, kind: str) -> bool:
+        """분당 할당량 확인 (최근 60초 요청 수 기준)"""
+        now = time.monotonic()
+        window = self._windows[kind]
+        while window and now - window[0] >= 60:
+            window.popleft()
+        if self.quota and len(window) >= self.quota:
+            return False
+        window.append(now)
+        return True
+    
+    def handle(self, method: str, url: str, params: Any = None, json_body: Any = None) -> Response:
+        if self.latency:
+            time.sleep(self.latency * self._random.uniform(0.8, 1.2))
+        
+        kind = "read" if method.upper() == "GET" else "write"
+        with self._lock:
+            if not self._admit(kind):
+                self.throttled += 1
+                return _make_response(429, {"error": {
+                    "code": 429,
+                    "message": "Quota exceeded for quota metric 'Requests' (benchmark)",
+                    "status": "RESOURCE_EXHAUSTED"
+                }})
+            self.calls[kind] += 1
+            try:
+                body = self._route(method.upper(), url, dict(params or {}), json_body or {})
+            except KeyError as e:
+                return _make_response(400, {"error": {
+                    "code": 400,
+                    "message": f"Unable to parse range: {e}",
+                    "status": "INVALID_ARGUMENT"
+                }})
+            if kind == "write":
+                self.modified_time = datetime.utcnow()
+        return _make_response(200, body)
+    
+    def _route(self, method: str, url: str, params: Dict[str, Any], body: Dict[str, Any]) -> Dict[str, Any]:
+        if "/drive/" in url:
+            return {
+                "id": SPREADSHEET_ID,
+                "name": "운동인증방 (benchmark)",
+                "createdTime": "2024-01-01T00:00:00.000Z",
+                "modifiedTime": self.modified_time.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+            }
+        
+        path = unquote(url.split(f"/spreadsheets/{SPREADSHEET_ID}", 1)[1])
+        if path == "":
+            return {
+                "spreadsheetId": SPREADSHEET_ID,
+                "properties": {"title": "운동인증방 (benchmark)", "timeZone": "Asia/Seoul"},
+                "sheets": [
+                    {"properties": s.properties()}
+                    for s in sorted(self.sheets.values(), key=lambda s: s.index)
+                ]
+            }
+        if path == ":batchUpdate":
+            return self._batch_update(body)
+        if path == "/values:batchGet":
+            ranges = params.get("ranges") or []
+            if isinstance(ranges, str):
+                ranges = [ranges]
+            return {"spreadsheetId": SPREADSHEET_ID, "valueRanges": [self._get(r) for r in ranges]}
+        if path == "/values:batchUpdate":
+            for item in body.get("data", []):
+                title, a1 = _split_range(item["range"])
+                self.find(title).write(a1, item.get("values", []))
+            return {"spreadsheetId": SPREADSHEET_ID, "totalUpdatedCells": 0}
+        if path.startswith("/values/") and path.endswith(":append"):
+            title, _ = _split_range(path[len("/values/"):-len(":append")])
+            sheet = self.find(title)
+            values = body.get("values", [])
+            start = sheet.append(values)
+            width = max((len(row) for row in values), default=1)
+            updated = f"'{title}'!A{start}:{rowcol_to_a1(start + len(values) - 1, width)}"
+            return {"spreadsheetId": SPREADSHEET_ID, "updates": {
+                "updatedRange": updated,
+                "updatedRows": len(values)
+            }}
+        if path.startswith("/values/"):
+            range_name = path[len("/values/"):]
+            if method == "GET":
+                return self._get(range_name)
+            title, a1 = _split_range(range_name)
+            self.find(title).write(a1, body.get("values", []))
+            return {"spreadsheetId": SPREADSHEET_ID, "updatedRange": range_name}
+        raise KeyError(path)
+    
+    def _get(self, range_name: str) -> Dict[str, Any]:
+        title, a1 = _split_range(range_name)
+        values = self.find(title).read(a1)
+        result = {"range": range_name, "majorDimension": "ROWS"}
+        if values:
+            result["values"] = values
+        return result
+    
+    def _batch_update(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        replies = []
+        for request in body.get("requests", []):
+            if "addSheet" in request:
+                props = request["addSheet"].get("properties", {})
+                grid = props.get("gridProperties", {})
+                sheet = self.add_sheet(props["title"], grid.get("rowCount", 1000), grid.get("columnCount", 26))
+                replies.append({"addSheet": {"properties": sheet.properties()}})
+            elif "deleteDimension" in request:
+                dim = request["deleteDimension"]["range"]
+                self.sheets[dim["sheetId"]].delete_rows(dim["startIndex"], dim["endIndex"])
+                replies.append({})
+            elif "deleteSheet" in request:
+                self.sheets.pop(request["deleteSheet"]["sheetId"])
+                replies.append({})
+            else:
+                replies.append({})
+        return {"spreadsheetId": SPREADSHEET_ID, "replies": replies}
+
+
+class FakeSession:
+    """gspread HTTPClient에 넣는 requests.Session 대용"""
+    
+    def __init__(self, server: FakeSheetsServer):
+        self.server = server
+        self.headers: Dict[str, str] = {}
+    
+    def request(self, method: str, url: str, params: Any = None, json: Any = None, **kwargs: Any) -> Response:
+        return self.server.handle(method, url, params, json)
+
+
+# --- 가짜 Discord 객체 ---
+
+class FakeUser:
+    def __init__(self, user_id: int, display_name: str):
+        self.id = user_id
+        self.display_name = display_name
+        self.mention = f"<@{user_id}>"
+        self.week_count = 0  # 시드에서 이번 주에 이미 인증한 횟수
+    
+    def next_count(self) -> int:
+        """벤치마크 /인증에 쓸 다음 회차 (3회차를 넘으면 3회차 중복 인증)"""
+        self.week_count = min(3, self.week_count + 1)
+        return self.week_count
+
+
+def _check_limits(content: Optional[str], embeds: List[Any], violations: Counter) -> None:
+    """Discord 메시지 크기 제한 위반 집계"""
+    if content and len(content) > DISCORD_CONTENT_LIMIT:
+        violations["content>2000"] += 1
+    for embed in embeds:
+        for field in embed.fields:
+            if len(field.value or "") > DISCORD_FIELD_LIMIT:
+                violations["field>1024"] += 1
+
+
+class FakeMessenger:
+    """send()를 받아 기록하는 채널/팔로업 공용 객체"""
+    
+    def __init__(self, latency_ms: float = 0, violations: Optional[Counter] = None):
+        self.latency = latency_ms / 1000
+        self.sent: List[Dict[str, Any]] = []
+        self.violations = violations if violations is not None else Counter()
+        self.id = 0
+    
+    async def send(self, content: Optional[str] = None, *, embed: Any = None, embeds: Any = None, **kwargs: Any) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        all_embeds = list(embeds or []) + ([embed] if embed is not None else [])
+        _check_limits(content, all_embeds, self.violations)
+        self.sent.append({"content": content, "embeds": all_embeds, **kwargs})
+
+
+class FakeInteractionResponse:
+    def __init__(self):
+        self.deferred = False
+    
+    async def defer(self, *args: Any, **kwargs: Any) -> None:
+        self.deferred = True
+    
+    async def send_message(self, content: Optional[str] = None, **kwargs: Any) -> None:
+        self.deferred = True
+        self.message = {"content": content, **kwargs}
+
+
+class FakeInteraction:
+    """슬래시 커맨드 핸들러가 사용하는 discord.Interaction 부분만 구현"""
+    
+    _next_id = 1
+    
+    def __init__(self, user: FakeUser, latency_ms: float = 0, violations: Optional[Counter] = None):
+        self.id = FakeInteraction._next_id
+        FakeInteraction._next_id += 1
+        self.user = user
+        self.guild_id = sheets.DEFAULT_GUILD_ID
+        self.response = FakeInteractionResponse()
+        self.followup = FakeMessenger(latency_ms, violations)
+
+
+# --- 측정 ---
+
+class LoopLagMonitor:
+    """이벤트 루프 지연 측정 (interval마다 깨어나 늦어진 시간을 기록)"""
+    
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+    
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class BenchSheetsManager(SheetsManager):
+    """가짜 서버에 연결하고 시계를 고정한 SheetsManager"""
+    
+    clock: datetime = None
+    
+    def now(self) -> datetime:
+        return self.clock
+
+
+def seed_spreadsheet(server: FakeSheetsServer, members: int, records: int, clock: datetime) -> List[FakeUser]:
+    """멤버/인증기록 시트 채우기
+    
+    현재 주는 멤버마다 0 ~ (WEEKLY_REQUIRED_COUNT - 1)회만 채워 벤치마크 /인증이
+    중복 거절이 아니라 실제 쓰기 경로를 지나게 하고, 나머지 기록은 멤버마다 주 3회씩
+    지난 주차에 채운다.
+    """
+    users = [FakeUser(10 ** 17 + i, f"멤버{i:03d}") for i in range(members)]
+    
+    member_sheet = server.add_sheet(MEMBER_SHEET)
+    member_sheet.write("A1", [MEMBER_HEADERS] + [
+        [str(u.id), u.display_name, "0", "2024-01-01"] for u in users
+    ])
+    
+    def row(when: datetime, user: FakeUser, count: int) -> List[Any]:
+        week_name, _, _ = get_week_info(when)
+        return [
+            when.strftime("%Y-%m-%d %H:%M:%S"), week_name, str(user.id), user.display_name,
+            str(count), "", "0", ""
+        ]
+    
+    current = [
+        (user, count)
+        for i, user in enumerate(users)
+        for count in range(1, i % WEEKLY_REQUIRED_COUNT + 1)
+    ][:records]
+    past = records - len(current)
+    
+    record_sheet = server.add_sheet(RECORD_SHEET, rows=max(1000, records + 1))
+    rows = []
+    per_week = max(1, members * 3)
+    weeks = (past + per_week - 1) // per_week
+    for i in range(past):
+        week_offset = weeks - i // per_week
+        when = clock - timedelta(weeks=week_offset, hours=1 + i % 5)
+        rows.append(row(when, users[i % members], (i // members) % 3 + 1))
+    for i, (user, count) in enumerate(current):
+        rows.append(row(clock - timedelta(hours=1 + i % 5), user, count))
+        user.week_count = count
+    record_sheet.write("A1", [RECORD_HEADERS] + rows)
+    return users
+
+
+async def measure(
+    name: str,
+    iterations: int,
+    concurrency: int,
+    server: FakeSheetsServer,
+    make_call
+) -> Dict[str, Any]:
+    """make_call(i)가 돌려준 코루틴을 concurrency개씩 동시에 실행하며 측정"""
+    before = server.total_calls()
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await make_call(i)
+            latencies.append(time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(iterations)))
+    # 버퍼에 남은 행도 이 커맨드의 비용으로 계산
+    await sheets.get_async_sheets_manager().flush()
+    elapsed = time.perf_counter() - started
+    
+    after = server.total_calls()
+    reads = after["read"] - before["read"]
+    writes = after["write"] - before["write"]
+    return {
+        "command": name,
+        "iterations": iterations,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0) * 1000,
+        "reads_per_cmd": reads / max(1, iterations),
+        "writes_per_cmd": writes / max(1, iterations),
+        "throughput_per_s": iterations / elapsed if elapsed else 0.0
+    }
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    random.seed(args.seed)
+    
+    # 시계는 현재 주 수요일 정오로 고정 (00~04시 인증 불가 규칙 회피)
+    _, week_start, _ = get_week_info(datetime.now(pytz.timezone(bot.TIMEZONE)))
+    clock = week_start + timedelta(days=3, hours=12)
+    BenchSheetsManager.clock = clock
+    
+    server = FakeSheetsServer(args.latency_ms, args.quota_per_minute, args.seed)
+    users = seed_spreadsheet(server, args.members, args.records, clock)
+    
+    # 클라이언트 쪽 토큰 버킷도 서버 할당량에 맞춤 (0이면 제한 없음)
+    limit = args.quota_per_minute or 10 ** 9
+    quota.read_bucket = TokenBucket(limit)
+    quota.write_bucket = TokenBucket(limit)
+    
+    def factory() -> SheetsManager:
+        client = gspread.Client(auth=None, session=FakeSession(server), http_client=QuotaAwareHTTPClient)
+        return BenchSheetsManager(SPREADSHEET_ID, client=client)
+    
+    facade = AsyncSheetsManager(max_workers=args.workers, factory=factory)
+    sheets._async_sheets_managers[sheets.DEFAULT_GUILD_ID] = facade
+    
+    violations: Counter = Counter()
+    monitor = LoopLagMonitor()
+    monitor.start()
+    results = []
+    
+    def interaction(i: int) -> FakeInteraction:
+        return FakeInteraction(users[i % len(users)], args.discord_latency_ms, violations)
+    
+    try:
+        started = time.perf_counter()
+        await facade.warm_up()
+        connect_ms = (time.perf_counter() - started) * 1000
+        
+        counts = [users[i % len(users)].next_count() for i in range(args.iterations)]
+        results.append(await measure(
+            "/인증", args.iterations, args.concurrency, server,
+            lambda i: bot.verify_exercise.callback(interaction(i), counts[i])
+        ))
+        results.append(await measure(
+            "/벌금조회", args.iterations, args.concurrency, server,
+            lambda i: bot.check_penalty.callback(interaction(i))
+        ))
+        results.append(await measure(
+            "/주간현황", args.iterations, args.concurrency, server,
+            lambda i: bot.weekly_status.callback(interaction(i))
+        ))
+        results.append(await measure(
+            "/멤버등록", args.iterations, args.concurrency, server,
+            lambda i: bot.register_member.callback(interaction(i))
+        ))
+        channel = FakeMessenger(args.discord_latency_ms, violations)
+        results.append(await measure(
+            "주간결산", args.settlements, 1, server,
+            lambda i: bot.run_weekly_settlement(channel)
+        ))
+    finally:
+        await monitor.stop()
+        facade.shutdown()
+    
+    return {
+        "config": vars(args),
+        "connect_ms": connect_ms,
+        "commands": results,
+        "loop_lag_ms": {
+            "p50": _percentile(monitor.samples, 50) * 1000,
+            "p99": _percentile(monitor.samples, 99) * 1000,
+            "max": max(monitor.samples, default=0) * 1000
+        },
+        "throttled_responses": server.throttled,
+        "cache_hit_rate": metrics.snapshot()["cache_hit_rate"],
+        "discord_limit_violations": dict(violations)
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print()
+    print(f"연결 및 미리 준비: {report['connect_ms']:.1f}ms")
+    print(f"{'커맨드':<10}{'횟수':>6}{'p50(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}{'읽기/회':>9}{'쓰기/회':>9}{'처리량/s':>10}")
+    for r in report["commands"]:
+        print(
+            f"{r['command']:<10}{r['iterations']:>6}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+            f"{r['max_ms']:>10.1f}{r['reads_per_cmd']:>9.2f}{r['writes_per_cmd']:>9.2f}"
+            f"{r['throughput_per_s']:>10.1f}"
+        )
+    lag = report["loop_lag_ms"]
+    print(f"이벤트 루프 지연: p50 {lag['p50']:.1f}ms / p99 {lag['p99']:.1f}ms / max {lag['max']:.1f}ms")
+    print(f"429 응답: {report['throttled_responses']}회")
+    if report["cache_hit_rate"]:
+        print("캐시 적중률: " + ", ".join(
+            f"{name} {rate * 100:.1f}%" for name, rate in sorted(report["cache_hit_rate"].items())
+        ))
+    if report["discord_limit_violations"]:
+        print(f"⚠️ Discord 메시지 제한 초과: {report['discord_limit_violations']}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="운동인증방 봇 오프라인 벤치마크")
+    parser.add_argument("--members", type=int, default=30, help="멤버 수")
+    parser.add_argument("--records", type=int, default=1000, help="인증기록 시트에 미리 채울 행 수")
+    parser.add_argument("--iterations", type=int, default=20, help="커맨드별 실행 횟수")
+    parser.add_argument("--settlements", type=int, default=1, help="주간결산 실행 횟수")
+    parser.add_argument("--concurrency", type=int, default=5, help="동시에 실행할 커맨드 수")
+    parser.add_argument("--workers", type=int, default=sheets.SHEETS_MAX_WORKERS, help="Sheets 스레드풀 크기")
+    parser.add_argument("--latency-ms", type=float, default=100, help="Sheets API 응답 지연")
+    parser.add_argument("--discord-latency-ms", type=float, default=0, help="Discord 메시지 전송 지연")
+    parser.add_argument("--quota-per-minute", type=int, default=0, help="분당 읽기/쓰기 한도 (0이면 제한 없음)")
+    parser.add_argument("--seed", type=int, default=0, help="난수 시드")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(run_benchmark(args))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,31 +2,169 @@
 운동인증방 Discord Bot
 슬래시 커맨드 기반 운동 인증 시스템
 """
+import asyncio
+import signal
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-from datetime import datetime, time
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Any, Optional
 import pytz
 
 from config import (
     DISCORD_BOT_TOKEN,
-    DISCORD_GUILD_ID,
-    DISCORD_CHANNEL_ID,
+    GUILDS,
+    AUTO_SHARD,
     TIMEZONE,
     WEEKLY_REQUIRED_COUNT,
-    PENALTY_PER_MISS
+    PENALTY_PER_MISS,
+    METRICS_LOG_INTERVAL,
+    SHEETS_CHANGE_POLL_INTERVAL
 )
-from sheets import get_sheets_manager
+from metrics import metrics, record_command_error, timed, timed_command
+from notifications import add_chunked_field, dispatcher, split_embed
+from photos import PhotoError, close_photo_store, get_photo_store, photo_url
+from quota import SheetsQuotaError
+from rules import rules
+from scheduler import SettlementScheduler
+from sheets import (
+    AsyncSheetsManager,
+    WeeklySnapshot,
+    get_async_sheets_manager,
+    get_all_async_sheets_managers,
+    shutdown_sheets_manager
+)
+from storage import get_week_info
 
 # 봇 설정
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+
+# 설정된 모든 방(서버)에 커맨드 등록
+GUILD_OBJECTS = [discord.Object(id=guild_id) for guild_id in GUILDS]
+
+# 서버가 많아지면 AUTO_SHARD=true로 자동 샤딩 봇 사용
+BotBase = commands.AutoShardedBot if AUTO_SHARD else commands.Bot
+
+
+class UndongbangBot(BotBase):
+    """시작 시 Sheets를 미리 준비하고 종료 시 버퍼를 비우는 봇"""
+    
+    async def setup_hook(self):
+        # Render 재배포는 SIGTERM으로 종료하므로 close()를 거치도록 연결
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, lambda: asyncio.create_task(self.close())
+            )
+        except NotImplementedError:
+            pass  # Windows 이벤트 루프는 시그널 핸들러 미지원
+        
+        # 게이트웨이 접속과 동시에 Sheets 연결/캐시 준비
+        self.warm_up_task = asyncio.gather(*(
+            warm_up_guild(guild_id, manager) for guild_id, manager in get_all_async_sheets_managers().items()
+        ))
+        
+        # 재접속마다 on_ready가 다시 호출되므로 동기화는 여기서 한 번만
+        await sync_commands()
+    
+    async def close(self):
+        scheduler.stop()
+        for guild_id, manager in get_all_async_sheets_managers().items():
+            try:
+                await manager.flush()
+            except Exception as e:
+                print(f"❌ 종료 전 Sheets 버퍼 전송 실패 ({guild_id}): {e}")
+        await close_photo_store()
+        await super().close()
+
+
+bot = UndongbangBot(command_prefix="!", intents=intents)
 tz = pytz.timezone(TIMEZONE)
 
+QUOTA_MESSAGE = "⏳ 지금 요청이 많아 처리하지 못했습니다. 잠시 후 다시 시도해주세요."
+
+
+# 등록된 커맨드와 비교하는 옵션 항목 (Discord 응답에만 있는 id/version 등은 제외)
+OPTION_FIELDS = (
+    "name", "type", "description", "required", "choices", "channel_types",
+    "min_value", "max_value", "min_length", "max_length", "autocomplete", "options"
+)
+
+
+def _option_signature(option: dict) -> tuple:
+    values = []
+    for field in OPTION_FIELDS:
+        value = option.get(field)
+        if field in ("required", "autocomplete"):
+            value = bool(value)
+        elif field == "choices":
+            value = tuple((c["name"], c["value"]) for c in value or ())
+        elif field == "channel_types":
+            value = tuple(sorted(value or ()))
+        elif field == "options":
+            value = tuple(_option_signature(o) for o in value or ())
+        elif field.startswith(("min_", "max_")) and value is not None:
+            value = float(value)
+        values.append(value)
+    return tuple(values)
+
+
+def command_signature(payload: dict, default_member_permissions: Any, nsfw: bool) -> tuple:
+    """슬래시 커맨드 정의 비교용 요약 (로컬 정의와 Discord에 등록된 커맨드에 같은 형태로 만듦)"""
+    return (
+        payload["name"],
+        payload.get("type", 1),
+        payload.get("description", ""),
+        str(default_member_permissions) if default_member_permissions is not None else None,
+        bool(nsfw),
+        tuple(_option_signature(o) for o in payload.get("options") or ())
+    )
+
+
+async def commands_up_to_date(guild: discord.abc.Snowflake) -> bool:
+    """Discord에 등록된 길드 커맨드가 지금 정의와 같은지 (조회 실패 시 False)"""
+    local = sorted(
+        command_signature(payload, payload.get("default_member_permissions"), payload.get("nsfw", False))
+        for payload in (command.to_dict(bot.tree) for command in bot.tree.get_commands(guild=guild))
+    )
+    try:
+        registered = await bot.tree.fetch_commands(guild=guild)
+    except discord.HTTPException as e:
+        print(f"⚠️ {guild.id}: 등록된 커맨드 조회 실패, 동기화 진행: {e}")
+        return False
+    remote = sorted(
+        command_signature(
+            command.to_dict(),
+            command.default_member_permissions.value if command.default_member_permissions is not None else None,
+            command.nsfw
+        )
+        for command in registered
+    )
+    return local == remote
+
+
+async def sync_commands():
+    """방별 슬래시 커맨드 동기화 (Discord에 등록된 커맨드와 정의가 같은 방은 생략)
+    
+    로컬 파일에 동기화 기록을 남기면 재배포 때 지워지므로 매번 등록된 커맨드를 조회해 비교한다.
+    조회(GET)는 동기화(PUT)보다 요청 제한이 느슨하다.
+    """
+    synced_any = False
+    for guild in GUILD_OBJECTS:
+        if await commands_up_to_date(guild):
+            continue
+        try:
+            synced = await bot.tree.sync(guild=guild)
+            print(f"🔄 {guild.id}: {len(synced)}개 슬래시 커맨드 동기화 완료")
+            synced_any = True
+        except Exception as e:
+            print(f"❌ {guild.id}: 커맨드 동기화 실패: {e}")
+    
+    if not synced_any:
+        print("⏭️ 슬래시 커맨드 변경 없음, 동기화 생략")
+
 
 @bot.event
 async def on_ready():
@@ -34,34 +172,106 @@ async def on_ready():
     print(f"✅ {bot.user} 로그인 완료!")
     print(f"📊 연결된 서버: {len(bot.guilds)}개")
     
-    # 슬래시 커맨드 동기화
+    # 주간 결산 스케줄러 시작 (밀린 주차가 있으면 먼저 결산)
+    scheduler.start()
+    
+    # 계측값 주기적 기록
+    if METRICS_LOG_INTERVAL > 0 and not log_metrics.is_running():
+        log_metrics.change_interval(minutes=METRICS_LOG_INTERVAL)
+        log_metrics.start()
+    
+    # 스프레드시트 외부 수정 확인
+    if SHEETS_CHANGE_POLL_INTERVAL > 0 and not revalidate_caches.is_running():
+        revalidate_caches.change_interval(seconds=SHEETS_CHANGE_POLL_INTERVAL)
+        revalidate_caches.start()
+
+
+def photo_match_note(match: dict) -> str:
+    """중복/유사 사진 표시 (비고 열에 남김)"""
+    entry = match["entry"]
+    kind = "중복사진" if match["kind"] == "exact" else "유사사진"
+    return f"⚠️{kind}({entry['week']}, {entry['user_id']})"
+
+
+async def warm_up_guild(guild_id: int, manager: AsyncSheetsManager) -> None:
+    """방 저장소와 사진 재사용 색인 미리 준비"""
+    await manager.warm_up()
+    await load_photo_index(guild_id)
+
+
+async def load_photo_index(guild_id: int) -> None:
+    """방의 사진 재사용 색인을 인증기록에서 준비 (실패하면 색인 없이 진행, 다음 인증 때 재시도)"""
     try:
-        guild = discord.Object(id=DISCORD_GUILD_ID)
-        synced = await bot.tree.sync(guild=guild)
-        print(f"🔄 {len(synced)}개 슬래시 커맨드 동기화 완료")
+        await get_photo_store().load_guild(guild_id, get_async_sheets_manager(guild_id).get_photo_refs)
     except Exception as e:
-        print(f"❌ 커맨드 동기화 실패: {e}")
+        print(f"⚠️ 사진 색인 준비 실패 ({guild_id}): {e}")
+
+
+async def upload_photo(interaction: discord.Interaction, photo: dict) -> Optional[discord.WebhookMessage]:
+    """인증 사진을 이 인터랙션의 메시지로 다시 올리기
     
-    # 주간 집계 스케줄러 시작
-    if not weekly_summary.is_running():
-        weekly_summary.start()
+    방의 업로드 한도를 넘으면 줄여서 올리고, 줄일 수 없거나 올리지 못하면 None.
+    """
+    limit = interaction.guild.filesize_limit if interaction.guild else discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES
+    file = await get_photo_store().upload_file(photo, limit)
+    if file is None:
+        print(f"⚠️ 인증 사진이 업로드 한도({limit // (1024 * 1024)}MB)를 넘어 다시 올리지 않음")
+        return None
+    try:
+        return await interaction.followup.send(
+            f"📸 {interaction.user.display_name}님의 인증 사진 확인 중...",
+            file=file
+        )
+    except discord.HTTPException as e:
+        print(f"⚠️ 인증 사진 다시 올리기 실패: {e}")
+        return None
+    finally:
+        file.close()
+
+
+async def reply_without_photo(
+    interaction: discord.Interaction,
+    photo_message: Optional[discord.WebhookMessage],
+    content: str
+) -> None:
+    """인증이 저장되지 않았을 때 응답 (다시 올린 사진 메시지는 지움)"""
+    if photo_message is not None:
+        try:
+            await photo_message.delete()
+        except discord.HTTPException:
+            pass
+    await interaction.followup.send(content)
 
 
 @bot.tree.command(
     name="인증",
     description="운동 인증을 등록합니다. 사진을 첨부해주세요!",
-    guild=discord.Object(id=DISCORD_GUILD_ID)
+    guilds=GUILD_OBJECTS
 )
 @app_commands.describe(
     회차="인증 회차 (1, 2, 3)",
     벌금차감="납부한 벌금 금액 (선택사항)",
-    비고="추가 메모 (선택사항)"
+    비고="추가 메모 (선택사항)",
+    사진="운동 인증 사진 (홈트는 운동 영상)",
+    운동종류="운동 종류 (종류별 인정 기준 적용)",
+    운동시간="운동 시간 (분)",
+    속도="평균 속도 (km/h, 런닝/사이클)",
+    칼로리="소모 칼로리 (kcal, 링피트/유산소)"
 )
+@app_commands.choices(
+    운동종류=[app_commands.Choice(name=name, value=name) for name in rules.exercises]
+)
+@timed_command("인증")
 async def verify_exercise(
     interaction: discord.Interaction,
     회차: app_commands.Range[int, 1, 3],
     벌금차감: Optional[int] = 0,
-    비고: Optional[str] = ""
+    비고: Optional[str] = "",
+    사진: Optional[discord.Attachment] = None,
+    운동종류: Optional[str] = None,
+    운동시간: Optional[app_commands.Range[int, 1, 1440]] = None,
+    속도: Optional[app_commands.Range[float, 0.0, 100.0]] = None,
+    칼로리: Optional[app_commands.Range[int, 1, 10000]] = None
 ):
     """운동 인증 커맨드"""
     await interaction.response.defer()
@@ -69,79 +279,145 @@ async def verify_exercise(
     user_id = str(interaction.user.id)
     user_name = interaction.user.display_name
     
-    # 이미지 첨부 확인 (메시지에서)
     image_url = None
-    
-    # NOTE: 슬래시 커맨드는 첨부파일을 직접 받을 수 없음
-    # 대안: 인증 후 채널에 사진을 올리도록 안내하거나, 
-    # 별도의 attachment 파라미터 추가 가능
+    photo = None
+    photo_message = None
+    saved = False
     
     try:
-        sheets = get_sheets_manager()
+        sheets = get_async_sheets_manager(interaction.guild_id)
+        
+        # 다시 전달된 인터랙션은 사진/저장소 작업 없이 처음 결과로 응답
+        previous = sheets.completed_interaction(interaction.id)
+        if previous is not None:
+            await interaction.followup.send(previous["message"])
+            return
+        
+        # 사진은 내용 해시로 확인한 뒤 이 인터랙션의 첫 메시지로 다시 올림
+        # (슬래시 커맨드 첨부 URL은 만료되므로 기록에는 그 메시지 링크를 남김)
+        if 사진 is not None:
+            await load_photo_index(interaction.guild_id)
+            photo = await get_photo_store().ingest(사진, interaction.guild_id)
+            if photo["match"]:
+                비고 = f"{비고} {photo_match_note(photo['match'])}".strip()
+            photo_message = await upload_photo(interaction, photo)
+            base_url = photo_message.jump_url if photo_message is not None else 사진.url
+            image_url = photo_url(base_url, photo)
         
         # 멤버 등록 확인 (없으면 자동 등록)
-        sheets.register_member(user_id, user_name)
+        await sheets.register_member(user_id, user_name)
         
         # 인증 기록
-        result = sheets.add_verification(
+        result = await sheets.add_verification(
             user_id=user_id,
             user_name=user_name,
             count=회차,
             image_url=image_url,
             penalty_paid=벌금차감,
-            note=비고
+            note=비고,
+            exercise=운동종류 or "",
+            minutes=운동시간,
+            speed=속도,
+            kcal=칼로리,
+            interaction_id=interaction.id
         )
+        saved = result["success"] and not result.get("duplicate")
+    
+    except PhotoError as e:
+        await reply_without_photo(interaction, photo_message, f"❌ {e}")
+        return
+    except SheetsQuotaError:
+        record_command_error()
+        await reply_without_photo(interaction, photo_message, QUOTA_MESSAGE)
+        return
+    except Exception as e:
+        record_command_error()
+        await reply_without_photo(interaction, photo_message, f"❌ 오류가 발생했습니다: {str(e)}")
+        return
+    
+    if not saved:
+        await reply_without_photo(interaction, photo_message, result["message"])
+        return
+    
+    if photo is not None:
+        get_photo_store().remember(photo, interaction.guild_id, user_id, result["week"], image_url)
+    
+    # 기록은 저장됐으므로 여기부터 실패해도 인증 실패로 안내하지 않음
+    try:
+        # 현재 주 인증 현황
+        weekly_count = await sheets.get_user_weekly_count(user_id)
+        remaining = max(0, WEEKLY_REQUIRED_COUNT - weekly_count)
+        
+        embed = discord.Embed(
+            title="🏋️ 운동 인증 완료!",
+            color=discord.Color.green()
+        )
+        embed.add_field(name="회원", value=user_name, inline=True)
+        embed.add_field(name="회차", value=f"{회차}회", inline=True)
+        embed.add_field(name="주간 현황", value=f"{weekly_count}/{WEEKLY_REQUIRED_COUNT}회", inline=True)
         
-        if result["success"]:
-            # 현재 주 인증 현황
-            weekly_count = sheets.get_user_weekly_count(user_id)
-            remaining = max(0, WEEKLY_REQUIRED_COUNT - weekly_count)
-            
-            embed = discord.Embed(
-                title="🏋️ 운동 인증 완료!",
-                color=discord.Color.green()
+        if 운동종류:
+            details = [
+                text for value, text in (
+                    (운동시간, f"{운동시간}분"),
+                    (속도, f"{속도:g}km/h"),
+                    (칼로리, f"{칼로리}kcal")
+                ) if value is not None
+            ]
+            embed.add_field(
+                name="🏃 운동",
+                value=운동종류 + (f" ({', '.join(details)})" if details else ""),
+                inline=False
             )
-            embed.add_field(name="회원", value=user_name, inline=True)
-            embed.add_field(name="회차", value=f"{회차}회", inline=True)
-            embed.add_field(name="주간 현황", value=f"{weekly_count}/{WEEKLY_REQUIRED_COUNT}회", inline=True)
-            
-            if remaining > 0:
-                embed.add_field(
-                    name="남은 횟수", 
-                    value=f"{remaining}회 (예상 벌금: {remaining * PENALTY_PER_MISS:,}원)", 
-                    inline=False
-                )
-            else:
-                embed.add_field(name="✅", value="이번 주 운동 완료!", inline=False)
-            
-            if 벌금차감 > 0:
-                embed.add_field(name="💰 벌금 납부", value=f"{벌금차감:,}원", inline=True)
-            
-            if 비고:
-                embed.add_field(name="📝 비고", value=비고, inline=False)
-            
-            embed.set_footer(text=f"인증 시간: {datetime.now(tz).strftime('%Y-%m-%d %H:%M')}")
-            
-            await interaction.followup.send(embed=embed)
-            
-            # 사진 첨부 안내
-            await interaction.followup.send(
-                "📸 **인증 사진을 이 메시지에 답장으로 첨부해주세요!**\n"
-                "(타임스탬프 앱 스크린샷 또는 운동 인증 사진)",
-                ephemeral=True
+        
+        if remaining > 0:
+            embed.add_field(
+                name="남은 횟수", 
+                value=f"{remaining}회 (예상 벌금: {remaining * PENALTY_PER_MISS:,}원)", 
+                inline=False
             )
         else:
-            await interaction.followup.send(result["message"])
-            
+            embed.add_field(name="✅", value="이번 주 운동 완료!", inline=False)
+        
+        if 벌금차감 > 0:
+            embed.add_field(name="💰 벌금 납부", value=f"{벌금차감:,}원", inline=True)
+        
+        if 비고:
+            embed.add_field(name="📝 비고", value=비고, inline=False)
+        
+        embed.set_footer(text=f"인증 시간: {datetime.now(tz).strftime('%Y-%m-%d %H:%M')}")
+        
+        # 사진을 올린 메시지에 결과를 붙이고 썸네일은 그 첨부를 가리킴
+        if photo_message is not None:
+            if photo["is_image"]:
+                embed.set_thumbnail(url=f"attachment://{photo_message.attachments[0].filename}")
+            await photo_message.edit(content=None, embed=embed)
+        else:
+            await interaction.followup.send(embed=embed)
     except Exception as e:
-        await interaction.followup.send(f"❌ 오류가 발생했습니다: {str(e)}")
+        record_command_error()
+        print(f"⚠️ 인증 결과 메시지 전송 실패 (기록은 저장됨): {e}")
+        try:
+            await interaction.followup.send(f"✅ {회차}회차 인증이 저장되었습니다. (결과 표시 실패: {e})")
+        except discord.HTTPException:
+            pass
+        return
+    
+    # 사진 없이 인증한 경우만 첨부 안내
+    if 사진 is None:
+        await interaction.followup.send(
+            "📸 **인증 사진을 이 메시지에 답장으로 첨부해주세요!**\n"
+            "(타임스탬프 앱 스크린샷 또는 운동 인증 사진)",
+            ephemeral=True
+        )
 
 
 @bot.tree.command(
     name="벌금조회",
     description="본인의 벌금 현황을 조회합니다.",
-    guild=discord.Object(id=DISCORD_GUILD_ID)
+    guilds=GUILD_OBJECTS
 )
+@timed_command("벌금조회")
 async def check_penalty(interaction: discord.Interaction):
     """벌금 조회 커맨드"""
     await interaction.response.defer(ephemeral=True)
@@ -149,8 +425,8 @@ async def check_penalty(interaction: discord.Interaction):
     user_id = str(interaction.user.id)
     
     try:
-        sheets = get_sheets_manager()
-        result = sheets.get_user_penalty(user_id)
+        sheets = get_async_sheets_manager(interaction.guild_id)
+        result = await sheets.get_user_penalty(user_id)
         
         if not result["success"]:
             await interaction.followup.send(
@@ -164,13 +440,19 @@ async def check_penalty(interaction: discord.Interaction):
             color=discord.Color.gold()
         )
         embed.add_field(name="회원", value=result["user_name"], inline=True)
-        embed.add_field(name="누적 벌금", value=f"{result['total_penalty']:,}원", inline=True)
+        embed.add_field(name="미납 벌금", value=f"{result['total_penalty']:,}원", inline=True)
         embed.add_field(
             name="이번 주 인증", 
             value=f"{result['weekly_count']}/{WEEKLY_REQUIRED_COUNT}회", 
             inline=True
         )
         
+        embed.add_field(
+            name="누적 부과 / 납부",
+            value=f"{result['charged']:,}원 / {result['paid']:,}원",
+            inline=False
+        )
+        
         if result["remaining"] > 0:
             embed.add_field(
                 name="⚠️ 남은 횟수", 
@@ -186,66 +468,172 @@ async def check_penalty(interaction: discord.Interaction):
             embed.add_field(name="✅", value="이번 주 운동 완료!", inline=False)
         
         await interaction.followup.send(embed=embed, ephemeral=True)
-        
+    
+    except SheetsQuotaError:
+        record_command_error()
+        await interaction.followup.send(QUOTA_MESSAGE, ephemeral=True)
     except Exception as e:
+        record_command_error()
         await interaction.followup.send(f"❌ 오류가 발생했습니다: {str(e)}", ephemeral=True)
 
 
+def build_weekly_status_embed(snapshot: WeeklySnapshot) -> discord.Embed:
+    """주간 현황 임베드 생성"""
+    embed = discord.Embed(
+        title="📊 주간 운동 현황",
+        description=f"📅 {snapshot.week_start.strftime('%m/%d')} ~ {snapshot.week_end.strftime('%m/%d')}",
+        color=discord.Color.blue()
+    )
+    
+    if snapshot.completed:
+        add_chunked_field(embed, "🏆 완료", [
+            f"✅ {s['user_name']}: {s['count']}회" for s in snapshot.completed
+        ])
+    
+    if snapshot.incomplete:
+        add_chunked_field(embed, "📝 진행중", [
+            f"⏳ {s['user_name']}: {s['count']}/{WEEKLY_REQUIRED_COUNT}회 (남은 {s['remaining']}회)"
+            for s in snapshot.incomplete
+        ])
+    
+    embed.set_footer(text=f"주차: {snapshot.week_name}")
+    return embed
+
+
 @bot.tree.command(
     name="주간현황",
     description="전체 멤버의 주간 운동 현황을 확인합니다.",
-    guild=discord.Object(id=DISCORD_GUILD_ID)
+    guilds=GUILD_OBJECTS
 )
+@timed_command("주간현황")
 async def weekly_status(interaction: discord.Interaction):
     """주간 현황 커맨드"""
     await interaction.response.defer()
     
     try:
-        sheets = get_sheets_manager()
-        status_list = sheets.get_weekly_status()
+        sheets = get_async_sheets_manager(interaction.guild_id)
+        snapshot = await sheets.get_weekly_snapshot()
         
-        if not status_list:
+        if not snapshot.status_list:
             await interaction.followup.send("📋 등록된 멤버가 없습니다.")
             return
         
-        week_name, week_start, week_end = sheets.get_current_week_info()
+        # 임베드는 스냅샷이 바뀔 때만 다시 만듦
+        if snapshot.embed is None:
+            snapshot.embed = build_weekly_status_embed(snapshot)
+        embed = snapshot.embed
         
-        embed = discord.Embed(
-            title="📊 주간 운동 현황",
-            description=f"📅 {week_start.strftime('%m/%d')} ~ {week_end.strftime('%m/%d')}",
-            color=discord.Color.blue()
+        await interaction.followup.send(embed=embed)
+    
+    except SheetsQuotaError:
+        record_command_error()
+        await interaction.followup.send(QUOTA_MESSAGE)
+    except Exception as e:
+        record_command_error()
+        await interaction.followup.send(f"❌ 오류가 발생했습니다: {str(e)}")
+
+
+def build_user_stats_embed(stats: dict) -> discord.Embed:
+    """개인 통계 임베드"""
+    embed = discord.Embed(
+        title=f"📈 {stats['user_name']}님의 운동 통계",
+        description=f"{stats['first_week']}부터 {stats['weeks']}주 · 인증 {stats['total']}회",
+        color=discord.Color.purple()
+    )
+    embed.add_field(name="🔥 연속 달성", value=f"{stats['current_streak']}주", inline=True)
+    embed.add_field(name="🏅 최장 연속", value=f"{stats['best_streak']}주", inline=True)
+    embed.add_field(
+        name="✅ 달성 주",
+        value=f"{stats['completed_weeks']}/{stats['weeks']}주",
+        inline=True
+    )
+    
+    recent = " ".join("🟩" if count >= WEEKLY_REQUIRED_COUNT else "🟥" for count in stats["recent_counts"])
+    embed.add_field(name="최근 주차 (마지막은 이번 주)", value=recent or "기록 없음", inline=False)
+    
+    months = list(stats["monthly"].items())[-6:]
+    add_chunked_field(embed, "월별 인증", [f"{month}: {n}회" for month, n in months] or ["기록 없음"])
+    
+    embed.add_field(
+        name="💸 벌금 기록",
+        value=(
+            f"미달 {len(stats['missed_weeks'])}주 · 부과 {stats['penalty_total']:,}원 · "
+            f"납부 {stats['paid_total']:,}원 · 잔액 {stats['balance']:,}원"
+        ),
+        inline=False
+    )
+    if stats["missed_weeks"]:
+        add_chunked_field(
+            embed, "미달 주차",
+            [f"{week}: {missed}회 부족" for week, missed in stats["missed_weeks"][-10:]]
         )
+    return embed
+
+
+@bot.tree.command(
+    name="통계",
+    description="운동 기록 통계(연속 달성, 월별 인증, 순위)를 확인합니다.",
+    guilds=GUILD_OBJECTS
+)
+@app_commands.describe(
+    보기="개인 통계 또는 순위표",
+    대상="통계를 볼 멤버 (기본: 본인)",
+    주수="순위표 집계 기간 (주, 기본 4주)"
+)
+@app_commands.choices(보기=[
+    app_commands.Choice(name="개인", value="개인"),
+    app_commands.Choice(name="순위", value="순위")
+])
+@timed_command("통계")
+async def statistics(
+    interaction: discord.Interaction,
+    보기: Optional[str] = "개인",
+    대상: Optional[discord.Member] = None,
+    주수: app_commands.Range[int, 1, 52] = 4
+):
+    """통계 커맨드"""
+    await interaction.response.defer()
+    
+    try:
+        sheets = get_async_sheets_manager(interaction.guild_id)
         
-        # 완료자 / 미완료자 분리
-        completed = [s for s in status_list if s["completed"]]
-        incomplete = [s for s in status_list if not s["completed"]]
-        
-        if completed:
-            completed_text = "\n".join([
-                f"✅ {s['user_name']}: {s['count']}회" for s in completed
-            ])
-            embed.add_field(name="🏆 완료", value=completed_text, inline=False)
-        
-        if incomplete:
-            incomplete_text = "\n".join([
-                f"⏳ {s['user_name']}: {s['count']}/{WEEKLY_REQUIRED_COUNT}회 (남은 {s['remaining']}회)"
-                for s in incomplete
-            ])
-            embed.add_field(name="📝 진행중", value=incomplete_text, inline=False)
-        
-        embed.set_footer(text=f"주차: {week_name}")
-        
-        await interaction.followup.send(embed=embed)
+        if 보기 == "순위":
+            board = await sheets.get_leaderboard(weeks=주수)
+            if not board:
+                await interaction.followup.send(f"📋 최근 {주수}주 인증 기록이 없습니다.")
+                return
+            medals = ["🥇", "🥈", "🥉"]
+            lines = [
+                f"{medals[i] if i < len(medals) else f'{i + 1}.'} {entry['user_name']} - "
+                f"{entry['total']}회 (연속 {entry['current_streak']}주)"
+                for i, entry in enumerate(board)
+            ]
+            embed = discord.Embed(title=f"🏆 최근 {주수}주 인증 순위", color=discord.Color.gold())
+            add_chunked_field(embed, "순위", lines)
+            await interaction.followup.send(embed=embed)
+            return
         
+        member = 대상 or interaction.user
+        stats = await sheets.get_user_stats(str(member.id))
+        if stats is None:
+            await interaction.followup.send(f"📋 {member.display_name}님의 인증 기록이 없습니다.")
+            return
+        await interaction.followup.send(embed=build_user_stats_embed(stats))
+    
+    except SheetsQuotaError:
+        record_command_error()
+        await interaction.followup.send(QUOTA_MESSAGE)
     except Exception as e:
+        record_command_error()
         await interaction.followup.send(f"❌ 오류가 발생했습니다: {str(e)}")
 
 
 @bot.tree.command(
     name="멤버등록",
     description="운동인증방 멤버로 등록합니다.",
-    guild=discord.Object(id=DISCORD_GUILD_ID)
+    guilds=GUILD_OBJECTS
 )
+@timed_command("멤버등록")
 async def register_member(interaction: discord.Interaction):
     """멤버 등록 커맨드"""
     await interaction.response.defer(ephemeral=True)
@@ -254,82 +642,279 @@ async def register_member(interaction: discord.Interaction):
     user_name = interaction.user.display_name
     
     try:
-        sheets = get_sheets_manager()
-        result = sheets.register_member(user_id, user_name)
+        sheets = get_async_sheets_manager(interaction.guild_id)
+        result = await sheets.register_member(user_id, user_name)
         
         await interaction.followup.send(result["message"], ephemeral=True)
-        
+    
+    except SheetsQuotaError:
+        record_command_error()
+        await interaction.followup.send(QUOTA_MESSAGE, ephemeral=True)
     except Exception as e:
+        record_command_error()
         await interaction.followup.send(f"❌ 오류가 발생했습니다: {str(e)}", ephemeral=True)
 
 
-@tasks.loop(time=time(hour=0, minute=0, tzinfo=tz))
-async def weekly_summary():
-    """매일 00:00에 실행, 일요일에만 주간 결산"""
-    now = datetime.now(tz)
+@bot.tree.command(
+    name="봇상태",
+    description="봇 처리 시간과 Sheets 호출 현황을 확인합니다. (관리자 전용)",
+    guilds=GUILD_OBJECTS
+)
+@app_commands.default_permissions(administrator=True)
+async def bot_status(interaction: discord.Interaction):
+    """봇 상태 커맨드 (관리자 전용)"""
+    snapshot = metrics.snapshot()
+    counters = snapshot["counters"]
+    histograms = snapshot["histograms"]
     
-    # 일요일(weekday=6)에만 실행
-    if now.weekday() != 6:
-        return
+    embed = discord.Embed(
+        title="🩺 봇 상태",
+        description=f"가동 시간: {snapshot['uptime_s'] // 3600}시간 {snapshot['uptime_s'] % 3600 // 60}분",
+        color=discord.Color.blurple()
+    )
     
-    channel = bot.get_channel(DISCORD_CHANNEL_ID)
-    if not channel:
-        print(f"❌ 채널을 찾을 수 없습니다: {DISCORD_CHANNEL_ID}")
-        return
+    # 커맨드별 처리 시간 (전체 / 저장소 / Discord)
+    command_text = ""
+    for name, h in sorted(histograms.items()):
+        if not name.startswith("command.") or name.count(".") != 1:
+            continue
+        storage = histograms.get(f"{name}.storage", {})
+        discord_wait = histograms.get(f"{name}.discord", {})
+        errors = counters.get(f"{name}.errors", 0)
+        command_text += (
+            f"• /{name[len('command.'):]}: {h['count']}회, p50 {h['p50_ms']:.0f}ms / p99 {h['p99_ms']:.0f}ms "
+            f"(저장소 {storage.get('avg_ms', 0):.0f}ms, Discord {discord_wait.get('avg_ms', 0):.0f}ms 평균)"
+            + (f", 오류 {errors}회" if errors else "") + "\n"
+        )
+    embed.add_field(name="⏱️ 커맨드", value=command_text[:1024] or "기록 없음", inline=False)
+    
+    # 저장소 메서드별 처리 시간
+    storage_text = ""
+    for name, h in sorted(histograms.items(), key=lambda item: -item[1]["count"]):
+        if not name.startswith("storage.") or name == "storage.queue_wait":
+            continue
+        storage_text += f"• {name[len('storage.'):]}: {h['count']}회, p50 {h['p50_ms']:.0f}ms / p99 {h['p99_ms']:.0f}ms\n"
+    queue = histograms.get("storage.queue_wait")
+    if queue:
+        storage_text += f"스레드풀 대기: p99 {queue['p99_ms']:.0f}ms\n"
+    embed.add_field(name="🗄️ 저장소", value=storage_text[:1024] or "기록 없음", inline=False)
+    
+    # Sheets API 호출
+    api_text = (
+        f"읽기 {counters.get('sheets_api.read', 0)}회 · 쓰기 {counters.get('sheets_api.write', 0)}회 · "
+        f"병합된 읽기 {counters.get('sheets_api.coalesced', 0)}회\n"
+    )
+    statuses = {k[len("sheets_api.status."):]: v for k, v in counters.items() if k.startswith("sheets_api.status.")}
+    if statuses:
+        api_text += "오류 응답: " + ", ".join(f"{code} × {n}" for code, n in sorted(statuses.items())) + "\n"
+    quota_wait = histograms.get("sheets_api.quota_wait")
+    if quota_wait:
+        api_text += f"할당량 대기: p99 {quota_wait['p99_ms']:.0f}ms"
+    embed.add_field(name="📡 Sheets API", value=api_text, inline=False)
+    
+    # 캐시 적중률
+    if snapshot["cache_hit_rate"]:
+        cache_text = "\n".join(
+            f"• {name}: {rate * 100:.1f}%" for name, rate in sorted(snapshot["cache_hit_rate"].items())
+        )
+        embed.add_field(name="🎯 캐시 적중률", value=cache_text, inline=False)
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+@bot.tree.command(
+    name="인증검사",
+    description="지난 인증 기록을 현재 운동 규칙으로 다시 검사합니다. (관리자 전용)",
+    guilds=GUILD_OBJECTS
+)
+@app_commands.describe(주수="이번 주부터 거슬러 올라가 검사할 주 수 (기본 1주)")
+@app_commands.default_permissions(administrator=True)
+@timed_command("인증검사")
+async def audit_records(
+    interaction: discord.Interaction,
+    주수: app_commands.Range[int, 1, 52] = 1
+):
+    """인증 기록 재검사 커맨드 (관리자 전용)"""
+    await interaction.response.defer(ephemeral=True)
     
     try:
-        sheets = get_sheets_manager()
-        penalties = sheets.calculate_weekly_penalties()
-        
-        if not penalties:
-            embed = discord.Embed(
-                title="🎉 주간 결산",
-                description="모든 멤버가 이번 주 운동을 완료했습니다!",
-                color=discord.Color.green()
-            )
-            await channel.send(embed=embed)
-            return
-        
-        # 벌금 적용
-        sheets.apply_penalties(penalties)
+        sheets = get_async_sheets_manager(interaction.guild_id)
+        now = datetime.now(tz)
+        week_names = [get_week_info(now - timedelta(weeks=i))[0] for i in range(주수)]
+        result = await sheets.audit_weeks(week_names)
+        flagged = result["flagged"]
         
         embed = discord.Embed(
-            title="📋 주간 결산 - 벌금 부과",
-            description="이번 주 운동 미달성 멤버입니다.",
-            color=discord.Color.red()
+            title="🔍 인증 기록 검사",
+            description=(
+                f"{week_names[-1]} ~ {week_names[0]} · 기록 {result['checked']}건 중 "
+                f"**{len(flagged)}건** 기준 미달"
+            ),
+            color=discord.Color.orange() if flagged else discord.Color.green()
         )
+        if flagged:
+            lines = []
+            for item in flagged:
+                record = item["record"]
+                kind = record.get("운동종류") or "종류 없음"
+                lines.append(
+                    f"• {record['주차']} {record['사용자명']} {record['회차']}회차 ({kind}): "
+                    + ", ".join(item["violations"])
+                )
+            add_chunked_field(embed, "기준 미달 기록", lines)
         
-        total_penalty = 0
-        penalty_text = ""
-        for p in penalties:
-            penalty_text += f"• {p['user_name']}: {p['missed_count']}회 미달성 → {p['penalty']:,}원\n"
-            total_penalty += p['penalty']
-        
-        embed.add_field(name="벌금 대상", value=penalty_text, inline=False)
-        embed.add_field(name="총 벌금", value=f"{total_penalty:,}원", inline=False)
-        embed.add_field(
-            name="⏰ 납부 기한", 
-            value="벌금 발생일로부터 1주일 이내\n연체시 추가 벌금 5,000원",
-            inline=False
-        )
-        
-        await channel.send(embed=embed)
-        
-        # 개별 멘션
-        for p in penalties:
-            await channel.send(
-                f"<@{p['user_id']}> 님, 이번 주 운동 {p['missed_count']}회 미달성으로 "
-                f"벌금 **{p['penalty']:,}원**이 부과되었습니다. 💪"
-            )
-        
+        # 임베드는 메시지당 10개/합계 6000자까지이므로 넘치면 여러 메시지로 나눠 보냄
+        for message in dispatcher.pack(embeds=split_embed(embed)):
+            await interaction.followup.send(embeds=message["embeds"], ephemeral=True)
+    
+    except SheetsQuotaError:
+        record_command_error()
+        await interaction.followup.send(QUOTA_MESSAGE, ephemeral=True)
+    except Exception as e:
+        record_command_error()
+        await interaction.followup.send(f"❌ 오류가 발생했습니다: {str(e)}", ephemeral=True)
+
+
+@bot.tree.command(
+    name="시트새로고침",
+    description="스프레드시트를 다시 읽습니다. manage.py로 가져온 뒤 실행하세요. (관리자 전용)",
+    guilds=GUILD_OBJECTS
+)
+@app_commands.default_permissions(administrator=True)
+@timed_command("시트새로고침")
+async def reload_sheets(interaction: discord.Interaction):
+    """캐시 새로고침 커맨드 (관리자 전용)"""
+    await interaction.response.defer(ephemeral=True)
+    
+    try:
+        sheets = get_async_sheets_manager(interaction.guild_id)
+        await sheets.reload()
+        await sheets.get_weekly_snapshot()
+        await interaction.followup.send("✅ 멤버/인증기록/벌금장부를 스프레드시트에서 다시 읽었습니다.", ephemeral=True)
+    
+    except SheetsQuotaError:
+        record_command_error()
+        await interaction.followup.send(QUOTA_MESSAGE, ephemeral=True)
+    except Exception as e:
+        record_command_error()
+        await interaction.followup.send(f"❌ 오류가 발생했습니다: {str(e)}", ephemeral=True)
+
+
+@tasks.loop(minutes=10)
+async def log_metrics():
+    """계측값을 구조화 로그(JSON 한 줄)로 출력"""
+    print(f"📈 {metrics.log_line()}")
+
+
+@tasks.loop(seconds=60)
+async def revalidate_caches():
+    """관리자가 스프레드시트를 직접 고쳤는지 확인 (고쳤을 때만 캐시를 다시 읽음)"""
+    for guild_id, manager in get_all_async_sheets_managers().items():
+        try:
+            await manager.revalidate()
+        except Exception as e:
+            print(f"⚠️ 외부 수정 확인 실패 ({guild_id}): {e}")
+
+
+async def settle_guild(guild_id: int, week_name: str, penalties: list) -> bool:
+    """스케줄러가 부르는 방별 주간 결산 (채널이 없으면 실패로 보고 나중에 다시 시도)"""
+    channel = bot.get_channel(GUILDS[guild_id]["channel_id"])
+    if not channel:
+        print(f"❌ 채널을 찾을 수 없습니다: {GUILDS[guild_id]['channel_id']}")
+        return False
+    return await run_weekly_settlement(channel, guild_id, week_name, penalties)
+
+
+scheduler = SettlementScheduler(settle_guild)
+
+
+@timed("job.weekly_settlement")
+async def run_weekly_settlement(
+    channel: discord.abc.Messageable,
+    guild_id: Optional[int] = None,
+    week_name: Optional[str] = None,
+    penalties: Optional[list] = None
+) -> bool:
+    """주간 결산: 벌금 계산/적용 후 채널에 알리고 지난 기록 보관 (결산 성공 여부 반환)"""
+    settled = False
+    try:
+        await settle_penalties(channel, guild_id, week_name, penalties)
+        settled = True
+    except SheetsQuotaError as e:
+        metrics.incr("job.weekly_settlement.errors")
+        print(f"❌ 주간 결산 오류 (Sheets 요청 한도 초과): {e}")
     except Exception as e:
+        metrics.incr("job.weekly_settlement.errors")
         print(f"❌ 주간 결산 오류: {e}")
+    
+    # 지난 주차 기록은 보관 시트로 옮겨 인증기록에는 현재 주만 남김
+    try:
+        await get_async_sheets_manager(guild_id).rollover_records()
+    except Exception as e:
+        print(f"❌ 인증기록 보관 오류: {e}")
+    return settled
 
 
-@weekly_summary.before_loop
-async def before_weekly_summary():
-    """스케줄러 시작 전 봇 준비 대기"""
-    await bot.wait_until_ready()
+async def settle_penalties(
+    channel: discord.abc.Messageable,
+    guild_id: Optional[int] = None,
+    week_name: Optional[str] = None,
+    penalties: Optional[list] = None
+):
+    """벌금 계산/적용 후 결산 메시지 전송
+    
+    week_name이 없으면 현재 주차를 결산하고, penalties를 넘기면 (미리 계산한 목록) 다시 계산하지 않는다.
+    """
+    sheets = get_async_sheets_manager(guild_id)
+    if week_name is None:
+        week_name = get_week_info(datetime.now(tz))[0]
+    if penalties is None:
+        penalties = await sheets.calculate_weekly_penalties(week_name)
+    
+    if not penalties:
+        embed = discord.Embed(
+            title=f"🎉 주간 결산 ({week_name})",
+            description="모든 멤버가 운동을 완료했습니다!",
+            color=discord.Color.green()
+        )
+        await dispatcher.send(channel, embeds=[embed])
+        return
+    
+    # 벌금 장부에 부과 (이미 결산한 주차면 아무것도 추가되지 않음)
+    penalties = await sheets.apply_penalties(penalties)
+    if not penalties:
+        print("⏭️ 이미 결산된 주차라 벌금을 다시 부과하지 않습니다.")
+        return
+    print(f"💰 벌금 적용 완료: {len(penalties)}명")
+    
+    embed = discord.Embed(
+        title=f"📋 주간 결산 - 벌금 부과 ({week_name})",
+        description=f"{week_name} 운동 미달성 멤버입니다.",
+        color=discord.Color.red()
+    )
+    
+    total_penalty = sum(p['penalty'] for p in penalties)
+    penalty_lines = [
+        f"• {p['user_name']}: {p['missed_count']}회 미달성 → {p['penalty']:,}원"
+        for p in penalties
+    ]
+    
+    # 인원이 많으면 1024자 제한에 맞춰 필드를 나눔
+    add_chunked_field(embed, "벌금 대상", penalty_lines)
+    embed.add_field(name="총 벌금", value=f"{total_penalty:,}원", inline=False)
+    embed.add_field(
+        name="⏰ 납부 기한", 
+        value="벌금 발생일로부터 1주일 이내\n연체시 추가 벌금 5,000원",
+        inline=False
+    )
+    
+    # 개별 멘션은 2000자 이하 메시지로 묶어 임베드와 함께 전송
+    mention_lines = [f"{week_name} 운동 미달성으로 벌금이 부과되었습니다. 💪"] + [
+        f"<@{p['user_id']}> {p['missed_count']}회 미달성 → 벌금 **{p['penalty']:,}원** (미납 합계 {p['balance']:,}원)"
+        for p in penalties
+    ]
+    sent = await dispatcher.send(channel, mention_lines, [embed])
+    print(f"📨 결산 알림 전송: 메시지 {sent}개")
 
 
 def run_bot():
@@ -339,7 +924,10 @@ def run_bot():
         print("   .env 파일을 확인해주세요.")
         return
     
-    bot.run(DISCORD_BOT_TOKEN)
+    try:
+        bot.run(DISCORD_BOT_TOKEN)
+    finally:
+        shutdown_sheets_manager()
 
 
 if __name__ == "__main__":
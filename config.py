@@ -1,6 +1,7 @@
 """
 운동인증방 봇 설정 파일
 """
+import json
 import os
 from dotenv import load_dotenv
 
@@ -10,10 +11,73 @@ load_dotenv()
 DISCORD_BOT_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 DISCORD_GUILD_ID = int(os.getenv("DISCORD_GUILD_ID", "0"))
 DISCORD_CHANNEL_ID = int(os.getenv("DISCORD_CHANNEL_ID", "0"))
+AUTO_SHARD = os.getenv("AUTO_SHARD", "false").lower() in ("1", "true", "yes")  # 서버가 많을 때 자동 샤딩 사용
 
 # Google Sheets 설정
 GOOGLE_SHEETS_ID = os.getenv("GOOGLE_SHEETS_ID")
 CREDENTIALS_FILE = "credentials.json"
+SHEETS_MAX_WORKERS = int(os.getenv("SHEETS_MAX_WORKERS", "4"))  # Sheets I/O 동시 실행 수
+SHEETS_FLUSH_INTERVAL = float(os.getenv("SHEETS_FLUSH_INTERVAL", "2"))  # 행 추가 버퍼 전송 주기(초), 0이면 즉시 전송
+SHEETS_FLUSH_MAX_ROWS = int(os.getenv("SHEETS_FLUSH_MAX_ROWS", "20"))  # 이 행 수가 쌓이면 바로 전송
+SHEETS_READ_PER_MINUTE = int(os.getenv("SHEETS_READ_PER_MINUTE", "60"))  # 분당 읽기 요청 한도
+SHEETS_WRITE_PER_MINUTE = int(os.getenv("SHEETS_WRITE_PER_MINUTE", "60"))  # 분당 쓰기 요청 한도
+SHEETS_MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "5"))  # 429/5xx 응답 재시도 횟수
+SHEETS_CHANGE_POLL_INTERVAL = float(os.getenv("SHEETS_CHANGE_POLL_INTERVAL", "60"))  # 외부 수정 확인 주기(초), 0이면 끄기
+
+# 저장소 설정
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sheets")  # "sheets" 또는 "sqlite"
+SQLITE_PATH = os.getenv("SQLITE_PATH", "undongbang.db")  # 여러 방이면 방마다 이름 뒤에 _<서버ID>가 붙음
+REPLICATION_INTERVAL = float(os.getenv("REPLICATION_INTERVAL", "5"))  # SQLite -> 스프레드시트 복제 주기(초)
+
+# 여러 방(서버) 설정
+# GUILDS_JSON 또는 guilds.json: [{"guild_id": 123, "channel_id": 456, "sheets_id": "..."}, ...]
+# 없으면 위의 DISCORD_GUILD_ID / DISCORD_CHANNEL_ID / GOOGLE_SHEETS_ID 한 방만 사용
+GUILDS_FILE = os.getenv("GUILDS_FILE", "guilds.json")
+SHEETS_CLIENT_POOL_SIZE = int(os.getenv("SHEETS_CLIENT_POOL_SIZE", "2"))  # 공유할 인증된 gspread 클라이언트 수
+
+
+def _load_guilds() -> dict:
+    """서버ID -> {"channel_id", "sheets_id", "sqlite_path"} 설정 읽기"""
+    raw = os.getenv("GUILDS_JSON")
+    if not raw and os.path.exists(GUILDS_FILE):
+        with open(GUILDS_FILE, encoding="utf-8") as f:
+            raw = f.read()
+    
+    if not raw:
+        return {
+            DISCORD_GUILD_ID: {
+                "channel_id": DISCORD_CHANNEL_ID,
+                "sheets_id": GOOGLE_SHEETS_ID,
+                "sqlite_path": SQLITE_PATH
+            }
+        }
+    
+    guilds = {}
+    root, ext = os.path.splitext(SQLITE_PATH)
+    for entry in json.loads(raw):
+        guild_id = int(entry["guild_id"])
+        guilds[guild_id] = {
+            "channel_id": int(entry["channel_id"]),
+            "sheets_id": entry["sheets_id"],
+            "sqlite_path": entry.get("sqlite_path") or f"{root}_{guild_id}{ext}"
+        }
+    return guilds
+
+
+GUILDS = _load_guilds()
+
+# 인증 사진 설정
+PHOTO_STORE_DIR = os.getenv("PHOTO_STORE_DIR", "photos")  # 해시 계산과 다시 올리기용 사진 폴더 (재배포 때 지워져도 됨)
+PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", str(25 * 1024 * 1024)))  # 사진 최대 용량
+PHOTO_HASH_WORKERS = int(os.getenv("PHOTO_HASH_WORKERS", "2"))  # 사진 해시 계산 스레드 수
+PHOTO_SIMILAR_DISTANCE = int(os.getenv("PHOTO_SIMILAR_DISTANCE", "6"))  # 비슷한 사진으로 볼 dHash 해밍 거리 (최대 7)
+
+# 주간 결산 설정
+SETTLEMENT_PRECOMPUTE_MINUTES = float(os.getenv("SETTLEMENT_PRECOMPUTE_MINUTES", "5"))  # 마감 몇 분 전에 벌금 미리 계산
+SETTLEMENT_RETRY_MINUTES = float(os.getenv("SETTLEMENT_RETRY_MINUTES", "10"))  # 결산 실패 시 재시도 간격(분)
+
+# 모니터링 설정
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "10"))  # 계측값 로그 주기(분), 0이면 끄기
 
 # 운동 인증 규칙
 WEEKLY_REQUIRED_COUNT = 3  # 주 3회 필수
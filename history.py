@@ -0,0 +1,232 @@
+"""
+인증 기록 통계 모듈
+전체 인증 기록을 열 단위 배열로 압축해 두고 연속 달성, 순위, 월별 추이를 계산
+"""
+import functools
+import re
+import threading
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import WEEKLY_REQUIRED_COUNT, WEEK_START_DAY
+
+# 통계에 쓰는 인증기록 열 (저장소는 이 열만 행 튜플로 읽어 넘김)
+HISTORY_COLUMNS = ("날짜시간", "주차", "사용자ID", "사용자명", "회차")
+
+DATE_PATTERN = re.compile(r"(\d{4})\D+(\d{1,2})\D+(\d{1,2})")
+
+
+@functools.lru_cache(maxsize=None)
+def week_number(week_name: str) -> Optional[int]:
+    """주차명('2025-W10')을 정수 주 번호로 변환 (1년 1월 1일 이후 주 시작일 수 // 7)
+    
+    주차명은 주 시작일(WEEK_START_DAY)을 %Y-W%W로 만든 것이므로
+    그 주(월요일 시작)의 월요일에서 WEEK_START_DAY일 뒤가 주 시작일이다.
+    """
+    try:
+        monday = datetime.strptime(f"{week_name}-1", "%Y-W%W-%w").date()
+    except ValueError:
+        return None
+    return ((monday + timedelta(days=WEEK_START_DAY)).toordinal() - 1 - WEEK_START_DAY) // 7
+
+
+def week_start_of(number: int) -> date:
+    """정수 주 번호의 주 시작일"""
+    return date.fromordinal(number * 7 + 1 + WEEK_START_DAY)
+
+
+def week_name_of(number: int) -> str:
+    """정수 주 번호를 주차명으로 변환"""
+    return week_start_of(number).strftime("%Y-W%W")
+
+
+def _day_number(value: Any) -> Optional[int]:
+    """날짜시간 값의 날짜 서수 ('2025-03-05 ...', '2025. 3. 5 ...' 모두 지원)"""
+    if isinstance(value, datetime):
+        return value.toordinal()
+    match = DATE_PATTERN.search(str(value or ""))
+    if match is None:
+        return None
+    try:
+        return date(*(int(part) for part in match.groups())).toordinal()
+    except ValueError:
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def _month_of(day: int) -> str:
+    """날짜 서수의 월 ('2025-03')"""
+    return date.fromordinal(day).strftime("%Y-%m")
+
+
+def _streaks(completed: List[bool], until: int) -> Tuple[int, int]:
+    """(until 위치에서 끝나는 연속 달성 주 수, 최장 연속 달성 주 수)"""
+    best = run = 0
+    for done in completed:
+        run = run + 1 if done else 0
+        best = max(best, run)
+    current = 0
+    for i in range(until, -1, -1):
+        if not completed[i]:
+            break
+        current += 1
+    return current, best
+
+
+class HistoryStore:
+    """열 단위 인증 기록 저장소
+    
+    기록은 HISTORY_COLUMNS 순서의 행 튜플로 받는다.
+    사용자ID는 번호로 바꿔(intern) 저장하고 기록은 열마다 array 하나로 보관한다.
+    통계에 쓰는 사용자별 집계(주별 최대 회차/기록 수, 월별 인증 수, 누적 인증 수)는
+    기록을 추가할 때 함께 갱신하므로 조회할 때 전체 기록을 다시 훑지 않는다.
+    """
+    
+    def __init__(self, rows: Iterable[Sequence[Any]] = ()):
+        self.user_ids: List[str] = []
+        self.user_names: List[str] = []
+        self._user_index: Dict[str, int] = {}
+        self.user = array("I")
+        self.week = array("i")
+        self.day = array("i")
+        self.count = array("B")
+        # 사용자 번호별 집계
+        self.totals = array("I")
+        self._week_max: List[Dict[int, int]] = []
+        self._week_rows: List[Dict[int, int]] = []
+        self._monthly: List[Dict[str, int]] = []
+        self._lock = threading.RLock()
+        self.extend_rows(rows)
+    
+    def __len__(self) -> int:
+        return len(self.user)
+    
+    def _intern(self, user_id: str, user_name: str) -> int:
+        index = self._user_index.get(user_id)
+        if index is None:
+            index = self._user_index[user_id] = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self.user_names.append(user_name)
+            self.totals.append(0)
+            self._week_max.append({})
+            self._week_rows.append({})
+            self._monthly.append({})
+        elif user_name:
+            self.user_names[index] = user_name  # 최근 이름으로 표시
+        return index
+    
+    def _append(self, row: Sequence[Any]) -> None:
+        timestamp, week_name, user_id, user_name, count = row
+        week = week_number(str(week_name or ""))
+        user_id = str(user_id or "")
+        if week is None or not user_id:
+            return
+        day = _day_number(timestamp)
+        if day is None:
+            day = week_start_of(week).toordinal()
+        count = max(0, min(255, int(count or 0)))
+        user = self._intern(user_id, str(user_name or ""))
+        self.user.append(user)
+        self.week.append(week)
+        self.day.append(day)
+        self.count.append(count)
+        
+        self.totals[user] += 1
+        week_max = self._week_max[user]
+        if count > week_max.get(week, 0):
+            week_max[week] = count
+        week_rows = self._week_rows[user]
+        week_rows[week] = week_rows.get(week, 0) + 1
+        month = _month_of(day)
+        monthly = self._monthly[user]
+        monthly[month] = monthly.get(month, 0) + 1
+    
+    def extend_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        with self._lock:
+            for row in rows:
+                self._append(row)
+    
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        """기록 dict 추가 (새 인증을 바로 반영할 때)"""
+        self.extend_rows(tuple(record.get(c) for c in HISTORY_COLUMNS) for record in records)
+    
+    def append(self, record: Dict[str, Any]) -> None:
+        self.extend([record])
+    
+    def user_index(self, user_id: str) -> Optional[int]:
+        return self._user_index.get(str(user_id))
+    
+    def _user_weeks(self, user: int, until_week: int) -> Tuple[int, List[int]]:
+        """사용자의 주별 최대 회차 (회차가 있는 첫 주부터 until_week까지)"""
+        week_max = self._week_max[user]
+        first = min((week for week, count in week_max.items() if count), default=until_week + 1)
+        return first, [week_max.get(week, 0) for week in range(first, until_week + 1)]
+    
+    def _current_streak(self, user: int, current_week: int) -> int:
+        """current_week(달성 전이면 지난주)에서 끝나는 연속 달성 주 수"""
+        week_max = self._week_max[user]
+        week = current_week if week_max.get(current_week, 0) >= WEEKLY_REQUIRED_COUNT else current_week - 1
+        streak = 0
+        while week_max.get(week, 0) >= WEEKLY_REQUIRED_COUNT:
+            streak += 1
+            week -= 1
+        return streak
+    
+    def user_stats(self, user_id: str, current_week: int) -> Optional[Dict[str, Any]]:
+        """사용자 통계 (연속 달성, 누적, 월별 인증 수, 미달 주차)
+        
+        이번 주는 아직 진행 중이므로 달성했을 때만 연속 기록에 포함하고 미달 주차에서는 뺀다.
+        벌금 합계는 여기서 다시 계산하지 않는다 (실제 부과/납부는 벌금장부 기준).
+        """
+        with self._lock:
+            return self._user_stats(user_id, current_week)
+    
+    def _user_stats(self, user_id: str, current_week: int) -> Optional[Dict[str, Any]]:
+        user = self.user_index(user_id)
+        if user is None:
+            return None
+        first_week, counts = self._user_weeks(user, current_week)
+        completed = [count >= WEEKLY_REQUIRED_COUNT for count in counts]
+        last = len(completed) - 1
+        until = last if completed and completed[last] else last - 1
+        current_streak, best_streak = _streaks(completed, until) if completed else (0, 0)
+        
+        finished = counts[:-1] if counts else []
+        missed_weeks = [
+            (week_name_of(first_week + i), WEEKLY_REQUIRED_COUNT - count)
+            for i, count in enumerate(finished) if count < WEEKLY_REQUIRED_COUNT
+        ]
+        return {
+            "user_name": self.user_names[user],
+            "first_week": week_name_of(first_week),
+            "weeks": len(finished),
+            "completed_weeks": sum(completed[:-1]) if completed else 0,
+            "current_streak": current_streak,
+            "best_streak": best_streak,
+            "total": self.totals[user],
+            "monthly": dict(sorted(self._monthly[user].items())),
+            "recent_counts": counts[-8:],
+            "missed_weeks": missed_weeks
+        }
+    
+    def leaderboard(self, current_week: int, weeks: int = 4, limit: int = 10) -> List[Dict[str, Any]]:
+        """최근 weeks주 인증 수 기준 순위 (동률이면 현재 연속 달성 주 수가 긴 순)"""
+        with self._lock:
+            return self._leaderboard(current_week, weeks, limit)
+    
+    def _leaderboard(self, current_week: int, weeks: int, limit: int) -> List[Dict[str, Any]]:
+        recent = range(current_week - weeks + 1, current_week + 1)
+        board = []
+        for user, week_rows in enumerate(self._week_rows):
+            total = sum(week_rows.get(week, 0) for week in recent)
+            if not total:
+                continue
+            board.append({
+                "user_id": self.user_ids[user],
+                "user_name": self.user_names[user],
+                "total": total,
+                "current_streak": self._current_streak(user, current_week)
+            })
+        board.sort(key=lambda entry: (-entry["total"], -entry["current_streak"], entry["user_name"]))
+        return board[:limit]
@@ -0,0 +1,566 @@
+"""
+운동인증방 데이터 관리 CLI
+인증기록/멤버 시트를 CSV·JSONL 파일로 내보내고 파일에서 가져온다.
+
+- 시트는 --chunk-rows행씩 나눠 읽고 바로 파일에 쓰므로 전체를 메모리에 올리지 않는다.
+- 가져오기는 행을 검사한 뒤 --chunk-rows행씩 묶어 append 한 번으로 추가한다.
+  이미 있는 (주차, 사용자ID, 회차) 기록과 이미 등록된 멤버는 건너뛴다.
+- 진행 상황은 <파일>.checkpoint에 남아, 중단된 뒤 같은 명령을 다시 실행하면 이어서 진행한다.
+- 요청은 --per-minute 한도로 나눠 보내 실행 중인 봇과 Sheets 할당량을 나눠 쓴다.
+
+결산 시각(주 시작일 00:00)에는 인증기록이 보관 시트로 옮겨지므로 그 시간은 피해서 실행한다.
+
+사용 예:
+    python manage.py export records season-2025.csv --from-week 2025-W00 --to-week 2025-W52
+    python manage.py export members members.jsonl
+    python manage.py import records backfill.csv --dry-run
+    python manage.py import members members.jsonl --guild 123456789012345678
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+import pytz
+
+import quota
+from config import (
+    GUILDS,
+    TIMEZONE,
+    STORAGE_BACKEND,
+    SHEETS_READ_PER_MINUTE,
+    SHEETS_WRITE_PER_MINUTE
+)
+from history import DATE_PATTERN, week_number
+from quota import TokenBucket
+from rules import rules
+from sheets import (
+    RECORD_SHEET,
+    RECORD_HEADERS,
+    MEMBER_SHEET,
+    MEMBER_HEADERS,
+    SheetsManager,
+    archive_sheet_title,
+    get_sheets_manager
+)
+from storage import LEDGER_OPENING, get_week_info
+
+# 내보내기/가져오기 대상: 이름 -> (시트, 열)
+TABLES = {
+    "records": (RECORD_SHEET, RECORD_HEADERS),
+    "members": (MEMBER_SHEET, MEMBER_HEADERS),
+}
+
+# 진행 상황 출력 간격 (초)
+PROGRESS_INTERVAL = 5.0
+
+tz = pytz.timezone(TIMEZONE)
+
+
+class Checkpoint:
+    """작업 진행 상황 파일 (작업 설정이 같을 때만 이어서 진행)"""
+    
+    def __init__(self, path: str, job: Dict[str, Any], restart: bool = False):
+        self.path = path
+        self.job = job
+        self.state: Dict[str, Any] = {}
+        if restart or not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠️ 체크포인트를 읽을 수 없어 처음부터 시작합니다: {path}")
+            return
+        if saved.get("job") != job:
+            print(f"⚠️ 체크포인트의 작업 설정이 달라 처음부터 시작합니다: {path}")
+            return
+        self.state = saved.get("state", {})
+        done = self.state.get("rows", self.state.get("rows_done", 0))
+        print(f"↩️ 체크포인트에서 이어서 진행 (처리한 행 {done:,}개): {path}")
+    
+    def save(self, **state: Any) -> None:
+        """진행 상황 저장 (임시 파일에 쓴 뒤 교체)"""
+        self.state.update(state)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"job": self.job, "state": self.state}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+    
+    def finish(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Progress:
+    """진행 상황 출력 (PROGRESS_INTERVAL초마다 한 줄)"""
+    
+    def __init__(self, label: str, total_bytes: Optional[int] = None):
+        self.label = label
+        self.total_bytes = total_bytes
+        self.started = time.monotonic()
+        self.last_print = 0.0
+        self.counts: Dict[str, int] = {}
+    
+    def add(self, name: str, count: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + count
+    
+    def report(self, position: Optional[int] = None, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self.last_print < PROGRESS_INTERVAL:
+            return
+        self.last_print = now
+        elapsed = max(now - self.started, 1e-9)
+        parts = [f"{name} {count:,}" for name, count in self.counts.items()]
+        if position is not None and self.total_bytes:
+            parts.append(f"{position / self.total_bytes:.0%}")
+        parts.append(f"{sum(self.counts.values()) / elapsed:,.0f}행/s")
+        print(f"⏳ {self.label}: {', '.join(parts)}")
+
+
+def detect_format(path: str, fmt: Optional[str]) -> str:
+    """파일 형식 (--format이 없으면 확장자로 판단)"""
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise SystemExit(f"❌ 파일 형식을 알 수 없습니다 (--format csv|jsonl): {path}")
+
+
+# --- 파일 읽기/쓰기 ---
+
+class RowWriter:
+    """CSV/JSONL 행 쓰기 (이어 쓸 때는 마지막 체크포인트 위치까지 잘라낸 뒤 덧붙임)"""
+    
+    def __init__(self, path: str, fmt: str, columns: List[str], offset: int = 0):
+        self.columns = columns
+        self.fmt = fmt
+        if offset and os.path.exists(path):
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+            self.file: IO[str] = open(path, "a", encoding="utf-8", newline="")
+        else:
+            # 엑셀에서 한글이 깨지지 않도록 CSV는 BOM을 붙임
+            self.file = open(path, "w", encoding="utf-8-sig" if fmt == "csv" else "utf-8", newline="")
+        self._csv = csv.writer(self.file) if fmt == "csv" else None
+        if not offset and self._csv is not None:
+            self._csv.writerow(columns)
+    
+    def write(self, values: List[Any]) -> None:
+        if self._csv is not None:
+            self._csv.writerow(values)
+        else:
+            self.file.write(json.dumps(dict(zip(self.columns, values)), ensure_ascii=False) + "\n")
+    
+    def commit(self) -> int:
+        """버퍼를 디스크에 쓰고 현재 파일 크기(체크포인트 위치) 반환"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+    
+    def close(self) -> None:
+        self.file.close()
+
+
+def _text_lines(f: IO[bytes]) -> Iterator[str]:
+    """바이너리 파일을 한 줄씩 문자열로 (첫 줄 BOM 제거, f.tell()로 진행률 계산 가능)"""
+    first = True
+    for line in f:
+        yield line.decode("utf-8-sig" if first else "utf-8")
+        first = False
+
+
+def read_rows(f: IO[bytes], fmt: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """CSV/JSONL 파일을 (행 번호, dict)로 하나씩 읽기 (CSV는 첫 행이 헤더)"""
+    if fmt == "csv":
+        for i, row in enumerate(csv.DictReader(_text_lines(f)), start=2):
+            yield i, row
+        return
+    for i, line in enumerate(_text_lines(f), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = {"__error__": f"JSON 형식 오류: {e}"}
+        yield i, row if isinstance(row, dict) else {"__error__": "JSON 객체가 아닙니다"}
+
+
+# --- 행 검사 ---
+
+def _text(row: Dict[str, Any], column: str) -> str:
+    value = row.get(column)
+    return "" if value is None else str(value).strip()
+
+
+def _integer(row: Dict[str, Any], column: str, minimum: int, default: Optional[int] = None) -> int:
+    text = _text(row, column).replace(",", "")
+    if not text and default is not None:
+        return default
+    try:
+        value = int(float(text))
+    except ValueError:
+        raise ValueError(f"{column} 값이 숫자가 아닙니다: {text!r}") from None
+    if value < minimum:
+        raise ValueError(f"{column} 값은 {minimum} 이상이어야 합니다: {value}")
+    return value
+
+
+def _user_id(row: Dict[str, Any]) -> str:
+    user_id = _text(row, "사용자ID")
+    if not user_id.isdigit():
+        raise ValueError(f"사용자ID가 Discord ID 형식이 아닙니다: {user_id!r}")
+    return user_id
+
+
+def validate_record(row: Dict[str, Any]) -> List[Any]:
+    """가져올 인증기록 행 검사 후 시트 열 순서의 값 목록 반환 (문제가 있으면 ValueError)
+    
+    지난 기록을 옮기는 용도이므로 운동 기준(EXERCISE_RULES)은 검사하지 않는다.
+    가져온 뒤 /인증검사로 기준 미달 기록을 확인할 수 있다.
+    """
+    if "__error__" in row:
+        raise ValueError(row["__error__"])
+    week_name = _text(row, "주차")
+    if week_number(week_name) is None:
+        raise ValueError(f"주차 형식이 잘못되었습니다 (예: 2025-W10): {week_name!r}")
+    timestamp = _text(row, "날짜시간")
+    if DATE_PATTERN.search(timestamp) is None:
+        raise ValueError(f"날짜시간에 날짜가 없습니다: {timestamp!r}")
+    try:
+        when = tz.localize(datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S"))
+    except ValueError:
+        when = None  # 시트 표시 형식이면 주차 일치 여부는 확인하지 않음
+    if when is not None and get_week_info(when)[0] != week_name:
+        raise ValueError(f"날짜시간 {timestamp}은(는) {week_name} 주차가 아닙니다")
+    user_name = _text(row, "사용자명")
+    if not user_name:
+        raise ValueError("사용자명이 비어 있습니다")
+    exercise = _text(row, "운동종류")
+    if exercise and exercise not in rules.exercises:
+        raise ValueError(f"알 수 없는 운동종류입니다: {exercise}")
+    numbers = {}
+    for column in ("운동시간", "속도", "칼로리"):
+        text = _text(row, column)
+        try:
+            value = float(text) if text else ""
+        except ValueError:
+            raise ValueError(f"{column} 값이 숫자가 아닙니다: {text!r}") from None
+        numbers[column] = int(value) if value != "" and value.is_integer() else value
+    
+    values = {
+        "날짜시간": timestamp,
+        "주차": week_name,
+        "사용자ID": _user_id(row),
+        "사용자명": user_name,
+        "회차": _integer(row, "회차", 1),
+        "이미지URL": _text(row, "이미지URL"),
+        "벌금납부": _integer(row, "벌금납부", 0, default=0),
+        "비고": _text(row, "비고"),
+        "운동종류": exercise,
+        **numbers
+    }
+    return [values[column] for column in RECORD_HEADERS]
+
+
+def validate_member(row: Dict[str, Any]) -> List[Any]:
+    """가져올 멤버 행 검사 후 시트 열 순서의 값 목록 반환 (문제가 있으면 ValueError)"""
+    if "__error__" in row:
+        raise ValueError(row["__error__"])
+    user_name = _text(row, "사용자명")
+    if not user_name:
+        raise ValueError("사용자명이 비어 있습니다")
+    joined = _text(row, "가입일") or datetime.now(tz).strftime("%Y-%m-%d")
+    if DATE_PATTERN.search(joined) is None:
+        raise ValueError(f"가입일 형식이 잘못되었습니다: {joined!r}")
+    return [_user_id(row), user_name, _integer(row, "누적벌금", 0, default=0), joined]
+
+
+# --- 내보내기 ---
+
+def export_sheets(manager: SheetsManager, table: str, args: argparse.Namespace) -> List[str]:
+    """내보낼 시트 목록 (인증기록은 기간 안의 보관 시트 + 인증기록 시트)"""
+    if table == "members":
+        return [MEMBER_SHEET]
+    first = week_number(args.from_week) if args.from_week else None
+    last = week_number(args.to_week) if args.to_week else None
+    prefix = archive_sheet_title("")
+    titles = []
+    for title in manager.archive_titles():
+        number = week_number(title[len(prefix):])
+        if number is None:
+            continue
+        if (first is None or number >= first) and (last is None or number <= last):
+            titles.append(title)
+    return titles + [RECORD_SHEET]
+
+
+def in_week_range(week_name: str, args: argparse.Namespace) -> bool:
+    number = week_number(week_name)
+    if number is None:
+        return False
+    if args.from_week and number < week_number(args.from_week):
+        return False
+    if args.to_week and number > week_number(args.to_week):
+        return False
+    return True
+
+
+def run_export(manager: SheetsManager, args: argparse.Namespace) -> None:
+    sheet_title, columns = TABLES[args.table]
+    fmt = detect_format(args.path, args.format)
+    checkpoint = Checkpoint(args.checkpoint or f"{args.path}.checkpoint", {
+        "command": "export",
+        "table": args.table,
+        "path": os.path.abspath(args.path),
+        "format": fmt,
+        "from_week": args.from_week,
+        "to_week": args.to_week,
+        "guild": args.guild
+    }, restart=args.restart)
+    
+    # 이어서 진행할 때는 처음 정한 시트 목록을 그대로 씀
+    titles = checkpoint.state.get("sheets") or export_sheets(manager, args.table, args)
+    writer = RowWriter(args.path, fmt, columns, checkpoint.state.get("offset", 0))
+    progress = Progress(f"{args.table} 내보내기")
+    progress.add("내보냄", checkpoint.state.get("rows", 0))
+    week_filter = args.table == "records" and (args.from_week or args.to_week)
+    week_column = columns.index("주차") if args.table == "records" else None
+    
+    try:
+        for index in range(checkpoint.state.get("sheet_index", 0), len(titles)):
+            title = titles[index]
+            start_row = checkpoint.state.get("next_row", 2) if index == checkpoint.state.get("sheet_index") else 2
+            for row_number, rows in manager.iter_row_chunks(title, len(columns), start_row, args.chunk_rows):
+                written = 0
+                for values in rows:
+                    if not values:
+                        continue
+                    if week_filter and title == RECORD_SHEET and not in_week_range(str(values[week_column]), args):
+                        continue
+                    writer.write(values)
+                    written += 1
+                progress.add("내보냄", written)
+                checkpoint.save(
+                    sheets=titles,
+                    sheet_index=index,
+                    next_row=row_number + len(rows),
+                    offset=writer.commit(),
+                    rows=progress.counts["내보냄"]
+                )
+                progress.report()
+    finally:
+        writer.close()
+    
+    progress.report(force=True)
+    checkpoint.finish()
+    print(f"✅ {args.table} {progress.counts['내보냄']:,}행 내보내기 완료: {args.path}")
+
+
+# --- 가져오기 ---
+
+class RecordImporter:
+    """인증기록 가져오기 (주차별로 묶어 추가, 이미 있는 (사용자ID, 회차)는 건너뜀)"""
+    
+    def __init__(self, manager: SheetsManager, progress: Progress, dry_run: bool):
+        self.manager = manager
+        self.progress = progress
+        self.dry_run = dry_run
+        self.keys: Dict[str, set] = {}
+        self.batch: Dict[str, List[List[Any]]] = {}
+    
+    def __len__(self) -> int:
+        return sum(len(rows) for rows in self.batch.values())
+    
+    def add(self, values: List[Any]) -> None:
+        week_name = values[RECORD_HEADERS.index("주차")]
+        if week_name not in self.keys:
+            self.keys[week_name] = self.manager.record_keys(week_name)
+        key = (values[RECORD_HEADERS.index("사용자ID")], values[RECORD_HEADERS.index("회차")])
+        if key in self.keys[week_name]:
+            self.progress.add("중복 건너뜀")
+            return
+        self.keys[week_name].add(key)
+        self.batch.setdefault(week_name, []).append(values)
+    
+    def flush(self) -> None:
+        for week_name, rows in self.batch.items():
+            if not self.dry_run:
+                self.manager.append_record_rows(week_name, rows)
+            self.progress.add("추가", len(rows))
+        self.batch = {}
+
+
+class MemberImporter:
+    """멤버 가져오기 (이미 등록된 사용자ID는 건너뜀, 누적벌금은 벌금장부 이월로 기록)"""
+    
+    def __init__(self, manager: SheetsManager, progress: Progress, dry_run: bool):
+        self.manager = manager
+        self.progress = progress
+        self.dry_run = dry_run
+        self.known = {m["사용자ID"] for m in manager.get_members()}
+        self.batch: List[List[Any]] = []
+    
+    def __len__(self) -> int:
+        return len(self.batch)
+    
+    def add(self, values: List[Any]) -> None:
+        if values[0] in self.known:
+            self.progress.add("중복 건너뜀")
+            return
+        self.known.add(values[0])
+        self.batch.append(values)
+    
+    def flush(self) -> None:
+        if self.batch and not self.dry_run:
+            self.manager.append_member_rows(self.batch)
+            week_name, _, _ = self.manager.get_current_week_info()
+            self.manager.record_ledger([
+                {
+                    "주차": week_name,
+                    "사용자ID": user_id,
+                    "사용자명": user_name,
+                    "종류": LEDGER_OPENING,
+                    "금액": total_penalty,
+                    "비고": "가져온 누적벌금"
+                }
+                for user_id, user_name, total_penalty, _ in self.batch if total_penalty
+            ], sync_members=False)
+            self.manager.flush()
+        self.progress.add("추가", len(self.batch))
+        self.batch = []
+
+
+def run_import(manager: SheetsManager, args: argparse.Namespace) -> None:
+    fmt = detect_format(args.path, args.format)
+    validate = validate_record if args.table == "records" else validate_member
+    checkpoint = Checkpoint(args.checkpoint or f"{args.path}.checkpoint", {
+        "command": "import",
+        "table": args.table,
+        "path": os.path.abspath(args.path),
+        "size": os.path.getsize(args.path),
+        "format": fmt,
+        "guild": args.guild
+    }, restart=args.restart or args.dry_run)
+    done = checkpoint.state.get("rows_done", 0)
+    
+    progress = Progress(
+        f"{args.table} 가져오기" + (" (검사만)" if args.dry_run else ""),
+        os.path.getsize(args.path)
+    )
+    importer_class = RecordImporter if args.table == "records" else MemberImporter
+    importer = importer_class(manager, progress, args.dry_run)
+    rejected_path = f"{args.path}.rejected.jsonl"
+    rejected = open(rejected_path, "a" if done else "w", encoding="utf-8")
+    
+    def commit(consumed: int, position: int) -> None:
+        importer.flush()
+        if not args.dry_run:
+            checkpoint.save(rows_done=consumed)
+        progress.report(position)
+    
+    consumed = 0
+    try:
+        with open(args.path, "rb") as f:
+            for line_number, row in read_rows(f, fmt):
+                consumed += 1
+                if consumed <= done:
+                    continue  # 이전 실행에서 반영된 행
+                try:
+                    importer.add(validate(row))
+                except ValueError as e:
+                    progress.add("오류")
+                    rejected.write(json.dumps(
+                        {"line": line_number, "error": str(e), "row": row}, ensure_ascii=False
+                    ) + "\n")
+                if len(importer) >= args.chunk_rows:
+                    commit(consumed, f.tell())
+            commit(consumed, f.tell())
+    finally:
+        rejected.close()
+    
+    progress.report(force=True)
+    if not args.dry_run:
+        checkpoint.finish()
+    if progress.counts.get("오류"):
+        print(f"⚠️ 검사를 통과하지 못한 행 {progress.counts['오류']:,}개: {rejected_path}")
+    else:
+        os.remove(rejected_path)
+    print(f"✅ {args.table} 가져오기 완료: 추가 {progress.counts.get('추가', 0):,}행")
+    if progress.counts.get("추가") and not args.dry_run:
+        print("ℹ️ 봇이 실행 중이면 Discord에서 /시트새로고침을 실행해 가져온 내용을 봇에 반영하세요.")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="운동인증방 데이터 내보내기/가져오기")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    import_note = (
+        "봇이 실행 중이면 봇을 멈춘 뒤 가져오거나, 가져온 직후 Discord에서 /시트새로고침을 실행하세요. "
+        "그러지 않으면 봇이 가져온 멤버와 이월 벌금을 모르는 채로 멤버를 다시 등록하거나 "
+        "누적벌금을 예전 합계로 덮어쓸 수 있습니다."
+    )
+    for command, help_text in (("export", "시트를 파일로 내보내기"), ("import", "파일에서 시트로 가져오기")):
+        sub = subparsers.add_parser(command, help=help_text, epilog=import_note if command == "import" else None)
+        sub.add_argument("table", choices=sorted(TABLES), help="대상 (records: 인증기록, members: 멤버)")
+        sub.add_argument("path", help="CSV/JSONL 파일 경로")
+        sub.add_argument("--format", choices=("csv", "jsonl"), help="파일 형식 (기본: 확장자로 판단)")
+        sub.add_argument("--guild", type=int, help="서버 ID (기본: 첫 번째 방)")
+        sub.add_argument("--chunk-rows", type=int, default=500, help="한 번에 읽거나 추가할 행 수")
+        sub.add_argument(
+            "--per-minute", type=int,
+            default=max(1, min(SHEETS_READ_PER_MINUTE, SHEETS_WRITE_PER_MINUTE) // 2),
+            help="분당 Sheets 요청 수 (기본: 설정 한도의 절반, 나머지는 실행 중인 봇 몫)"
+        )
+        sub.add_argument("--checkpoint", help="체크포인트 파일 (기본: <파일>.checkpoint)")
+        sub.add_argument("--restart", action="store_true", help="체크포인트를 무시하고 처음부터")
+        if command == "export":
+            sub.add_argument("--from-week", help="이 주차부터 (인증기록만, 예: 2025-W01)")
+            sub.add_argument("--to-week", help="이 주차까지 (인증기록만)")
+        else:
+            sub.add_argument("--dry-run", action="store_true", help="시트에 쓰지 않고 검사만")
+    
+    args = parser.parse_args(argv)
+    if args.chunk_rows < 1:
+        parser.error("--chunk-rows는 1 이상이어야 합니다")
+    for option in ("from_week", "to_week"):
+        value = getattr(args, option, None)
+        if value and week_number(value) is None:
+            parser.error(f"주차 형식이 잘못되었습니다 (예: 2025-W10): {value}")
+    if args.guild is not None and args.guild not in GUILDS:
+        parser.error(f"설정되지 않은 서버 ID입니다: {args.guild}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if STORAGE_BACKEND == "sqlite":
+        print("⚠️ STORAGE_BACKEND=sqlite: 스프레드시트만 읽고 씁니다. 가져온 기록은 로컬 DB에 반영되지 않습니다.")
+    
+    # 이 프로세스의 요청 한도 (봇과 같은 Google Cloud 프로젝트 할당량을 나눠 씀)
+    quota.read_bucket = TokenBucket(args.per_minute)
+    quota.write_bucket = TokenBucket(args.per_minute)
+    
+    manager = get_sheets_manager(args.guild)
+    try:
+        if args.command == "export":
+            run_export(manager, args)
+        else:
+            run_import(manager, args)
+    except KeyboardInterrupt:
+        print("⏸️ 중단됨. 같은 명령을 다시 실행하면 체크포인트부터 이어서 진행합니다.")
+        sys.exit(130)
+    finally:
+        manager.close()
+
+
+if __name__ == "__main__":
+    main()
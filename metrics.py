@@ -0,0 +1,211 @@
+"""
+봇 내부 계측 모듈
+호출 횟수 카운터, 지연시간 히스토그램, 캐시 적중률 집계
+"""
+import asyncio
+import bisect
+import contextvars
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# 히스토그램 구간 상한 (ms)
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+# 현재 처리 중인 커맨드의 저장소 대기 시간 누적 (초)
+_storage_time: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar(
+    "storage_time", default=None
+)
+# 현재 처리 중인 커맨드 이름 (timed_command가 설정)
+_command_name: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "command_name", default=None
+)
+
+
+class Histogram:
+    """고정 구간 지연시간 히스토그램 (백분위는 구간 상한으로 근사)"""
+    
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def observe(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+    
+    def percentile(self, pct: float) -> float:
+        if not self.count:
+            return 0.0
+        target = pct / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else self.max
+        return self.max
+    
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 1) if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max, 1)
+        }
+
+
+class Metrics:
+    """프로세스 전체 계측값 저장소 (스레드 안전)"""
+    
+    def __init__(self):
+        self.started = time.time()
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+    
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+    
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds * 1000)
+    
+    def cache(self, name: str, hit: bool) -> None:
+        """캐시 적중/실패 기록"""
+        self.incr(f"cache.{name}.{'hit' if hit else 'miss'}")
+    
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """현재 계측값 (카운터, 히스토그램 요약, 캐시 적중률)"""
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {name: h.summary() for name, h in self.histograms.items()}
+        
+        caches = {}
+        for name in counters:
+            if name.startswith("cache.") and name.endswith(".hit"):
+                cache = name[len("cache."):-len(".hit")]
+                hits = counters[name]
+                misses = counters.get(f"cache.{cache}.miss", 0)
+                caches[cache] = round(hits / (hits + misses), 3) if hits + misses else 0.0
+        for name in counters:
+            if name.startswith("cache.") and name.endswith(".miss"):
+                caches.setdefault(name[len("cache."):-len(".miss")], 0.0)
+        
+        return {
+            "uptime_s": int(time.time() - self.started),
+            "counters": counters,
+            "histograms": histograms,
+            "cache_hit_rate": caches
+        }
+    
+    def log_line(self) -> str:
+        """구조화 로그 한 줄 (JSON)"""
+        return json.dumps({"event": "metrics", **self.snapshot()}, ensure_ascii=False, sort_keys=True)
+    
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.time()
+            self.counters.clear()
+            self.histograms.clear()
+
+
+metrics = Metrics()
+
+
+def add_storage_time(seconds: float) -> None:
+    """저장소 호출 시간을 현재 커맨드에 합산"""
+    spent = _storage_time.get()
+    if spent is not None:
+        spent[0] += seconds
+
+
+def record_command_error() -> None:
+    """현재 커맨드의 오류 수 증가
+    
+    핸들러가 예외를 잡아 사용자에게 오류로 응답하면 timed_command까지 예외가 오지 않으므로
+    except 블록에서 직접 호출해 /봇상태 오류 수에 반영한다.
+    """
+    name = _command_name.get()
+    if name is not None:
+        metrics.incr(f"command.{name}.errors")
+
+
+def timed(name: str):
+    """함수 실행 시간/호출 수/오류 수 기록 데코레이터 (동기/비동기 모두 지원)"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                metrics.incr(f"{name}.calls")
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except BaseException:
+                    metrics.incr(f"{name}.errors")
+                    raise
+                finally:
+                    metrics.observe(name, time.perf_counter() - started)
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics.incr(f"{name}.calls")
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                metrics.incr(f"{name}.errors")
+                raise
+            finally:
+                metrics.observe(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def timed_command(name: str):
+    """슬래시 커맨드 계측 데코레이터
+    
+    전체 처리 시간과 함께 저장소 대기 시간, 나머지(Discord 응답 대기 등) 시간을 나눠 기록한다.
+    discord.py가 파라미터를 읽을 수 있도록 원래 함수의 시그니처를 유지한다.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            metrics.incr(f"command.{name}.calls")
+            spent = [0.0]
+            token = _storage_time.set(spent)
+            name_token = _command_name.set(name)
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except BaseException:
+                metrics.incr(f"command.{name}.errors")
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                _storage_time.reset(token)
+                _command_name.reset(name_token)
+                metrics.observe(f"command.{name}", elapsed)
+                metrics.observe(f"command.{name}.storage", spent[0])
+                metrics.observe(f"command.{name}.discord", max(0.0, elapsed - spent[0]))
+        return wrapper
+    return decorator
@@ -0,0 +1,171 @@
+"""
+Discord 알림 전송 모듈
+메시지/임베드 길이 제한에 맞춰 나누고 채널별 전송 속도를 조절
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence
+
+import discord
+
+from metrics import metrics
+
+# Discord 제한
+CONTENT_LIMIT = 2000
+FIELD_VALUE_LIMIT = 1024
+FIELDS_PER_EMBED = 25
+EMBED_TOTAL_LIMIT = 6000
+EMBEDS_PER_MESSAGE = 10
+
+# 채널당 메시지 전송 한도 (5초에 5개)
+CHANNEL_RATE = 5
+CHANNEL_PERIOD = 5.0
+
+
+def chunk_lines(lines: Iterable[str], limit: int, separator: str = "\n") -> List[str]:
+    """줄 단위로 limit 글자 이하 덩어리로 묶기 (한 줄이 너무 길면 잘라냄)"""
+    chunks: List[str] = []
+    current = ""
+    for line in lines:
+        if len(line) > limit:
+            line = line[:limit - 1] + "…"
+        if current and len(current) + len(separator) + len(line) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}{separator}{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def add_chunked_field(embed: discord.Embed, name: str, lines: Sequence[str], inline: bool = False) -> int:
+    """줄 목록을 1024자 이하 필드 여러 개로 나눠 추가 (추가한 필드 수 반환)"""
+    chunks = chunk_lines(lines, FIELD_VALUE_LIMIT)
+    for i, chunk in enumerate(chunks):
+        field_name = name if len(chunks) == 1 else f"{name} ({i + 1}/{len(chunks)})"
+        embed.add_field(name=field_name, value=chunk, inline=inline)
+    return len(chunks)
+
+
+def split_embed(embed: discord.Embed) -> List[discord.Embed]:
+    """필드 수/전체 길이 제한을 넘는 임베드를 여러 개로 나누기
+    
+    제목/설명/푸터는 첫 임베드에만 남기고 나머지 임베드는 필드만 이어 받는다.
+    """
+    fields = list(embed.fields)
+    header = len(embed.title or "") + len(embed.description or "") + len(embed.footer.text or "")
+    embeds = [embed.copy()]
+    embeds[0].clear_fields()
+    size = header
+    for field in fields:
+        field_size = len(field.name or "") + len(field.value or "")
+        current = embeds[-1]
+        if len(current.fields) >= FIELDS_PER_EMBED or size + field_size > EMBED_TOTAL_LIMIT:
+            current = discord.Embed(color=embed.color)
+            embeds.append(current)
+            size = 0
+        current.add_field(name=field.name, value=field.value, inline=field.inline)
+        size += field_size
+    return embeds
+
+
+class MessageDispatcher:
+    """채널별 전송 속도를 지키며 메시지를 최소 횟수로 보내는 전송기
+    
+    - 본문은 2000자, 임베드는 메시지당 10개/6000자 제한에 맞춰 묶는다
+    - 같은 채널로 가는 전송은 순서대로 하나씩 보내고, 5초에 5개를 넘지 않게 기다린다
+    - 그래도 429(RateLimited)를 받으면 안내된 시간만큼 기다린 뒤 다시 보낸다
+    """
+    
+    def __init__(self, rate: int = CHANNEL_RATE, period: float = CHANNEL_PERIOD, max_retries: int = 3):
+        self.rate = rate
+        self.period = period
+        self.max_retries = max_retries
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._sent: Dict[int, Deque[float]] = {}
+    
+    @staticmethod
+    def pack(
+        content_chunks: Sequence[str] = (),
+        embeds: Sequence[discord.Embed] = ()
+    ) -> List[Dict[str, object]]:
+        """본문 덩어리와 임베드를 가능한 적은 수의 메시지로 묶기"""
+        messages: List[Dict[str, object]] = []
+        for chunk in content_chunks:
+            messages.append({"content": chunk, "embeds": []})
+        
+        size = 0
+        target = 0
+        for embed in embeds:
+            if target >= len(messages):
+                messages.append({"content": None, "embeds": []})
+                size = 0
+            current = messages[target]["embeds"]
+            embed_size = len(embed)
+            if current and (len(current) >= EMBEDS_PER_MESSAGE or size + embed_size > EMBED_TOTAL_LIMIT):
+                target += 1
+                size = 0
+                if target >= len(messages):
+                    messages.append({"content": None, "embeds": []})
+                current = messages[target]["embeds"]
+            current.append(embed)
+            size += embed_size
+        return messages
+    
+    async def _wait_turn(self, channel_id: int) -> None:
+        """채널 전송 한도에 걸리면 가장 오래된 전송이 창 밖으로 나갈 때까지 대기"""
+        sent = self._sent.setdefault(channel_id, deque())
+        while True:
+            now = time.monotonic()
+            while sent and now - sent[0] >= self.period:
+                sent.popleft()
+            if len(sent) < self.rate:
+                sent.append(now)
+                return
+            wait = self.period - (now - sent[0])
+            metrics.observe("discord.rate_wait", wait)
+            await asyncio.sleep(wait)
+    
+    async def _send_one(self, channel: discord.abc.Messageable, content: Optional[str], embeds: List[discord.Embed]) -> None:
+        channel_id = getattr(channel, "id", 0)
+        attempt = 0
+        while True:
+            await self._wait_turn(channel_id)
+            try:
+                with metrics.timer("discord.send"):
+                    if embeds:
+                        await channel.send(content=content, embeds=embeds)
+                    else:
+                        await channel.send(content=content)
+                metrics.incr("discord.messages")
+                return
+            except discord.RateLimited as e:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                print(f"⏳ Discord 전송 제한, {e.retry_after:.1f}초 후 재시도 ({attempt}/{self.max_retries})")
+                await asyncio.sleep(e.retry_after)
+    
+    async def send(
+        self,
+        channel: discord.abc.Messageable,
+        content_lines: Sequence[str] = (),
+        embeds: Sequence[discord.Embed] = ()
+    ) -> int:
+        """본문 줄과 임베드를 묶어 전송 (보낸 메시지 수 반환)"""
+        content_chunks = chunk_lines(content_lines, CONTENT_LIMIT)
+        split: List[discord.Embed] = []
+        for embed in embeds:
+            split.extend(split_embed(embed))
+        messages = self.pack(content_chunks, split)
+        
+        lock = self._locks.setdefault(getattr(channel, "id", 0), asyncio.Lock())
+        async with lock:
+            for message in messages:
+                await self._send_one(channel, message["content"], message["embeds"])
+        return len(messages)
+
+
+dispatcher = MessageDispatcher()
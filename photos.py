@@ -0,0 +1,354 @@
+"""
+인증 사진 저장 모듈
+첨부 사진을 나눠 받아 내용 해시 기준으로 저장하고 재사용/유사 사진을 찾는다
+"""
+import asyncio
+import functools
+import hashlib
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+import discord
+
+from config import (
+    PHOTO_STORE_DIR,
+    PHOTO_MAX_BYTES,
+    PHOTO_HASH_WORKERS,
+    PHOTO_SIMILAR_DISTANCE
+)
+from metrics import metrics
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow가 없으면 완전히 같은 사진만 찾음
+    Image = None
+
+CHUNK_SIZE = 64 * 1024
+# 업로드 한도를 넘는 사진을 다시 올릴 때 줄이는 긴 변 길이(px)
+UPLOAD_MAX_SIDE = 2048
+# 인증기록 이미지URL 열 값: <사진을 다시 올린 메시지 링크>#<SHA-256>[-<dHash>]<확장자>
+# 메시지 링크는 만료되지 않고, # 뒤 해시로 재배포 뒤에도 재사용 사진 색인을 다시 만든다
+PHOTO_URL_PATTERN = re.compile(r"#([0-9a-f]{64})(?:-([0-9a-f]{16}))?(\.\w+)?$")
+# 예전 형식 (photo:<SHA-256><확장자>, 로컬 저장 폴더 기준)
+LEGACY_REF_PATTERN = re.compile(r"^photo:([0-9a-f]{64})(\.\w+)?$")
+
+# 64비트 dHash를 8비트씩 8구간으로 나눠 색인
+# 해밍 거리가 7 이하인 두 해시는 적어도 한 구간이 완전히 같다
+DHASH_BANDS = 8
+
+
+class PhotoError(Exception):
+    """사진을 받을 수 없을 때 (형식/크기/다운로드 실패)"""
+
+
+def file_sha256(path: str) -> str:
+    """파일 SHA-256 (조각 단위로 읽음)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def image_dhash(path: str) -> Optional[int]:
+    """64비트 차이 해시 (Pillow가 없거나 이미지를 열 수 없으면 None)"""
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as image:
+            # JPEG는 축소 디코딩으로 전체 해상도를 메모리에 올리지 않음
+            image.draft("L", (64, 64))
+            pixels = list(image.convert("L").resize((9, 8)).getdata())
+    except Exception:
+        return None
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def _hash_file(path: str) -> Dict[str, Any]:
+    with metrics.timer("photos.hash"):
+        return {"sha256": file_sha256(path), "dhash": image_dhash(path)}
+
+
+def photo_url(base_url: str, photo: Dict[str, Any]) -> str:
+    """이미지URL 열에 남길 값 (base_url 뒤에 해시와 확장자를 붙임)"""
+    dhash = f"-{photo['dhash']:016x}" if photo["dhash"] is not None else ""
+    return f"{base_url.split('#', 1)[0]}#{photo['sha256']}{dhash}{photo['ext']}"
+
+
+def parse_photo_url(url: Any) -> Optional[Dict[str, Any]]:
+    """이미지URL 열 값에서 사진 해시 읽기 (photo_url 형식이나 예전 photo: 참조가 아니면 None)"""
+    url = str(url or "")
+    match = PHOTO_URL_PATTERN.search(url)
+    if match:
+        return {"sha256": match.group(1), "dhash": int(match.group(2), 16) if match.group(2) else None}
+    match = LEGACY_REF_PATTERN.match(url)
+    if match:
+        return {"sha256": match.group(1), "dhash": None}
+    return None
+
+
+def _shrink_image(path: str, target: str, limit: int) -> Optional[str]:
+    """업로드 한도에 맞게 줄인 JPEG 만들기 (Pillow가 없거나 줄여도 넘으면 None)"""
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as image:
+            image.draft("RGB", (UPLOAD_MAX_SIDE, UPLOAD_MAX_SIDE))
+            image = image.convert("RGB")
+            image.thumbnail((UPLOAD_MAX_SIDE, UPLOAD_MAX_SIDE))
+            image.save(target, "JPEG", quality=85)
+    except Exception:
+        return None
+    return target if os.path.getsize(target) <= limit else None
+
+
+def _store_file(tmp_path: str, path: str) -> None:
+    """받은 임시 파일을 내용 해시 경로로 옮기기 (이미 있으면 임시 파일만 지움)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+
+
+def _remove(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _bands(dhash: int) -> List[int]:
+    return [(dhash >> (8 * i)) & 0xFF for i in range(DHASH_BANDS)]
+
+
+class PhotoIndex:
+    """사진 해시 색인 (메모리)
+    
+    완전히 같은 사진은 SHA-256으로, 비슷한 사진은 dHash 해밍 거리로 찾는다.
+    dHash는 구간별 색인으로 후보만 추려 비교한다.
+    로컬 디스크는 재배포 때 지워지므로 파일에 남기지 않고, 방마다 인증기록의
+    이미지URL 값(parse_photo_url)으로 처음 한 번 채운다.
+    """
+    
+    def __init__(self):
+        self.entries: List[Dict[str, Any]] = []
+        self._by_sha: Dict[tuple, List[int]] = {}
+        self._by_band: Dict[tuple, List[int]] = {}
+        self._lock = threading.Lock()
+    
+    def _add(self, entry: Dict[str, Any]) -> None:
+        position = len(self.entries)
+        self.entries.append(entry)
+        guild_id = entry.get("guild_id")
+        self._by_sha.setdefault((guild_id, entry["sha256"]), []).append(position)
+        if entry.get("dhash") is not None:
+            dhash = int(entry["dhash"], 16)
+            for i, band in enumerate(_bands(dhash)):
+                self._by_band.setdefault((guild_id, i, band), []).append(position)
+    
+    def find(self, guild_id: Optional[int], sha256: str, dhash: Optional[int]) -> Optional[Dict[str, Any]]:
+        """이전에 올라온 같은 사진/비슷한 사진 찾기 (가장 가까운 것 하나)"""
+        with self._lock:
+            exact = self._by_sha.get((guild_id, sha256))
+            if exact:
+                return {"kind": "exact", "distance": 0, "entry": self.entries[exact[0]]}
+            if dhash is None:
+                return None
+            
+            candidates = set()
+            for i, band in enumerate(_bands(dhash)):
+                candidates.update(self._by_band.get((guild_id, i, band), ()))
+            best = None
+            for position in candidates:
+                entry = self.entries[position]
+                distance = bin(int(entry["dhash"], 16) ^ dhash).count("1")
+                if distance <= PHOTO_SIMILAR_DISTANCE and (best is None or distance < best["distance"]):
+                    best = {"kind": "similar", "distance": distance, "entry": entry}
+            return best
+    
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._add(entry)
+    
+    def load(self, guild_id: Optional[int], rows: List[tuple]) -> int:
+        """인증기록 (주차, 사용자ID, 이미지URL) 목록에서 사진 해시 채우기 (채운 수 반환)"""
+        count = 0
+        with self._lock:
+            for week_name, user_id, url in rows:
+                parsed = parse_photo_url(url)
+                if parsed is None:
+                    continue
+                self._add({
+                    "sha256": parsed["sha256"],
+                    "dhash": f"{parsed['dhash']:016x}" if parsed["dhash"] is not None else None,
+                    "guild_id": guild_id,
+                    "user_id": str(user_id),
+                    "week": week_name,
+                    "url": url
+                })
+                count += 1
+        return count
+
+
+class PhotoStore:
+    """인증 사진 저장소
+    
+    사진은 조각 단위로 임시 파일에 받은 뒤 해시를 계산해
+    <저장 폴더>/<해시 앞 2자리>/<해시>.<확장자> 로 옮긴다. 같은 사진은 한 번만 저장된다.
+    로컬 저장 폴더는 해시 계산과 다시 올리기용 임시 보관소이고, 오래 남는 사본은
+    봇이 사진을 다시 올린 Discord 메시지다 (이미지URL에는 그 메시지 링크를 남김).
+    파일 입출력은 모두 해시 스레드풀에서 한다.
+    """
+    
+    def __init__(self, root: str = PHOTO_STORE_DIR, workers: int = PHOTO_HASH_WORKERS):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self.index = PhotoIndex()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="photos")
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loads: Dict[Optional[int], asyncio.Future] = {}
+    
+    async def _io(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+    
+    async def _download(self, url: str, path: str) -> int:
+        """사진을 조각 단위로 받아 파일에 쓰기 (받은 바이트 수 반환)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+        size = 0
+        with metrics.timer("photos.download"):
+            async with self._session.get(url) as response:
+                if response.status != 200:
+                    raise PhotoError(f"사진을 받지 못했습니다 (HTTP {response.status})")
+                f = await self._io(open, path, "wb")
+                try:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > PHOTO_MAX_BYTES:
+                            raise PhotoError("사진 용량이 너무 큽니다.")
+                        await self._io(f.write, chunk)
+                finally:
+                    await self._io(f.close)
+        return size
+    
+    async def load_guild(self, guild_id: Optional[int], load_rows) -> None:
+        """방의 사진 색인을 인증기록에서 채우기 (방마다 한 번, 진행 중이면 기다림)
+        
+        load_rows는 (주차, 사용자ID, 이미지URL) 목록을 돌려주는 코루틴 함수다.
+        실패하면 다음 호출에서 다시 시도한다.
+        """
+        future = self._loads.get(guild_id)
+        if future is None:
+            async def load() -> None:
+                rows = await load_rows()
+                count = self.index.load(guild_id, rows)
+                print(f"📷 사진 색인 준비 ({guild_id}): {count}장")
+            future = self._loads[guild_id] = asyncio.ensure_future(load())
+        try:
+            await asyncio.shield(future)
+        except Exception:
+            if self._loads.get(guild_id) is future:
+                del self._loads[guild_id]
+            raise
+    
+    async def ingest(self, attachment: discord.Attachment, guild_id: Optional[int]) -> Dict[str, Any]:
+        """첨부 사진/영상 저장 후 해시와 중복 여부 반환 (색인 등록은 remember에서)
+        
+        영상은 dHash를 만들 수 없으므로 완전히 같은 파일만 찾는다.
+        """
+        if not (attachment.content_type or "").startswith(("image/", "video/")):
+            raise PhotoError("이미지 또는 영상 파일만 첨부할 수 있습니다.")
+        if attachment.size > PHOTO_MAX_BYTES:
+            raise PhotoError(f"사진은 {PHOTO_MAX_BYTES // (1024 * 1024)}MB 이하만 첨부할 수 있습니다.")
+        
+        tmp_path = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        try:
+            try:
+                size = await self._download(attachment.url, tmp_path)
+            except aiohttp.ClientError as e:
+                raise PhotoError(f"사진을 받지 못했습니다: {e}") from e
+            hashes = await self._io(_hash_file, tmp_path)
+        except BaseException:
+            await self._io(_remove, tmp_path)
+            raise
+        
+        sha256 = hashes["sha256"]
+        ext = os.path.splitext(attachment.filename)[1].lower() or ".img"
+        path = os.path.join(self.root, sha256[:2], sha256 + ext)
+        await self._io(_store_file, tmp_path, path)
+        
+        match = self.index.find(guild_id, sha256, hashes["dhash"])
+        if match:
+            metrics.incr(f"photos.{match['kind']}")
+        metrics.incr("photos.ingested")
+        return {
+            "sha256": sha256,
+            "dhash": hashes["dhash"],
+            "path": path,
+            "ext": ext,
+            "size": size,
+            "is_image": attachment.content_type.startswith("image/"),
+            "match": match
+        }
+    
+    async def upload_file(self, photo: Dict[str, Any], limit: int) -> Optional[discord.File]:
+        """다시 올릴 파일 (discord.File이 경로에서 직접 읽음)
+        
+        limit(방의 업로드 한도)를 넘는 사진은 줄인 JPEG로 올리고,
+        줄일 수 없으면(영상, Pillow 없음) None.
+        """
+        path = photo["path"]
+        if photo["size"] > limit:
+            if not photo["is_image"]:
+                return None
+            target = os.path.join(self.root, "upload", photo["sha256"] + ".jpg")
+            await self._io(functools.partial(os.makedirs, os.path.dirname(target), exist_ok=True))
+            path = await self._io(_shrink_image, photo["path"], target, limit)
+            if path is None:
+                return None
+            metrics.incr("photos.shrunk")
+        return discord.File(path, filename=os.path.basename(path))
+    
+    def remember(self, photo: Dict[str, Any], guild_id: Optional[int], user_id: str, week_name: str, url: str) -> None:
+        """인증이 저장된 사진을 색인에 추가"""
+        self.index.add({
+            "sha256": photo["sha256"],
+            "dhash": f"{photo['dhash']:016x}" if photo["dhash"] is not None else None,
+            "guild_id": guild_id,
+            "user_id": user_id,
+            "week": week_name,
+            "url": url
+        })
+    
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+        self._executor.shutdown(wait=False)
+
+
+_photo_store: Optional[PhotoStore] = None
+
+
+def get_photo_store() -> PhotoStore:
+    """PhotoStore 싱글톤 반환"""
+    global _photo_store
+    if _photo_store is None:
+        _photo_store = PhotoStore()
+    return _photo_store
+
+
+async def close_photo_store() -> None:
+    """봇 종료 시 다운로드 세션과 해시 스레드풀 정리"""
+    if _photo_store is not None:
+        await _photo_store.close()
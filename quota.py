@@ -0,0 +1,186 @@
+"""
+Google Sheets API 할당량 관리 모듈
+토큰 버킷 기반 요청 제한, 429 재시도, 동일 읽기 요청 병합
+"""
+import random
+import threading
+import time
+from concurrent.futures import Future
+from http import HTTPStatus
+from typing import Optional, Dict, Any
+
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+from requests import Response
+
+from metrics import metrics
+from config import (
+    SHEETS_READ_PER_MINUTE,
+    SHEETS_WRITE_PER_MINUTE,
+    SHEETS_MAX_RETRIES
+)
+
+# 재시도 대기 시간 (초)
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 32.0
+
+
+class SheetsQuotaError(Exception):
+    """재시도 후에도 Sheets API 할당량 초과가 계속될 때 발생"""
+
+
+class TokenBucket:
+    """분당 요청 수 제한용 토큰 버킷
+    
+    토큰이 없으면 다음 토큰이 찰 때까지 호출한 스레드를 재운다.
+    """
+    
+    def __init__(self, per_minute: int):
+        self.rate = per_minute / 60.0  # 초당 충전량
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def acquire(self) -> float:
+        """토큰 1개 사용 (기다린 시간 반환)"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+    
+    def drain(self) -> None:
+        """남은 토큰 비우기 (서버가 429를 돌려준 경우 로컬 추정치 보정)"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+# 할당량은 서비스 계정(프로젝트) 단위이므로 프로세스 전체가 공유
+read_bucket = TokenBucket(SHEETS_READ_PER_MINUTE)
+write_bucket = TokenBucket(SHEETS_WRITE_PER_MINUTE)
+
+_inflight: Dict[Any, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _is_quota_error(error: APIError) -> bool:
+    """할당량 초과 응답인지 확인 (요청이 처리되지 않았음이 확실함)"""
+    if error.code == HTTPStatus.TOO_MANY_REQUESTS:
+        return True
+    # Drive API는 할당량 초과를 403 usageLimits로 알려줌
+    errors = error.error.get("errors") or []
+    return error.code == HTTPStatus.FORBIDDEN and bool(errors) and errors[0].get("domain") == "usageLimits"
+
+
+def _is_retryable(error: APIError, write: bool = False) -> bool:
+    """잠시 후 다시 시도하면 성공할 수 있는 오류인지 확인
+    
+    쓰기 요청은 할당량 초과일 때만 다시 보낸다. 시간 초과/5xx는 서버에 이미 반영됐을 수 있어
+    다시 보내면 행이 두 번 추가될 수 있으므로 호출한 쪽에 오류를 그대로 알린다.
+    """
+    if _is_quota_error(error):
+        return True
+    if write:
+        return False
+    return error.code == HTTPStatus.REQUEST_TIMEOUT or error.code >= HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def is_unapplied_error(error: BaseException) -> bool:
+    """쓰기 요청이 서버에 반영되지 않았음이 확실한 오류인지 (할당량 초과)
+    
+    그 밖의 쓰기 실패는 반영됐을 수도 있으므로 다시 보내기 전에 시트를 확인해야 한다.
+    """
+    if isinstance(error, SheetsQuotaError):
+        return True
+    return isinstance(error, APIError) and _is_quota_error(error)
+
+
+def _backoff_delay(attempt: int, error: APIError) -> float:
+    """지수 백오프 + 지터 (Retry-After 헤더가 있으면 우선)"""
+    retry_after = error.response.headers.get("Retry-After") if error.response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+
+class QuotaAwareHTTPClient(HTTPClient):
+    """할당량을 고려하는 gspread HTTP 클라이언트
+    
+    - 읽기(GET)/쓰기 요청을 각각 토큰 버킷으로 제한
+    - 429/5xx 응답은 지터가 들어간 지수 백오프로 재시도 (쓰기는 할당량 초과일 때만)
+    - 이미 진행 중인 동일한 GET 요청이 있으면 새로 보내지 않고 결과를 함께 사용
+    """
+    
+    def request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Any] = None,
+        *args: Any,
+        **kwargs: Any
+    ) -> Response:
+        if method.lower() != "get":
+            return self._send(write_bucket, method, endpoint, params, *args, **kwargs)
+        
+        key = (endpoint, repr(params))
+        with _inflight_lock:
+            future = _inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                _inflight[key] = future
+        if not owner:
+            metrics.incr("sheets_api.coalesced")
+            return future.result()
+        
+        try:
+            response = self._send(read_bucket, method, endpoint, params, *args, **kwargs)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with _inflight_lock:
+                _inflight.pop(key, None)
+    
+    def _send(self, bucket: TokenBucket, *args: Any, **kwargs: Any) -> Response:
+        write = bucket is not read_bucket
+        kind = "write" if write else "read"
+        attempt = 0
+        while True:
+            metrics.observe("sheets_api.quota_wait", bucket.acquire())
+            metrics.incr(f"sheets_api.{kind}")
+            try:
+                with metrics.timer(f"sheets_api.{kind}"):
+                    return super().request(*args, **kwargs)
+            except APIError as e:
+                metrics.incr(f"sheets_api.status.{e.code}")
+                if not _is_retryable(e, write):
+                    raise
+                if e.code == HTTPStatus.TOO_MANY_REQUESTS:
+                    bucket.drain()
+                if attempt >= SHEETS_MAX_RETRIES:
+                    if e.code == HTTPStatus.TOO_MANY_REQUESTS:
+                        raise SheetsQuotaError("Google Sheets 요청 한도를 초과했습니다.") from e
+                    raise
+                delay = _backoff_delay(attempt, e)
+                attempt += 1
+                print(f"⏳ Sheets API {e.code} 응답, {delay:.1f}초 후 재시도 ({attempt}/{SHEETS_MAX_RETRIES})")
+                time.sleep(delay)
@@ -0,0 +1,207 @@
+"""
+운동 인증 규칙 모듈
+config의 EXERCISE_RULES/INVALID_HOURS를 한 번 컴파일해 인증마다 적용하고,
+지난 기록은 열 단위로 한 번에 다시 검사한다
+"""
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import urlparse
+
+from config import EXERCISE_RULES, INVALID_HOURS
+
+# 최소값 규칙: 규칙 키 -> (기록 열, 이름, 단위)
+MINIMUM_RULES = {
+    "min_minutes": ("운동시간", "운동시간", "분"),
+    "min_speed_kmh": ("속도", "속도", "km/h"),
+    "min_kcal": ("칼로리", "소모 칼로리", "kcal"),
+}
+
+# 첨부 규칙: 규칙 키 -> 안내 문구
+ATTACHMENT_RULES = {
+    "requires_video": "운동 영상 첨부 필요",
+    "requires_timestamp": "타임스탬프 사진 첨부 필요",
+}
+
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".webm", ".mkv", ".avi", ".m4v"}
+
+NUMERIC_COLUMNS = ("운동시간", "속도", "칼로리")
+
+TIME_PATTERN = re.compile(r"(\d{1,2}):\d{2}")
+
+
+def _number(value: Any) -> Optional[float]:
+    """기록 셀 값을 숫자로 변환 (빈 값/잘못된 값은 None)"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _hour(value: Any) -> Optional[int]:
+    """시각 값의 시(hour) (알 수 없으면 None)
+    
+    봇은 'YYYY-MM-DD HH:MM:SS'로 쓰지만 시트가 '2025. 1. 5 오후 3:04:05'처럼
+    표시 형식으로 돌려줄 수 있어 시:분 부분과 오전/오후 표기를 찾는다.
+    """
+    if isinstance(value, datetime):
+        return value.hour
+    text = str(value or "")
+    match = TIME_PATTERN.search(text)
+    if match is None:
+        return None
+    hour = int(match.group(1)) % 24
+    if ("오후" in text or "PM" in text.upper()) and hour < 12:
+        hour += 12
+    elif ("오전" in text or "AM" in text.upper()) and hour == 12:
+        hour = 0
+    return hour
+
+
+def _is_video(url: Any) -> bool:
+    parsed = urlparse(str(url or ""))
+    # 봇이 다시 올린 사진의 메시지 링크는 원본 확장자를 # 뒤에 둠
+    return any(
+        os.path.splitext(part)[1].lower() in VIDEO_EXTENSIONS for part in (parsed.path, parsed.fragment)
+    )
+
+
+def _hour_set(invalid_hours: tuple[int, int]) -> frozenset:
+    """(시작, 끝) 시간대를 불인정 시(hour) 집합으로 변환 (자정을 넘는 구간 지원)"""
+    start, end = invalid_hours
+    if start <= end:
+        return frozenset(range(start, end))
+    return frozenset(list(range(start, 24)) + list(range(0, end)))
+
+
+class RuleEngine:
+    """운동 인증 규칙 검사기
+    
+    규칙 dict는 생성 시 (열, 최소값, 안내 문구) 목록으로 컴파일되고,
+    알 수 없는 규칙 키가 있으면 바로 ValueError를 낸다.
+    한 건 검사(check)와 여러 주차 재검사(audit)는 같은 열 단위 검사(violations)를 쓴다.
+    """
+    
+    def __init__(
+        self,
+        rules: Dict[str, Dict[str, Any]] = EXERCISE_RULES,
+        invalid_hours: tuple[int, int] = INVALID_HOURS
+    ):
+        self.invalid_hours = _hour_set(invalid_hours)
+        self.hour_message = (
+            f"{invalid_hours[0]:02d}:00 ~ {invalid_hours[1]:02d}:00 사이 운동은 인정되지 않습니다."
+        )
+        self.minimums: Dict[str, List[tuple[str, float, str]]] = {}
+        self.attachments: Dict[str, List[tuple[str, str]]] = {}
+        self.weekly_limits: Dict[str, int] = {}
+        for name, rule in rules.items():
+            self._compile(name, rule)
+    
+    def _compile(self, name: str, rule: Dict[str, Any]) -> None:
+        minimums = []
+        attachments = []
+        for key, value in rule.items():
+            if key in MINIMUM_RULES:
+                column, label, unit = MINIMUM_RULES[key]
+                minimums.append((column, float(value), f"{label} {value}{unit} 이상"))
+            elif key in ATTACHMENT_RULES:
+                if value:
+                    attachments.append((key, ATTACHMENT_RULES[key]))
+            elif key == "max_per_week":
+                self.weekly_limits[name] = int(value)
+            else:
+                raise ValueError(f"알 수 없는 운동 규칙입니다: {name}.{key}")
+        self.minimums[name] = minimums
+        self.attachments[name] = attachments
+    
+    @property
+    def exercises(self) -> List[str]:
+        """규칙이 정의된 운동 종류 (설정 순서)"""
+        return list(self.minimums)
+    
+    def weekly_limit(self, exercise: Optional[str]) -> Optional[int]:
+        """운동 종류의 주간 인정 횟수 제한 (없으면 None)"""
+        return self.weekly_limits.get(exercise or "")
+    
+    def violations(self, records: Sequence[Dict[str, Any]]) -> List[List[str]]:
+        """기록마다 어긴 규칙 목록 (순서는 records와 같음)
+        
+        기록을 열로 한 번 풀어낸 뒤 규칙마다 해당 운동 종류의 행만 훑는다.
+        주간 횟수 제한은 (주차, 사용자ID)별로 records 순서대로 세어 넘친 기록에 표시한다.
+        """
+        result: List[List[str]] = [[] for _ in records]
+        
+        for i, hour in enumerate(_hour(r.get("날짜시간")) for r in records):
+            if hour in self.invalid_hours:
+                result[i].append(self.hour_message)
+        
+        groups: Dict[str, List[int]] = {}
+        for i, record in enumerate(records):
+            kind = record.get("운동종류") or ""
+            if kind:
+                groups.setdefault(kind, []).append(i)
+        if not groups:
+            return result
+        
+        numbers = {
+            column: [_number(r.get(column)) for r in records]
+            for column in NUMERIC_COLUMNS
+        }
+        urls = [r.get("이미지URL") or "" for r in records]
+        
+        for kind, rows in groups.items():
+            if kind not in self.minimums:
+                for i in rows:
+                    result[i].append(f"알 수 없는 운동 종류: {kind}")
+                continue
+            
+            for column, minimum, message in self.minimums[kind]:
+                values = numbers[column]
+                for i in rows:
+                    value = values[i]
+                    if value is None:
+                        result[i].append(f"{message} (입력 없음)")
+                    elif value < minimum:
+                        result[i].append(f"{message} (입력 {value:g})")
+            
+            for key, message in self.attachments[kind]:
+                for i in rows:
+                    if not urls[i] or (key == "requires_video" and not _is_video(urls[i])):
+                        result[i].append(message)
+            
+            limit = self.weekly_limits.get(kind)
+            if limit is not None:
+                seen: Dict[tuple[str, str], int] = {}
+                for i in rows:
+                    key = (records[i].get("주차"), str(records[i].get("사용자ID")))
+                    seen[key] = seen.get(key, 0) + 1
+                    if seen[key] > limit:
+                        result[i].append(f"{kind}은(는) 주 {limit}회까지만 인정")
+        
+        return result
+    
+    def check(self, record: Dict[str, Any], week_records: Iterable[Dict[str, Any]] = ()) -> List[str]:
+        """새 인증 한 건 검사 (주간 횟수 제한은 같은 주 기존 기록을 함께 셈)"""
+        kind = record.get("운동종류") or ""
+        prior = []
+        if kind in self.weekly_limits:
+            user_id = str(record.get("사용자ID"))
+            prior = [
+                r for r in week_records
+                if str(r.get("사용자ID")) == user_id and r.get("운동종류") == kind
+            ]
+        return self.violations(prior + [record])[-1]
+    
+    def audit(self, records: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """기록 묶음을 다시 검사해 규칙을 어긴 기록만 반환 ({"record", "violations"})"""
+        return [
+            {"record": record, "violations": found}
+            for record, found in zip(records, self.violations(records))
+            if found
+        ]
+
+
+rules = RuleEngine()
@@ -0,0 +1,163 @@
+"""
+주간 결산 스케줄러
+WEEK_START_DAY 00:00 마감에 맞춰 결산하고, 봇이 꺼져 있던 동안 지난 주차는 시작할 때 따라잡는다
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import pytz
+
+from config import (
+    GUILDS,
+    TIMEZONE,
+    SETTLEMENT_PRECOMPUTE_MINUTES,
+    SETTLEMENT_RETRY_MINUTES
+)
+from history import week_name_of, week_number
+from metrics import metrics
+from sheets import get_async_sheets_manager
+from storage import get_week_info
+
+# 오래 잠들면 시계 변경/절전을 놓칠 수 있어 최대 이 시간(초)씩 나눠 잔다
+MAX_SLEEP = 3600
+
+# settle(guild_id, week_name, penalties) -> 결산 성공 여부
+SettleFunc = Callable[[int, str, List[Dict[str, Any]]], Awaitable[bool]]
+
+
+class SettlementScheduler:
+    """주간 결산 스케줄러
+    
+    - 다음 마감 시각은 다음 주 시작(WEEK_START_DAY 00:00)이다.
+    - 마감 SETTLEMENT_PRECOMPUTE_MINUTES분 전에 벌금 목록을 미리 계산해 두고,
+      그 뒤로 인증이 없었으면 마감 즉시 그 목록으로 결산한다.
+    - 결산이 끝난 주차는 방마다 벌금장부에 결산 항목으로 남기고(배포로 로컬 디스크가 지워져도 유지),
+      시작할 때 그 이후 끝난 주차를 차례로 결산한다.
+      결산 항목이 하나도 없으면(처음 실행) 지난 주까지 결산된 것으로 보고 다음 마감부터 시작한다.
+    - 결산이 실패한 방은 SETTLEMENT_RETRY_MINUTES분 뒤 다시 시도한다.
+    """
+    
+    def __init__(
+        self,
+        settle: SettleFunc,
+        guild_ids: Optional[List[int]] = None,
+        precompute_minutes: float = SETTLEMENT_PRECOMPUTE_MINUTES,
+        retry_minutes: float = SETTLEMENT_RETRY_MINUTES
+    ):
+        self.settle = settle
+        self.guild_ids = list(guild_ids if guild_ids is not None else GUILDS)
+        self.precompute_lead = timedelta(minutes=precompute_minutes)
+        self.retry_delay = retry_minutes * 60
+        self.tz = pytz.timezone(TIMEZONE)
+        # (서버ID, 주차) -> (계산 당시 저장소 세대, 벌금 목록)
+        self._precomputed: Dict[tuple[int, str], tuple[int, List[Dict[str, Any]]]] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    def now(self) -> datetime:
+        return datetime.now(self.tz)
+    
+    def next_deadline(self, now: Optional[datetime] = None) -> datetime:
+        """다음 결산 마감 시각 (다음 주 시작 시각)"""
+        now = now or self.now()
+        _, week_start, _ = get_week_info(now)
+        # 주 시작일 + 7일을 날짜로 다시 만들어 서머타임이 있는 시간대에서도 00:00에 맞춤
+        next_start = (week_start + timedelta(days=7)).replace(tzinfo=None)
+        return self.tz.localize(next_start)
+    
+    async def pending_weeks(self, guild_id: int) -> List[str]:
+        """결산해야 하는데 아직 결산하지 않은 주차 (오래된 순)"""
+        sheets = get_async_sheets_manager(guild_id)
+        current = week_number(get_week_info(self.now())[0])
+        last_settled = await sheets.last_settled_week()
+        if last_settled is None:
+            # 처음 실행: 이전 주차는 예전 방식으로 이미 결산됐다고 보고 기준점만 기록
+            last_settled = week_name_of(current - 1)
+            await sheets.mark_settled(last_settled)
+            print(f"📅 결산 기준 주차 기록: {guild_id} → {last_settled}")
+            return []
+        return [week_name_of(n) for n in range(week_number(last_settled) + 1, current)]
+    
+    async def precompute(self, week_name: str) -> None:
+        """마감 전에 방마다 벌금 목록 미리 계산"""
+        for guild_id in self.guild_ids:
+            sheets = get_async_sheets_manager(guild_id)
+            try:
+                generation = sheets.generation
+                with metrics.timer("job.settlement_precompute"):
+                    penalties = await sheets.calculate_weekly_penalties(week_name)
+                self._precomputed[(guild_id, week_name)] = (generation, penalties)
+                print(f"🧮 결산 미리 계산: {guild_id} {week_name} 벌금 대상 {len(penalties)}명")
+            except Exception as e:
+                print(f"⚠️ 결산 미리 계산 실패 (마감 때 다시 계산): {e}")
+    
+    async def _penalties(self, guild_id: int, week_name: str) -> List[Dict[str, Any]]:
+        """미리 계산한 목록을 쓰되, 계산 뒤에 저장소 쓰기가 있었으면 다시 계산"""
+        sheets = get_async_sheets_manager(guild_id)
+        precomputed = self._precomputed.pop((guild_id, week_name), None)
+        if precomputed is not None and precomputed[0] == sheets.generation:
+            metrics.cache("settlement_precompute", True)
+            return precomputed[1]
+        metrics.cache("settlement_precompute", False)
+        return await sheets.calculate_weekly_penalties(week_name)
+    
+    async def settle_pending(self) -> bool:
+        """밀린 주차를 방마다 오래된 순으로 결산 (모두 성공하면 True)"""
+        ok = True
+        for guild_id in self.guild_ids:
+            try:
+                weeks = await self.pending_weeks(guild_id)
+            except Exception as e:
+                print(f"❌ 결산할 주차 확인 실패: {guild_id}: {e}")
+                ok = False
+                continue
+            for week_name in weeks:
+                try:
+                    penalties = await self._penalties(guild_id, week_name)
+                    settled = await self.settle(guild_id, week_name, penalties)
+                    if settled:
+                        await get_async_sheets_manager(guild_id).mark_settled(week_name)
+                except Exception as e:
+                    print(f"❌ 주간 결산 실패: {guild_id} {week_name}: {e}")
+                    settled = False
+                if not settled:
+                    ok = False
+                    break  # 이 방의 다음 주차는 이번 주차가 끝난 뒤에 결산
+                metrics.incr("job.settled_weeks")
+        return ok
+    
+    async def _sleep_until(self, target: datetime) -> None:
+        while True:
+            remaining = (target - self.now()).total_seconds()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, MAX_SLEEP))
+    
+    async def run(self) -> None:
+        """결산 루프 (밀린 결산 → 미리 계산 → 마감 대기 → 결산 반복)"""
+        while True:
+            try:
+                if not await self.settle_pending():
+                    await asyncio.sleep(self.retry_delay)
+                    continue
+                
+                deadline = self.next_deadline()
+                closing_week = get_week_info(deadline - timedelta(seconds=1))[0]
+                print(f"📅 다음 주간 결산: {deadline.strftime('%Y-%m-%d %H:%M')} ({closing_week})")
+                await self._sleep_until(deadline - self.precompute_lead)
+                await self.precompute(closing_week)
+                await self._sleep_until(deadline)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ 결산 스케줄러 오류 ({self.retry_delay / 60:.0f}분 뒤 재시도): {e}")
+                await asyncio.sleep(self.retry_delay)
+    
+    def start(self) -> None:
+        """이벤트 루프에서 결산 루프 시작 (이미 돌고 있으면 무시)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+    
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
@@ -2,279 +2,1683 @@
 Google Sheets 연동 모듈
 운동 인증 기록 저장 및 벌금 계산
 """
+import asyncio
+import functools
+import hashlib
+from collections import Counter, OrderedDict
 import gspread
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from gspread.utils import a1_to_rowcol, rowcol_to_a1
+from concurrent.futures import ThreadPoolExecutor
 from google.oauth2.service_account import Credentials
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Callable, Iterator, Sequence
 import pytz
 import os
 import json
+import threading
+import time
+import weakref
 
+from history import HISTORY_COLUMNS, HistoryStore, week_number
+from metrics import metrics, add_storage_time
+from quota import QuotaAwareHTTPClient, is_unapplied_error
+from storage import LEDGER_COLUMNS, RECORD_COLUMNS, StorageBackend, SQLiteBackend, build_weekly_status, get_week_info
 from config import (
     GOOGLE_SHEETS_ID, 
     CREDENTIALS_FILE, 
-    TIMEZONE,
-    WEEKLY_REQUIRED_COUNT,
-    PENALTY_PER_MISS,
-    WEEK_START_DAY
+    SHEETS_MAX_WORKERS,
+    SHEETS_CLIENT_POOL_SIZE,
+    SHEETS_FLUSH_INTERVAL,
+    SHEETS_FLUSH_MAX_ROWS,
+    STORAGE_BACKEND,
+    GUILDS,
+    TIMEZONE
 )
 
+# 방을 지정하지 않은 호출에 쓰는 기본 방
+DEFAULT_GUILD_ID = next(iter(GUILDS))
+
 # Google Sheets 스코프
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
     'https://www.googleapis.com/auth/drive'
 ]
 
+# 시트 구성
+RECORD_SHEET = "인증기록"
+RECORD_HEADERS = RECORD_COLUMNS
+MEMBER_SHEET = "멤버"
+MEMBER_HEADERS = ["사용자ID", "사용자명", "누적벌금", "가입일"]
+LEDGER_SHEET = "벌금장부"
+LEDGER_HEADERS = LEDGER_COLUMNS
+SHEET_HEADERS = {
+    RECORD_SHEET: RECORD_HEADERS,
+    MEMBER_SHEET: MEMBER_HEADERS,
+    LEDGER_SHEET: LEDGER_HEADERS
+}
+# 전체 기록을 읽을 때 batchGet 한 번에 요청하는 범위 수 (보관 시트 수 x 열 구간 수)
+ARCHIVE_BATCH_SIZE = 50
+# 보관 주차의 사용자별 최대 회차 계산에 필요한 열
+COUNT_COLUMNS = ("사용자ID", "회차")
+# 보관 시트에 이미 옮겨진 행인지 가리는 열 (같은 사람이 같은 시각에 같은 회차로 두 번 인증할 수 없음)
+ARCHIVE_KEY_COLUMNS = ("날짜시간", "사용자ID", "회차")
+# 외부 수정 확인 때 내용을 비교하는 시트와 비교에서 빼는 열 (누적벌금은 봇이 벌금장부로 다시 계산해 덮어씀)
+WATCHED_SHEETS = {
+    RECORD_SHEET: (),
+    MEMBER_SHEET: (MEMBER_HEADERS.index("누적벌금"),),
+    LEDGER_SHEET: ()
+}
+# 사진 재사용 색인을 채울 때 읽는 열
+PHOTO_COLUMNS = ("주차", "사용자ID", "이미지URL")
+# 처리한 인터랙션을 기억하는 시간(초, 인터랙션 토큰 유효 시간)과 최대 개수
+INTERACTION_TTL = 15 * 60
+INTERACTION_MAX_ENTRIES = 5000
+
+
+def _to_int(value: Any) -> int:
+    """시트 셀 값을 정수로 변환 (빈 값/잘못된 값은 0, 천 단위 쉼표 허용)"""
+    try:
+        return int(float(str(value).replace(",", "")))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _updated_row(response: Dict[str, Any]) -> Optional[int]:
+    """append 응답의 updatedRange에서 첫 행 번호 추출"""
+    try:
+        updated_range = response["updates"]["updatedRange"]
+    except (KeyError, TypeError):
+        return None
+    cell = updated_range.split("!")[-1].split(":")[0]
+    row, _ = a1_to_rowcol(cell)
+    return row
+
+
+def _parse_drive_time(value: str) -> float:
+    """Drive API 시각('2025-03-05T12:34:56.789Z')을 UNIX 초로 변환"""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc).timestamp()
+
+
+def _is_missing_sheet_error(error: gspread.exceptions.APIError) -> bool:
+    """삭제되었거나 이름이 바뀐 워크시트를 가리킨 요청인지 확인"""
+    message = str(error)
+    return "Unable to parse range" in message or "No grid with id" in message
+
+
+def _to_record(values: List[Any]) -> Dict[str, Any]:
+    """인증기록 행 값을 헤더 기준 dict로 변환"""
+    values = list(values) + [""] * (len(RECORD_HEADERS) - len(values))
+    record = dict(zip(RECORD_HEADERS, values))
+    record["사용자ID"] = str(record["사용자ID"])
+    record["회차"] = _to_int(record["회차"])
+    record["벌금납부"] = _to_int(record["벌금납부"])
+    return record
+
+
+def _archive_key(record: Dict[str, Any]) -> tuple:
+    """보관 중복 확인용 행 키 (ARCHIVE_KEY_COLUMNS 순서)"""
+    return (str(record["날짜시간"]), str(record["사용자ID"]), _to_int(record["회차"]))
+
+
+def _row_key(title: str, values: List[Any]) -> tuple:
+    """버퍼 행이 시트에 이미 들어갔는지 확인할 때 쓰는 키
+    
+    인증기록은 (주차, 사용자ID, 회차), 벌금장부는 (사용자ID, 주차, 종류), 멤버는 사용자ID.
+    """
+    if title == RECORD_SHEET:
+        record = _to_record(values)
+        return (record["주차"], record["사용자ID"], record["회차"])
+    values = list(values) + [""] * (len(LEDGER_HEADERS) - len(values))
+    if title == LEDGER_SHEET:
+        return tuple(str(values[LEDGER_HEADERS.index(c)]) for c in ("사용자ID", "주차", "종류"))
+    return (str(values[0]),)
+
+
+def archive_sheet_title(week_name: str) -> str:
+    """주차별 보관 시트 이름 (예: 인증기록_2025-W10)"""
+    return f"{RECORD_SHEET}_{week_name}"
+
+
+def _last_column(headers: List[str]) -> str:
+    """헤더 수에 해당하는 마지막 열 문자 (예: 8 -> H)"""
+    return rowcol_to_a1(1, len(headers))[:-1]
+
+
+def _convert_cell(column: str, value: Any) -> Any:
+    """열만 골라 읽은 셀 값 변환 (_to_record와 같은 규칙)"""
+    if column == "사용자ID":
+        return str(value)
+    if column in ("회차", "벌금납부"):
+        return _to_int(value)
+    return value
+
+
+def _column_runs(columns: Sequence[str]) -> List[tuple[int, int]]:
+    """읽을 열을 인증기록 헤더 기준 연속 구간 [(첫 열, 끝 열)]으로 묶기 (1부터 시작)"""
+    runs: List[List[int]] = []
+    for col in sorted({RECORD_HEADERS.index(column) + 1 for column in columns}):
+        if runs and runs[-1][1] == col - 1:
+            runs[-1][1] = col
+        else:
+            runs.append([col, col])
+    return [(first, last) for first, last in runs]
 
-class SheetsManager:
-    """Google Sheets 관리 클래스"""
+
+def _column_ranges(title: str, runs: List[tuple[int, int]]) -> List[str]:
+    """시트의 열 구간별 A1 범위 (2행부터 끝까지, 예: 'Sheet'!C2:E)"""
+    return [
+        f"'{title}'!{rowcol_to_a1(2, first)}:{rowcol_to_a1(1, last)[:-1]}"
+        for first, last in runs
+    ]
+
+
+def _decode_columns(
+    columns: Sequence[str],
+    runs: List[tuple[int, int]],
+    value_ranges: List[Dict[str, Any]]
+) -> List[tuple]:
+    """열 구간별 batchGet 응답을 columns 순서의 행 튜플로 합치기 (빈 행 제외)
+    
+    구간마다 끝의 빈 행/빈 칸은 응답에서 빠지므로 없는 칸은 빈 값으로 본다.
+    """
+    blocks = [value_range.get("values", []) for value_range in value_ranges]
+    # 요청 열마다 (구간 번호, 구간 안 위치)
+    positions = []
+    for column in columns:
+        col = RECORD_HEADERS.index(column) + 1
+        block = next(i for i, (first, last) in enumerate(runs) if first <= col <= last)
+        positions.append((block, col - runs[block][0]))
+    
+    rows = []
+    for i in range(max((len(block) for block in blocks), default=0)):
+        cells = []
+        for block, offset in positions:
+            row = blocks[block][i] if i < len(blocks[block]) else []
+            cells.append(row[offset] if offset < len(row) else "")
+        if any(str(cell) for cell in cells):
+            rows.append(tuple(_convert_cell(c, cell) for c, cell in zip(columns, cells)))
+    return rows
+
+
+class WeeklyIndex:
+    """(주차, 사용자ID)별 인증 집계 인덱스
+    
+    항목마다 최대 회차, 인증 건수, 마지막 인증 시각을 보관해
+    주간 조회가 전체 기록을 다시 훑지 않도록 한다.
+    """
     
     def __init__(self):
-        self.client = None
+        self._entries: Dict[tuple[str, str], Dict[str, Any]] = {}
+        self.weeks: set[str] = set()
+    
+    def add(self, record: Dict[str, Any]) -> None:
+        self.weeks.add(record["주차"])
+        key = (record["주차"], record["사용자ID"])
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = {"max_count": 0, "count": 0, "last_timestamp": ""}
+            self._entries[key] = entry
+        entry["max_count"] = max(entry["max_count"], record["회차"])
+        entry["count"] += 1
+        entry["last_timestamp"] = max(entry["last_timestamp"], str(record["날짜시간"]))
+    
+    def get(self, week_name: str, user_id: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get((week_name, str(user_id)))
+    
+    def max_count(self, week_name: str, user_id: str) -> int:
+        entry = self.get(week_name, user_id)
+        return entry["max_count"] if entry else 0
+    
+    def clear(self) -> None:
+        self._entries.clear()
+        self.weeks.clear()
+
+
+class RecordCache:
+    """인증기록 시트 증분 캐시
+    
+    인증기록은 행이 추가되기만 하므로 이미 읽은 행 수를 기억해 두고
+    새로 추가된 행만 가져온다. 봇이 쓴 행은 시트에 반영되기 전(pending)부터
+    조회 결과에 포함되고, 반영되면 확정 기록으로 옮겨진다.
+    """
+    
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+        self.pending: List[tuple[List[Any], Dict[str, Any]]] = []  # (원본 행, 기록), 아직 시트에 없음
+        self.rows_seen = 0  # 헤더 제외, 캐시에 반영된 데이터 행 수
+        self.index = WeeklyIndex()
+        self.lock = threading.RLock()
+    
+    def _add(self, values: List[Any]) -> None:
+        self.rows_seen += 1
+        if any(str(v) for v in values):
+            record = _to_record(values)
+            self.records.append(record)
+            self.index.add(record)
+    
+    def _rebuild_index(self) -> None:
+        self.index.clear()
+        for record in self.records:
+            self.index.add(record)
+        for _, record in self.pending:
+            self.index.add(record)
+    
+    def reset(self) -> None:
+        """확정 기록 비우기 (다음 refresh에서 전체를 다시 읽음)"""
+        with self.lock:
+            self.records = []
+            self.rows_seen = 0
+            self._rebuild_index()
+    
+    def refresh(self, sheet: gspread.Worksheet) -> int:
+        """마지막으로 읽은 행 이후에 추가된 행만 가져오기"""
+        with self.lock:
+            # 1행은 헤더이므로 데이터는 2행부터
+            start = self.rows_seen + 2
+            rows = sheet.get(f"A{start}:{_last_column(RECORD_HEADERS)}")
+            for values in rows:
+                self._add(values)
+            # 적중: 이미 읽은 행, 실패: 이번에 새로 읽은 행
+            metrics.incr("cache.records.hit", self.rows_seen - len(rows))
+            metrics.incr("cache.records.miss", len(rows))
+            return len(rows)
+    
+    def add_pending(self, values: List[Any]) -> None:
+        """버퍼에 들어간 행을 바로 조회 결과에 반영"""
+        with self.lock:
+            record = _to_record(values)
+            self.pending.append((values, record))
+            self.index.add(record)
+    
+    def confirm(self, rows: List[List[Any]], sheet_row: Optional[int]) -> None:
+        """시트에 추가된 pending 기록 확정
+        
+        행 번호가 캐시 끝에 바로 이어지면 그대로 확정 기록으로 옮긴다.
+        그 사이 다른 곳에서 추가된 행이 있으면 pending에서만 빼고
+        다음 refresh에서 시트 순서대로 다시 읽는다.
+        """
+        with self.lock:
+            flushed_ids = {id(values) for values in rows}
+            records = {id(values): record for values, record in self.pending}
+            self.pending = [p for p in self.pending if id(p[0]) not in flushed_ids]
+            if sheet_row == self.rows_seen + 2:
+                self.records.extend(records[id(values)] for values in rows if id(values) in records)
+                self.rows_seen += len(rows)
+                return
+            if sheet_row is None or sheet_row < self.rows_seen + 2:
+                # 행 번호를 알 수 없거나 시트가 외부에서 줄어든 경우
+                self.records = []
+                self.rows_seen = 0
+            self._rebuild_index()
+    
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """현재 캐시된 기록 목록 (pending 포함)"""
+        with self.lock:
+            return self.records + [record for _, record in self.pending]
+    
+    def max_count(self, week_name: str, user_id: str) -> int:
+        """주차/사용자의 최대 회차 (인덱스 조회)"""
+        with self.lock:
+            return self.index.max_count(week_name, user_id)
+    
+    def has_week(self, week_name: str) -> bool:
+        with self.lock:
+            return week_name in self.index.weeks
+
+
+class MemberDirectory:
+    """멤버 시트 캐시 (사용자ID -> 행 번호와 필드)
+    
+    최초 1회 전체를 읽고 이후에는 봇이 쓴 내용을 바로 반영해
+    멤버 확인, 벌금 조회, 셀 수정용 행 번호 계산에 API 호출이 필요 없게 한다.
+    같은 사용자ID가 여러 행에 있으면 첫 번째 행을 사용한다.
+    버퍼에 있어 아직 시트에 없는 멤버는 행 번호가 None이다.
+    """
+    
+    def __init__(self):
+        self.members: Dict[str, Dict[str, Any]] = {}
+        self.loaded = False
+        self.lock = threading.RLock()
+    
+    def load(self, sheet: gspread.Worksheet, force: bool = False) -> None:
+        """멤버 시트 읽기 (이미 읽었으면 생략)"""
+        with self.lock:
+            metrics.cache("members", self.loaded and not force)
+            if self.loaded and not force:
+                return
+            rows = sheet.get(f"A2:{_last_column(MEMBER_HEADERS)}")
+            pending = [m for m in self.members.values() if m["row"] is None]
+            self.members = {}
+            for i, values in enumerate(rows):
+                values = list(values) + [""] * (len(MEMBER_HEADERS) - len(values))
+                user_id = str(values[0])
+                if not user_id or user_id in self.members:
+                    continue
+                # 행 번호는 1-indexed이고 헤더가 있으므로 +2
+                self._set(user_id, i + 2, values[1], _to_int(values[2]), values[3])
+            for member in pending:
+                if member["사용자ID"] not in self.members:
+                    self.members[member["사용자ID"]] = member
+            self.loaded = True
+    
+    def _set(self, user_id: str, row: Optional[int], user_name: str, total_penalty: int, joined: str) -> None:
+        self.members[user_id] = {
+            "row": row,
+            "사용자ID": user_id,
+            "사용자명": user_name,
+            "누적벌금": total_penalty,
+            "가입일": joined
+        }
+    
+    def add_pending(self, values: List[Any]) -> None:
+        """버퍼에 들어간 멤버를 바로 반영"""
+        with self.lock:
+            user_id, user_name, total_penalty, joined = values
+            self._set(str(user_id), None, user_name, _to_int(total_penalty), joined)
+    
+    def confirm(self, rows: List[List[Any]], sheet_row: Optional[int]) -> None:
+        """시트에 추가된 멤버의 행 번호 확정 (모르면 다음 조회 때 다시 읽음)"""
+        with self.lock:
+            if sheet_row is None:
+                for values in rows:
+                    member = self.members.get(str(values[0]))
+                    if member and member["row"] is None:
+                        del self.members[member["사용자ID"]]
+                self.invalidate()
+                return
+            for offset, values in enumerate(rows):
+                member = self.members.get(str(values[0]))
+                if member and member["row"] is None:
+                    member["row"] = sheet_row + offset
+    
+    def invalidate(self) -> None:
+        """다음 조회 때 시트를 다시 읽도록 표시"""
+        with self.lock:
+            self.loaded = False
+    
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            member = self.members.get(str(user_id))
+            return dict(member) if member else None
+    
+    def all(self) -> List[Dict[str, Any]]:
+        """시트 순서대로 전체 멤버 (아직 추가되지 않은 멤버는 마지막)"""
+        with self.lock:
+            members = sorted(
+                self.members.values(),
+                key=lambda m: m["row"] if m["row"] is not None else float("inf")
+            )
+            return [dict(m) for m in members]
+    
+    def set_penalty(self, user_id: str, total_penalty: int) -> None:
+        with self.lock:
+            member = self.members.get(str(user_id))
+            if member:
+                member["누적벌금"] = total_penalty
+
+
+class SheetFingerprint:
+    """외부 수정 확인용 시트 요약 (마지막으로 확인한 데이터 행 수와 행 내용 해시)
+    
+    봇은 감시하는 시트에 행을 추가하기만 하므로, 다시 읽은 시트의 앞부분 해시가
+    지난 확인 때와 같고 늘어난 행 수가 그 사이 봇이 추가한 행 수와 같으면 봇만 쓴 것이다.
+    결과를 모르는 추가가 있었으면 봇이 쓴 것인지 알 수 없으므로 외부 수정으로 본다.
+    """
+    
+    def __init__(self, ignore_columns: Sequence[int] = ()):
+        self.ignore_columns = ignore_columns
+        self.rows: Optional[int] = None  # None이면 아직 기준 없음
+        self.digest = ""
+        self.appended = 0  # 마지막 확인 이후 봇이 추가한 행 수
+        self.unknown = False  # 결과를 모르는 추가가 있었는지
+        self.lock = threading.Lock()
+    
+    def record_append(self, count: int, confirmed: bool = True) -> None:
+        """봇이 추가한 행 기록 (confirmed=False면 반영 여부를 모르는 추가)"""
+        with self.lock:
+            if confirmed:
+                self.appended += count
+            else:
+                self.unknown = True
+    
+    def forget(self) -> None:
+        """봇이 행을 지웠을 때: 다음 확인 내용을 새 기준으로 삼음"""
+        with self.lock:
+            self.rows = None
+    
+    def _row_bytes(self, values: List[Any]) -> bytes:
+        values = [str(v) for v in values]
+        for column in self.ignore_columns:
+            if column < len(values):
+                values[column] = ""
+        while values and not values[-1]:
+            values.pop()
+        return json.dumps(values, ensure_ascii=False).encode("utf-8") + b"\n"
+    
+    def check(self, rows: List[List[Any]]) -> bool:
+        """다시 읽은 시트가 봇이 쓴 것만으로 설명되면 True (어느 쪽이든 rows를 새 기준으로 삼음)"""
+        with self.lock:
+            digest = hashlib.sha1()
+            prefix = None
+            for i, values in enumerate(rows):
+                if i == self.rows:
+                    prefix = digest.hexdigest()
+                digest.update(self._row_bytes(values))
+            if self.rows == len(rows):
+                prefix = digest.hexdigest()
+            own = self.rows is None or (
+                not self.unknown
+                and len(rows) == self.rows + self.appended
+                and prefix == self.digest
+            )
+            self.rows = len(rows)
+            self.digest = digest.hexdigest()
+            self.appended = 0
+            self.unknown = False
+            return own
+
+
+class WriteBuffer:
+    """워크시트별 행 추가 버퍼 (write-behind)
+    
+    추가할 행을 모아 두었다가 일정 시간이 지나거나 행 수가 기준에 닿으면
+    워크시트마다 append_rows 한 번으로 보낸다.
+    보내기가 할당량 초과 말고 다른 이유로 실패하면 시트에 반영됐을 수도 있으므로
+    그 워크시트는 다음 전송 때 flush_func(title, rows, True)로 시트를 확인하게 한다.
+    """
+    
+    def __init__(
+        self,
+        flush_func: Callable[[str, List[List[Any]], bool], None],
+        interval: float = SHEETS_FLUSH_INTERVAL,
+        max_rows: int = SHEETS_FLUSH_MAX_ROWS
+    ):
+        self._flush_func = flush_func
+        self.interval = interval
+        self.max_rows = max_rows
+        self._pending: Dict[str, List[List[Any]]] = {}
+        self._uncertain: set[str] = set()  # 마지막 전송 결과를 알 수 없는 워크시트
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+    
+    def add(self, title: str, row: List[Any]) -> None:
+        """행 추가 (기준을 넘으면 호출한 스레드에서 바로 flush)"""
+        with self._lock:
+            rows = self._pending.setdefault(title, [])
+            rows.append(row)
+            flush_now = self.interval <= 0 or len(rows) >= self.max_rows
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(self.interval, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            try:
+                self.flush(title)
+            except Exception as e:
+                # 보내지 못한 행은 버퍼에 남아 다음 주기에 재시도됨
+                print(f"❌ 버퍼 flush 실패 (다음 주기에 재시도): {e}")
+    
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"❌ 버퍼 flush 실패 (다음 주기에 재시도): {e}")
+    
+    def pending_count(self, title: Optional[str] = None) -> int:
+        with self._lock:
+            if title is not None:
+                return len(self._pending.get(title, []))
+            return sum(len(rows) for rows in self._pending.values())
+    
+    def flush(self, title: Optional[str] = None) -> None:
+        """대기 중인 행 전송 (title 지정 시 해당 워크시트만)"""
+        with self._flush_lock:
+            with self._lock:
+                titles = [title] if title is not None else list(self._pending)
+                batches = [(t, self._pending.pop(t)) for t in titles if self._pending.get(t)]
+            for index, (batch_title, rows) in enumerate(batches):
+                try:
+                    self._flush_func(batch_title, rows, batch_title in self._uncertain)
+                    self._uncertain.discard(batch_title)
+                except Exception as e:
+                    # 보내지 못한 행은 순서를 유지한 채 버퍼 앞쪽으로 되돌림
+                    with self._lock:
+                        if not is_unapplied_error(e):
+                            self._uncertain.add(batch_title)
+                        for t, r in batches[index:]:
+                            self._pending[t] = r + self._pending.get(t, [])
+                        if self._timer is None and self.interval > 0:
+                            self._timer = threading.Timer(self.interval, self._on_timer)
+                            self._timer.daemon = True
+                            self._timer.start()
+                    raise
+    
+    def hold(self) -> threading.Lock:
+        """전송을 잠시 막는 잠금 (with 문으로 사용)"""
+        return self._flush_lock
+    
+    def close(self) -> None:
+        """타이머 정지 후 남은 행 모두 전송"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        self.flush()
+
+
+def load_credentials() -> Credentials:
+    """서비스 계정 인증 정보 읽기"""
+    # 환경변수에서 credentials 읽기 (Render 배포용)
+    creds_json = os.getenv("GOOGLE_CREDENTIALS_JSON")
+    if creds_json:
+        creds_dict = json.loads(creds_json)
+        return Credentials.from_service_account_info(
+            creds_dict, 
+            scopes=SCOPES
+        )
+    # 로컬 파일에서 읽기
+    return Credentials.from_service_account_file(
+        CREDENTIALS_FILE, 
+        scopes=SCOPES
+    )
+
+
+class SheetsClientPool:
+    """인증된 gspread 클라이언트 공유 풀
+    
+    서비스 계정 인증은 한 번만 하고 같은 인증 정보로 만든 클라이언트 size개를
+    돌아가며 나눠 준다. 방(스프레드시트)이 늘어나도 인증과 HTTP 연결을 새로 만들지 않는다.
+    """
+    
+    def __init__(self, size: int = SHEETS_CLIENT_POOL_SIZE):
+        self.size = max(1, size)
+        self._clients: List[gspread.Client] = []
+        self._next = 0
+        self._creds: Optional[Credentials] = None
+        self._lock = threading.Lock()
+    
+    def get(self) -> gspread.Client:
+        with self._lock:
+            if len(self._clients) < self.size:
+                if self._creds is None:
+                    self._creds = load_credentials()
+                # 할당량 제한/재시도/읽기 병합은 HTTP 클라이언트 계층에서 처리
+                client = gspread.authorize(self._creds, http_client=QuotaAwareHTTPClient)
+                self._clients.append(client)
+                return client
+            client = self._clients[self._next % len(self._clients)]
+            self._next += 1
+            return client
+
+
+client_pool = SheetsClientPool()
+
+
+class SheetsManager(StorageBackend):
+    """Google Sheets 관리 클래스 (스프레드시트 하나 = 방 하나)"""
+    
+    def __init__(self, spreadsheet_id: Optional[str] = None, client: Optional[gspread.Client] = None):
+        super().__init__()
+        self.spreadsheet_id = spreadsheet_id or GOOGLE_SHEETS_ID
+        self.client = client
         self.spreadsheet = None
-        self.tz = pytz.timezone(TIMEZONE)
+        self._worksheets: Dict[str, gspread.Worksheet] = {}
+        self._worksheets_lock = threading.Lock()
+        self._records = RecordCache()
+        self._members = MemberDirectory()
+        self._buffer = WriteBuffer(self._flush_rows)
+        self._modified_time: Optional[float] = None  # 마지막으로 확인한 Drive 수정 시각
+        self._watch_changes = True
+        self._fingerprints = {title: SheetFingerprint(columns) for title, columns in WATCHED_SHEETS.items()}
         self._connect()
     
     def _connect(self):
         """Google Sheets 연결"""
         try:
-            # 환경변수에서 credentials 읽기 (Render 배포용)
-            creds_json = os.getenv("GOOGLE_CREDENTIALS_JSON")
-            if creds_json:
-                creds_dict = json.loads(creds_json)
-                creds = Credentials.from_service_account_info(
-                    creds_dict, 
-                    scopes=SCOPES
-                )
-            else:
-                # 로컬 파일에서 읽기
-                creds = Credentials.from_service_account_file(
-                    CREDENTIALS_FILE, 
-                    scopes=SCOPES
-                )
-            self.client = gspread.authorize(creds)
-            self.spreadsheet = self.client.open_by_key(GOOGLE_SHEETS_ID)
-            print("✅ Google Sheets 연결 성공")
+            if self.client is None:
+                self.client = client_pool.get()
+            self.spreadsheet = self.client.open_by_key(self.spreadsheet_id)
+            self._resolve_worksheets()
+            print(f"✅ Google Sheets 연결 성공: {self.spreadsheet.title}")
         except Exception as e:
             print(f"❌ Google Sheets 연결 실패: {e}")
             raise
+        
+        # 외부 수정 감지 기준 (캐시는 이후에 읽으므로 이 시점 이후 수정만 보면 됨)
+        try:
+            self._modified_time = self._drive_modified_time()
+            if self._watch_changes:
+                self._external_sheets()
+        except Exception as e:
+            print(f"⚠️ 외부 수정 감지 기준 확인 실패 (다음 확인 때 기준으로 삼음): {e}")
     
-    def _get_or_create_sheet(self, title: str, headers: List[str]) -> gspread.Worksheet:
-        """시트 가져오기 또는 생성"""
+    def _drive_get(self, url: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Drive API 조회 (Drive API를 쓸 수 없으면 감지를 끄고 None)"""
         try:
-            sheet = self.spreadsheet.worksheet(title)
-        except gspread.WorksheetNotFound:
-            sheet = self.spreadsheet.add_worksheet(title=title, rows=1000, cols=20)
-            sheet.append_row(headers)
-            print(f"📝 '{title}' 시트 생성됨")
-        return sheet
+            return self.client.http_client.request("get", url, params=params).json()
+        except gspread.exceptions.APIError as e:
+            if e.code not in (403, 404):
+                raise
+            self._watch_changes = False
+            print(f"⚠️ Drive API를 쓸 수 없어 외부 수정 감지를 끕니다: {e}")
+            return None
     
-    def get_current_week_info(self) -> tuple[str, datetime, datetime]:
-        """현재 주차 정보 반환 (주차명, 시작일, 종료일)"""
-        now = datetime.now(self.tz)
-        # 일요일 기준으로 주 시작
-        days_since_sunday = (now.weekday() + 1) % 7
-        week_start = now - timedelta(days=days_since_sunday)
-        week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-        week_end = week_start + timedelta(days=6, hours=23, minutes=59, seconds=59)
+    def _drive_modified_time(self) -> Optional[float]:
+        """Drive 파일 수정 시각 (UNIX 초, 알 수 없으면 None)"""
+        metadata = self._drive_get(
+            f"{DRIVE_FILES_API_V3_URL}/{self.spreadsheet_id}",
+            {"supportsAllDrives": True, "fields": "modifiedTime"}
+        )
+        return _parse_drive_time(metadata["modifiedTime"]) if metadata else None
+    
+    def _external_sheets(self) -> List[str]:
+        """감시하는 시트를 batchGet 한 번으로 읽어 봇이 쓴 것만으로 설명되지 않는 시트 목록 반환
         
-        week_name = week_start.strftime("%Y-W%W")
-        return week_name, week_start, week_end
+        읽는 동안 버퍼 전송을 막아 봇이 추가한 행 수와 읽은 내용이 어긋나지 않게 한다.
+        """
+        titles = list(WATCHED_SHEETS)
+        ranges = [f"'{title}'!A2:{_last_column(SHEET_HEADERS[title])}" for title in titles]
+        with self._buffer.hold():
+            response = self.spreadsheet.values_batch_get(ranges)
+            return [
+                title
+                for title, value_range in zip(titles, response.get("valueRanges", []))
+                if not self._fingerprints[title].check(value_range.get("values", []))
+            ]
     
-    def add_verification(
-        self, 
-        user_id: str, 
-        user_name: str, 
-        count: int, 
-        image_url: Optional[str] = None,
-        penalty_paid: int = 0,
-        note: str = ""
-    ) -> Dict[str, Any]:
-        """운동 인증 기록 추가"""
-        sheet = self._get_or_create_sheet("인증기록", [
-            "날짜시간", "주차", "사용자ID", "사용자명", 
-            "회차", "이미지URL", "벌금납부", "비고"
-        ])
+    def check_external_changes(self) -> bool:
+        """외부 수정 확인 (수정됐으면 캐시를 비우고 True)
         
-        now = datetime.now(self.tz)
-        week_name, _, _ = self.get_current_week_info()
+        Drive 파일 수정 시각이 지난 확인 이후 바뀌었을 때만 감시하는 시트를 읽어
+        SheetFingerprint로 지난 확인 때 내용과 비교한다. 같은 서비스 계정으로 실행한
+        manage.py 가져오기나 봇이 쓴 시각에 함께 들어간 관리자 수정도 내용으로 가려낸다.
+        보관 시트(인증기록_<주차>)는 만든 뒤로 바뀌지 않는다고 보고 비교하지 않는다.
+        """
+        if not self._watch_changes:
+            return False
+        modified = self._drive_modified_time()
+        if modified is None:
+            return False
+        if self._modified_time is not None and modified <= self._modified_time:
+            metrics.cache("external_changes", True)
+            return False
+        changed = self._external_sheets()
+        self._modified_time = modified
+        if not changed:
+            metrics.cache("external_changes", True)
+            return False
         
-        # 시간 검증 (00:00 ~ 04:00 운동 불인정)
-        if 0 <= now.hour < 4:
-            return {
-                "success": False,
-                "message": "❌ 밤 12시 ~ 새벽 4시 사이 운동은 인정되지 않습니다."
-            }
+        metrics.cache("external_changes", False)
+        self.invalidate_caches()
+        changed_at = datetime.fromtimestamp(modified, self.tz).strftime("%Y-%m-%d %H:%M:%S")
+        print(
+            f"🔄 외부 수정 감지 ({self.spreadsheet.title}, {changed_at}, {', '.join(changed)}): "
+            "인증기록/멤버/벌금장부 캐시 폐기"
+        )
+        return True
+    
+    def invalidate_caches(self) -> None:
+        """확정 기록과 멤버/장부 캐시 폐기 (버퍼에 있는 행은 유지)"""
+        self._records.reset()
+        self._members.invalidate()
+        super().invalidate_caches()
+    
+    def _resolve_worksheets(self) -> None:
+        """메타데이터 1회 조회로 필요한 워크시트를 찾고 없으면 생성"""
+        with self._worksheets_lock:
+            self._worksheets = {ws.title: ws for ws in self.spreadsheet.worksheets()}
+        for title, headers in SHEET_HEADERS.items():
+            self._get_or_create_sheet(title, headers)
+        self._upgrade_headers(RECORD_SHEET)
+    
+    def _upgrade_headers(self, title: str) -> None:
+        """열이 추가되기 전에 만든 시트의 헤더 행 뒤에 새 열 이름 추가"""
+        headers = SHEET_HEADERS[title]
+        sheet = self._get_or_create_sheet(title)
+        current = (sheet.get(f"A1:{_last_column(headers)}1") or [[]])[0]
+        if len(current) < len(headers) and current == headers[:len(current)]:
+            sheet.update(values=[headers], range_name="A1")
+            print(f"📝 '{title}' 시트에 열 추가: {', '.join(headers[len(current):])}")
+    
+    def _get_or_create_sheet(self, title: str, headers: Optional[List[str]] = None) -> gspread.Worksheet:
+        """시트 가져오기 또는 생성 (한 번 찾은 워크시트는 재사용)"""
+        with self._worksheets_lock:
+            sheet = self._worksheets.get(title)
+            metrics.cache("worksheets", sheet is not None)
+            if sheet is not None:
+                return sheet
+            try:
+                sheet = self.spreadsheet.worksheet(title)
+            except gspread.WorksheetNotFound:
+                sheet = self.spreadsheet.add_worksheet(title=title, rows=1000, cols=20)
+                sheet.append_row(headers or SHEET_HEADERS[title])
+                print(f"📝 '{title}' 시트 생성됨")
+            self._worksheets[title] = sheet
+            return sheet
+    
+    def _invalidate_sheet(self, title: str) -> None:
+        """캐시된 워크시트와 해당 시트의 데이터 캐시 폐기"""
+        with self._worksheets_lock:
+            self._worksheets.pop(title, None)
+        if title == RECORD_SHEET:
+            self._records.reset()
+        elif title == MEMBER_SHEET:
+            self._members.invalidate()
+    
+    def _sheet_call(self, title: str, func: Callable[[gspread.Worksheet], Any]) -> Any:
+        """캐시된 워크시트로 작업 실행
         
-        row = [
-            now.strftime("%Y-%m-%d %H:%M:%S"),
-            week_name,
-            user_id,  # 문자열로 저장
-            user_name,
-            count,
-            image_url or "",
-            penalty_paid,
-            note
-        ]
-        sheet.append_row(row, value_input_option='USER_ENTERED')
+        워크시트가 삭제/이름 변경되어 요청이 실패하면 한 번만 다시 찾아 재시도한다.
+        """
+        try:
+            return func(self._get_or_create_sheet(title))
+        except gspread.exceptions.APIError as e:
+            if not _is_missing_sheet_error(e):
+                raise
+            print(f"⚠️ '{title}' 시트를 찾을 수 없어 다시 연결합니다: {e}")
+            self._invalidate_sheet(title)
+            return func(self._get_or_create_sheet(title))
+    
+    def _unsent_rows(self, title: str, rows: List[List[Any]]) -> List[List[Any]]:
+        """결과를 모르는 전송 뒤: 시트에 아직 없는 행만 남기기 (키가 같은 행은 시트에 있는 개수만큼 제외)"""
+        existing = Counter(
+            _row_key(title, values)
+            for values in self._sheet_call(
+                title,
+                lambda sheet: sheet.get(f"A2:{_last_column(SHEET_HEADERS[title])}")
+            )
+            if any(str(v) for v in values)
+        )
+        unsent = []
+        for values in rows:
+            key = _row_key(title, values)
+            if existing[key]:
+                existing[key] -= 1
+            else:
+                unsent.append(values)
+        if len(unsent) < len(rows):
+            print(f"ℹ️ {title}: 이전 전송에서 이미 추가된 {len(rows) - len(unsent)}행은 다시 보내지 않음")
+        return unsent
+    
+    def _flush_rows(self, title: str, rows: List[List[Any]], uncertain: bool = False) -> None:
+        """버퍼에 모인 행을 append_rows 한 번으로 추가하고 캐시에 확정
         
-        return {
-            "success": True,
-            "message": f"✅ {user_name}님 {count}회차 운동 인증 완료!",
-            "week": week_name,
-            "count": count
-        }
+        uncertain이면 이전 전송이 반영됐는지 몰라 시트에 없는 행만 보내고,
+        캐시는 행 번호를 확정하지 않고 다음 조회 때 다시 읽게 한다.
+        """
+        to_send = self._unsent_rows(title, rows) if uncertain else rows
+        
+        def append(sheet: gspread.Worksheet) -> Optional[Dict[str, Any]]:
+            if not to_send:
+                return None
+            try:
+                response = sheet.append_rows(to_send, value_input_option='USER_ENTERED')
+            except Exception as e:
+                if not is_unapplied_error(e):
+                    self._fingerprints[title].record_append(len(to_send), confirmed=False)
+                raise
+            self._fingerprints[title].record_append(len(to_send))
+            return response
+        
+        if title == LEDGER_SHEET:
+            # 장부 색인은 StorageBackend가 행을 넣을 때 이미 갱신함
+            self._sheet_call(title, append)
+            return
+        cache = self._records if title == RECORD_SHEET else self._members
+        with cache.lock:
+            response = self._sheet_call(title, append)
+            cache.confirm(rows, None if uncertain else _updated_row(response))
     
-    def get_user_weekly_count(self, user_id: str) -> int:
-        """현재 주 사용자 인증 횟수 조회"""
-        sheet = self._get_or_create_sheet("인증기록", [
-            "날짜시간", "주차", "사용자ID", "사용자명", 
-            "회차", "이미지URL", "벌금납부", "비고"
-        ])
+    def flush(self) -> None:
+        """버퍼에 남은 행 즉시 전송"""
+        self._buffer.flush()
+    
+    def close(self) -> None:
+        """종료 전 버퍼 비우기"""
+        self._buffer.close()
+    
+    def append_verification_row(self, row: List[Any]) -> None:
+        """인증기록 행 추가
         
-        week_name, _, _ = self.get_current_week_info()
-        records = sheet.get_all_records()
+        조회에는 바로 반영하고 시트에는 버퍼를 거쳐 묶어서 추가한다.
+        """
+        self._records.add_pending(row)
+        self._buffer.add(RECORD_SHEET, row)
+    
+    def _find_sheet(self, title: str) -> Optional[gspread.Worksheet]:
+        """시트 찾기 (없으면 만들지 않고 None)"""
+        with self._worksheets_lock:
+            sheet = self._worksheets.get(title)
+            if sheet is None:
+                try:
+                    sheet = self.spreadsheet.worksheet(title)
+                except gspread.WorksheetNotFound:
+                    return None
+                self._worksheets[title] = sheet
+            return sheet
+    
+    def _count_lookup(self, week_name: str) -> Callable[[str], int]:
+        """주차의 사용자별 최대 회차 조회 함수
         
-        # 타입 변환하여 비교 (숫자/문자열 모두 대응)
-        user_records = [
-            r for r in records 
-            if str(r["사용자ID"]) == str(user_id) and r["주차"] == week_name
-        ]
+        인증기록에 남아 있는 주차는 캐시 인덱스를, 보관된 주차는 보관 시트를 사용한다.
+        """
+        self._sheet_call(RECORD_SHEET, self._records.refresh)
+        current_week, _, _ = self.get_current_week_info()
+        cached = week_name == current_week or self._records.has_week(week_name)
+        metrics.cache("weeks", cached)
+        if cached:
+            return functools.partial(self._records.max_count, week_name)
         
-        if not user_records:
-            return 0
+        # 보관 주차는 사용자ID/회차 열만 읽음
+        counts: Dict[str, int] = {}
+        title = archive_sheet_title(week_name)
+        if self._find_sheet(title) is not None:
+            for user_id, count in self._read_columns([title], COUNT_COLUMNS):
+                counts[user_id] = max(counts.get(user_id, 0), count)
+        return lambda user_id: counts.get(str(user_id), 0)
+    
+    def _read_archive(self, week_name: str) -> List[Dict[str, Any]]:
+        """보관 시트의 기록 읽기 (보관 시트가 없으면 빈 목록)"""
+        sheet = self._find_sheet(archive_sheet_title(week_name))
+        if sheet is None:
+            return []
+        rows = sheet.get(f"A2:{_last_column(RECORD_HEADERS)}")
+        return [_to_record(values) for values in rows if any(str(v) for v in values)]
+    
+    def get_week_records(self, week_name: str) -> List[Dict[str, Any]]:
+        """주차의 인증 기록 (보관된 주차는 보관 시트에서 조회)"""
+        self._sheet_call(RECORD_SHEET, self._records.refresh)
+        if self._records.has_week(week_name):
+            return [r for r in self._records.snapshot() if r["주차"] == week_name]
+        return self._read_archive(week_name)
+    
+    def _read_columns(self, titles: List[str], columns: Sequence[str]) -> List[tuple]:
+        """여러 시트에서 필요한 열 구간만 batchGet으로 읽어 행 튜플로 (시트 순서대로)"""
+        runs = _column_runs(columns)
+        per_call = max(1, ARCHIVE_BATCH_SIZE // len(runs))
+        rows: List[tuple] = []
+        for start in range(0, len(titles), per_call):
+            batch = titles[start:start + per_call]
+            response = self.spreadsheet.values_batch_get(
+                [a1 for title in batch for a1 in _column_ranges(title, runs)]
+            )
+            value_ranges = response.get("valueRanges", [])
+            for i in range(len(batch)):
+                rows.extend(_decode_columns(columns, runs, value_ranges[i * len(runs):(i + 1) * len(runs)]))
+        return rows
+    
+    def archive_titles(self) -> List[str]:
+        """보관 시트 이름 (오래된 주차부터, 메타데이터 1회 조회)"""
+        prefix = archive_sheet_title("")
+        return sorted(
+            ws.title for ws in self.spreadsheet.worksheets() if ws.title.startswith(prefix)
+        )
+    
+    def get_record_columns(self, columns: Sequence[str]) -> List[tuple]:
+        """보관 시트와 인증기록 시트의 전체 기록 중 필요한 열만 (오래된 주차부터)
         
-        return max(r["회차"] for r in user_records)
-    
-    def get_weekly_status(self) -> List[Dict[str, Any]]:
-        """현재 주 전체 멤버 현황"""
-        members_sheet = self._get_or_create_sheet("멤버", [
-            "사용자ID", "사용자명", "누적벌금", "가입일"
-        ])
-        records_sheet = self._get_or_create_sheet("인증기록", [
-            "날짜시간", "주차", "사용자ID", "사용자명", 
-            "회차", "이미지URL", "벌금납부", "비고"
-        ])
+        보관 시트 목록은 메타데이터 1회로 찾고, 필요한 열 구간만 batchGet으로 여러 시트씩 읽는다.
+        인증기록 시트는 캐시된 기록에서 열만 골라낸다.
+        """
+        rows = self._read_columns(self.archive_titles(), columns)
         
-        week_name, _, _ = self.get_current_week_info()
-        members = members_sheet.get_all_records()
-        records = records_sheet.get_all_records()
+        self._sheet_call(RECORD_SHEET, self._records.refresh)
+        rows.extend(tuple(record[c] for c in columns) for record in self._records.snapshot())
+        return rows
+    
+    def get_user_weekly_count(self, user_id: str, week_name: Optional[str] = None) -> int:
+        """사용자 주간 인증 횟수 조회 (기본: 현재 주)"""
+        if week_name is None:
+            week_name, _, _ = self.get_current_week_info()
+        return self._count_lookup(week_name)(user_id)
+    
+    def get_weekly_status(self, week_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """주간 전체 멤버 현황 (기본: 현재 주)"""
+        if week_name is None:
+            week_name, _, _ = self.get_current_week_info()
+        # 멤버 디렉터리는 사용자ID로 이미 중복 제거됨
+        members = self.get_members()
+        max_count = self._count_lookup(week_name)
+        counts = {m["사용자ID"]: max_count(m["사용자ID"]) for m in members}
+        return build_weekly_status(members, counts)
+    
+    def append_member_row(self, row: List[Any]) -> bool:
+        """멤버 행 추가 (이미 등록된 사용자ID면 False)"""
+        with self._members.lock:
+            # 중복 확인 (캐시된 멤버 디렉터리 사용)
+            self._sheet_call(MEMBER_SHEET, self._members.load)
+            if self._members.get(row[0]):
+                return False
+            self._members.add_pending(row)
+        self._buffer.add(MEMBER_SHEET, row)
+        return True
+    
+    def get_member(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """멤버 조회 (캐시된 멤버 디렉터리 사용)"""
+        self._sheet_call(MEMBER_SHEET, self._members.load)
+        return self._members.get(user_id)
+    
+    def get_members(self) -> List[Dict[str, Any]]:
+        """전체 멤버 (시트 순서)"""
+        self._sheet_call(MEMBER_SHEET, self._members.load)
+        return self._members.all()
+    
+    def rollover_records(self) -> Dict[str, int]:
+        """지난 주차 기록을 주차별 보관 시트로 옮기기
         
-        # 중복 제거: 사용자ID로 유니크하게
-        seen_user_ids = set()
-        unique_members = []
-        for member in members:
-            uid = str(member["사용자ID"])
-            if uid not in seen_user_ids:
-                seen_user_ids.add(uid)
-                unique_members.append(member)
+        인증기록 앞쪽에서 현재 주가 아닌 행들을 주차별 보관 시트
+        (인증기록_<주차>)에 추가한 뒤 인증기록에서 삭제한다.
+        보관 시트에 같은 (날짜시간, 사용자ID, 회차) 행이 이미 있으면 다시 추가하지 않으므로
+        중간에 실패해도 재실행할 수 있고, 보관 뒤 늦게 들어온 같은 주차 행도 빠짐없이 옮긴다.
+        인증기록에서는 보관 시트에 있는 것이 확인된 행까지만 삭제한다.
+        주차별로 새로 옮긴 행 수를 반환한다.
+        """
+        current_week, _, _ = self.get_current_week_info()
+        self._buffer.flush(RECORD_SHEET)
         
-        status_list = []
-        for member in unique_members:
-            user_id = str(member["사용자ID"])
-            user_name = member["사용자명"]
+        with self._records.lock:
+            rows = self._sheet_call(
+                RECORD_SHEET,
+                lambda sheet: sheet.get(f"A2:{_last_column(RECORD_HEADERS)}")
+            )
             
-            # 타입 변환하여 비교
-            user_records = [
-                r for r in records 
-                if str(r["사용자ID"]) == user_id and r["주차"] == week_name
-            ]
+            # 현재 주 첫 행 전까지가 보관 대상 (빈 행 포함)
+            prefix = 0
+            by_week: Dict[str, List[List[Any]]] = {}
+            for values in rows:
+                record = _to_record(values)
+                if record["주차"] == current_week:
+                    break
+                prefix += 1
+                if record["주차"]:
+                    by_week.setdefault(record["주차"], []).append(list(values))
             
-            count = max((r["회차"] for r in user_records), default=0)
-            remaining = max(0, WEEKLY_REQUIRED_COUNT - count)
+            if prefix == 0:
+                return {}
             
-            status_list.append({
-                "user_id": user_id,
-                "user_name": user_name,
-                "count": count,
-                "remaining": remaining,
-                "completed": count >= WEEKLY_REQUIRED_COUNT
-            })
+            archived = {}
+            confirmed = 0
+            for values in rows[:prefix]:
+                week_name = _to_record(values)["주차"]
+                if week_name and week_name not in archived:
+                    try:
+                        archived[week_name] = self._append_archive(week_name, by_week[week_name])
+                    except Exception as e:
+                        # 이 주차부터는 인증기록에 남겨 두고 다음 보관 때 다시 시도
+                        print(f"⚠️ {week_name} 보관 실패 (인증기록에 남겨 둠): {e}")
+                        break
+                confirmed += 1
+            
+            if confirmed:
+                self._sheet_call(RECORD_SHEET, lambda sheet: sheet.delete_rows(2, confirmed + 1))
+                self._fingerprints[RECORD_SHEET].forget()
+                # 행 위치가 바뀌었으므로 다음 조회 때 현재 주 기록만 다시 읽음
+                self._records.reset()
         
-        return status_list
+        print(f"🗄️ 인증기록 보관 완료: {archived}")
+        return archived
     
-    def register_member(self, user_id: str, user_name: str) -> Dict[str, Any]:
-        """멤버 등록"""
-        sheet = self._get_or_create_sheet("멤버", [
-            "사용자ID", "사용자명", "누적벌금", "가입일"
-        ])
+    def _archive_sheet(self, week_name: str, rows_hint: int) -> tuple[gspread.Worksheet, bool]:
+        """보관 시트 찾기 (없으면 만들고 (시트, True) 반환 — 헤더는 호출하는 쪽에서 추가)"""
+        title = archive_sheet_title(week_name)
+        sheet = self._find_sheet(title)
+        if sheet is not None:
+            return sheet, False
+        sheet = self.spreadsheet.add_worksheet(
+            title=title, rows=rows_hint + 1, cols=len(RECORD_HEADERS)
+        )
+        with self._worksheets_lock:
+            self._worksheets[title] = sheet
+        return sheet, True
+    
+    def _append_archive(self, week_name: str, rows: List[List[Any]]) -> int:
+        """보관 시트에 아직 없는 행만 추가하고 추가한 행 수 반환
         
-        # 중복 확인 (타입 변환하여 비교)
-        records = sheet.get_all_records()
-        if any(str(r["사용자ID"]) == str(user_id) for r in records):
-            return {"success": False, "message": "이미 등록된 멤버입니다."}
+        이미 있는지는 ARCHIVE_KEY_COLUMNS 값으로 가린다. 키가 같은 행이 여러 개면
+        보관 시트에 있는 개수만큼만 건너뛴다. 추가 응답의 행 수가 맞지 않으면 RuntimeError.
+        """
+        sheet, created = self._archive_sheet(week_name, len(rows))
+        header = [RECORD_HEADERS] if created else []
+        if not created:
+            # 이전 실행에서 이미 옮긴 행은 건너뜀
+            existing = Counter(
+                _archive_key(dict(zip(ARCHIVE_KEY_COLUMNS, key)))
+                for key in self._read_columns([sheet.title], ARCHIVE_KEY_COLUMNS)
+            )
+            missing = []
+            for values in rows:
+                key = _archive_key(_to_record(values))
+                if existing[key]:
+                    existing[key] -= 1
+                else:
+                    missing.append(values)
+            rows = missing
         
-        now = datetime.now(self.tz)
-        sheet.append_row([user_id, user_name, 0, now.strftime("%Y-%m-%d")], value_input_option='USER_ENTERED')
+        if header or rows:
+            response = sheet.append_rows(header + rows, value_input_option='USER_ENTERED')
+            updated = (response or {}).get("updates", {}).get("updatedRows")
+            if updated is not None and updated != len(header) + len(rows):
+                raise RuntimeError(
+                    f"보관 시트에 {len(header) + len(rows)}행 중 {updated}행만 추가되었습니다."
+                )
+        return len(rows)
+    
+    def iter_row_chunks(
+        self,
+        title: str,
+        width: int,
+        start_row: int = 2,
+        chunk_rows: int = 500
+    ) -> Iterator[tuple[int, List[List[Any]]]]:
+        """시트를 chunk_rows행씩 나눠 읽기 ((첫 행 번호, 행 목록)을 차례로 반환)
         
-        return {"success": True, "message": f"✅ {user_name}님 멤버 등록 완료!"}
+        행은 width열에 맞춰 빈 값으로 채우고, 빈 행은 빈 목록으로 남겨 행 번호가 어긋나지 않게 한다.
+        봇이 계속 행을 추가하는 시트(인증기록/멤버)는 끝에 닿으면 메타데이터를 한 번 더 읽어
+        그 사이 늘어난 행까지 읽는다. 보관 시트는 만든 뒤로 바뀌지 않으므로 다시 읽지 않는다.
+        """
+        sheet = self._find_sheet(title)
+        if sheet is None:
+            return
+        last_column = rowcol_to_a1(1, width)[:-1]
+        row = start_row
+        while True:
+            if row > sheet.row_count:
+                if title not in SHEET_HEADERS:
+                    return
+                sheet = self.spreadsheet.worksheet(title)
+                if row > sheet.row_count:
+                    return
+            end = min(row + chunk_rows - 1, sheet.row_count)
+            values = sheet.get(f"A{row}:{last_column}{end}")
+            rows = [list(v) + [""] * (width - len(v)) if any(str(c) for c in v) else [] for v in values]
+            rows += [[] for _ in range(end - row + 1 - len(rows))]
+            yield row, rows
+            row = end + 1
     
-    def get_user_penalty(self, user_id: str) -> Dict[str, Any]:
-        """사용자 벌금 현황 조회"""
-        members_sheet = self._get_or_create_sheet("멤버", [
-            "사용자ID", "사용자명", "누적벌금", "가입일"
-        ])
+    def record_keys(self, week_name: str) -> set[tuple[str, int]]:
+        """주차에 이미 있는 (사용자ID, 회차) (보관 시트와 인증기록 시트 모두 확인)"""
+        keys = set()
+        title = archive_sheet_title(week_name)
+        if self._find_sheet(title) is not None:
+            keys.update(self._read_columns([title], COUNT_COLUMNS))
+        self._sheet_call(RECORD_SHEET, self._records.refresh)
+        keys.update(
+            (r["사용자ID"], r["회차"]) for r in self._records.snapshot() if r["주차"] == week_name
+        )
+        return keys
+    
+    def append_record_rows(self, week_name: str, rows: List[List[Any]]) -> None:
+        """인증기록 행을 한 번에 추가 (대량 가져오기용, 중복 확인은 호출하는 쪽에서)
         
-        members = members_sheet.get_all_records()
-        # 타입 변환하여 비교
-        member = next((m for m in members if str(m["사용자ID"]) == str(user_id)), None)
+        현재 주와 아직 보관되지 않은 주차(인증기록 시트에 남아 있는 주차)는 인증기록 시트에 넣어
+        다음 보관 때 함께 옮겨지게 하고, 이미 보관된 주차는 보관 시트(없으면 생성)에 넣는다.
+        """
+        current_week, _, _ = self.get_current_week_info()
+        self._sheet_call(RECORD_SHEET, self._records.refresh)
+        if week_name == current_week or self._records.has_week(week_name):
+            with self._buffer.hold(), self._records.lock:
+                self._bulk_append(RECORD_SHEET, rows)
+                self._records.reset()
+            return
+        sheet, created = self._archive_sheet(week_name, len(rows))
+        header = [RECORD_HEADERS] if created else []
+        sheet.append_rows(header + rows, value_input_option='USER_ENTERED')
+    
+    def append_member_rows(self, rows: List[List[Any]]) -> None:
+        """멤버 행을 한 번에 추가 (대량 가져오기용, 중복 확인은 호출하는 쪽에서)"""
+        with self._buffer.hold(), self._members.lock:
+            self._bulk_append(MEMBER_SHEET, rows)
+            self._members.invalidate()
+    
+    def _bulk_append(self, title: str, rows: List[List[Any]]) -> None:
+        """버퍼를 거치지 않는 행 추가 (외부 수정 감지에 봇이 추가한 행으로 기록, 버퍼 전송을 막은 채 호출)"""
+        try:
+            self._sheet_call(title, lambda sheet: sheet.append_rows(rows, value_input_option='USER_ENTERED'))
+        except Exception as e:
+            if not is_unapplied_error(e):
+                self._fingerprints[title].record_append(len(rows), confirmed=False)
+            raise
+        self._fingerprints[title].record_append(len(rows))
+    
+    def append_ledger_rows(self, rows: List[List[Any]]) -> None:
+        """벌금장부 행 추가 (버퍼를 거쳐 묶어서 추가)"""
+        for row in rows:
+            self._buffer.add(LEDGER_SHEET, row)
+    
+    def get_ledger(self) -> List[Dict[str, Any]]:
+        """벌금장부 전체 (색인을 만들 때 한 번만 읽음)"""
+        self._buffer.flush(LEDGER_SHEET)
+        rows = self._sheet_call(
+            LEDGER_SHEET,
+            lambda sheet: sheet.get(f"A2:{_last_column(LEDGER_HEADERS)}")
+        )
+        entries = []
+        for values in rows:
+            if not any(str(v) for v in values):
+                continue
+            values = list(values) + [""] * (len(LEDGER_HEADERS) - len(values))
+            entry = dict(zip(LEDGER_HEADERS, values))
+            entry["사용자ID"] = str(entry["사용자ID"])
+            entry["금액"] = _to_int(entry["금액"])
+            entry["잔액"] = _to_int(entry["잔액"])
+            entries.append(entry)
+        return entries
+    
+    def set_member_penalties(self, totals: Dict[str, int]) -> List[Dict[str, Any]]:
+        """멤버별 누적벌금 일괄 변경
         
-        if not member:
-            return {"success": False, "message": "등록되지 않은 멤버입니다."}
+        모든 셀 변경을 모아 batch_update 한 번으로 보내므로
+        중간에 실패해도 일부 멤버만 반영되는 일이 없다.
+        변경된 행 목록(user_id, row, total_penalty)을 반환한다.
+        """
+        # 셀 수정에 행 번호가 필요하므로 대기 중인 멤버부터 추가
+        self._buffer.flush(MEMBER_SHEET)
+        self._sheet_call(MEMBER_SHEET, self._members.load)
         
-        week_count = self.get_user_weekly_count(user_id)
-        remaining = max(0, WEEKLY_REQUIRED_COUNT - week_count)
+        penalty_col = MEMBER_HEADERS.index("누적벌금") + 1
+        changes = []
+        for user_id, total in totals.items():
+            member = self._members.get(user_id)
+            if member and member["row"] is not None:
+                changes.append({"user_id": member["사용자ID"], "row": member["row"], "total_penalty": total})
+        if not changes:
+            return []
         
-        return {
-            "success": True,
-            "user_name": member["사용자명"],
-            "total_penalty": member["누적벌금"],
-            "weekly_count": week_count,
-            "remaining": remaining,
-            "potential_penalty": remaining * PENALTY_PER_MISS
-        }
+        data = [
+            {
+                "range": rowcol_to_a1(change["row"], penalty_col),
+                "values": [[change["total_penalty"]]]
+            }
+            for change in changes
+        ]
+        self._sheet_call(
+            MEMBER_SHEET,
+            lambda sheet: sheet.batch_update(data, value_input_option='USER_ENTERED')
+        )
+        for change in changes:
+            self._members.set_penalty(change["user_id"], change["total_penalty"])
+        
+        return changes
+
+
+class WeeklySnapshot:
+    """주간 현황 스냅샷
+    
+    get_weekly_status 결과와 완료/진행중 분리, 렌더링된 임베드를 함께 보관한다.
+    인증/멤버 등록/벌금 적용이 일어나면 버려지고 다음 조회 때 다시 만든다.
+    """
+    
+    def __init__(
+        self,
+        week_info: tuple[str, datetime, datetime],
+        status_list: List[Dict[str, Any]],
+        generation: int
+    ):
+        self.week_name, self.week_start, self.week_end = week_info
+        self.status_list = status_list
+        self.completed = [s for s in status_list if s["completed"]]
+        self.incomplete = [s for s in status_list if not s["completed"]]
+        self.generation = generation
+        self.embed = None  # 봇에서 만든 임베드 (최초 전송 시 채움)
+
+
+class IdempotencyIndex:
+    """중복 인증 방지 색인
+    
+    - 인터랙션 ID -> 처리 결과: Discord가 같은 인터랙션을 다시 보내면 저장하지 않고 같은 결과를 돌려준다.
+      인터랙션 토큰 유효 시간(15분)이 지난 항목과 오래된 항목부터 버린다.
+    - (사용자ID, 주차, 회차) 집합: 주차마다 처음 한 번 저장소 기록으로 채우고 이후 인증 성공 시 추가한다.
+    """
+    
+    def __init__(self, ttl: float = INTERACTION_TTL, max_entries: int = INTERACTION_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._results: "OrderedDict[int, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._week_name: Optional[str] = None
+        self._keys: set[tuple[str, int]] = set()
+    
+    def result(self, interaction_id: int) -> Optional[Dict[str, Any]]:
+        """이미 처리한 인터랙션의 결과 (없거나 만료되면 None)"""
+        entry = self._results.get(interaction_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self._results[interaction_id]
+            return None
+        return entry[1]
+    
+    def remember(self, interaction_id: int, result: Dict[str, Any]) -> None:
+        self._results[interaction_id] = (time.monotonic(), result)
+        self._results.move_to_end(interaction_id)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+    
+    def has_week(self, week_name: str) -> bool:
+        return self._week_name == week_name
+    
+    def load_week(self, week_name: str, records: List[Dict[str, Any]]) -> None:
+        """주차의 (사용자, 회차) 집합 채우기 (지난 주차 항목은 버림)"""
+        self._week_name = week_name
+        self._keys = {(str(r["사용자ID"]), int(r["회차"])) for r in records}
+    
+    def contains(self, user_id: str, count: int) -> bool:
+        return (str(user_id), count) in self._keys
+    
+    def add(self, week_name: str, user_id: str, count: int) -> None:
+        if self._week_name == week_name:
+            self._keys.add((str(user_id), count))
+    
+    def clear(self) -> None:
+        """(사용자, 회차) 집합 폐기 (다음 인증 때 저장소에서 다시 채움)"""
+        self._week_name = None
+        self._keys = set()
+
+
+class AsyncSheetsManager:
+    """저장소 백엔드 비동기 래퍼
+    
+    gspread/SQLite 호출은 모두 블로킹이므로 전용 스레드풀에서 실행해
+    Discord 이벤트 루프가 응답을 기다리며 멈추지 않게 한다.
+    백엔드는 STORAGE_BACKEND 설정에 따라 create_storage_backend()로 만든다.
+    (factory를 넘기면 그 함수로 만든다)
+    """
+    
+    def __init__(
+        self,
+        max_workers: int = SHEETS_MAX_WORKERS,
+        factory: Optional[Callable[[], StorageBackend]] = None,
+        executor: Optional[ThreadPoolExecutor] = None
+    ):
+        # 여러 방이 스레드풀을 같이 쓰면 executor를 넘겨받고 종료는 소유자가 맡음
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=max(1, max_workers),
+            thread_name_prefix="sheets"
+        )
+        self._factory = factory or create_storage_backend
+        self._manager: Optional[StorageBackend] = None
+        self._connect_lock = asyncio.Lock()
+        self.tz = pytz.timezone(TIMEZONE)
+        self._snapshot: Optional[WeeklySnapshot] = None
+        self._snapshot_lock = asyncio.Lock()
+        self._generation = 0  # 쓰기가 일어날 때마다 증가
+        self._history: Optional[HistoryStore] = None
+        self._history_lock = asyncio.Lock()
+        self._idempotency = IdempotencyIndex()
+        self._idempotency_lock = asyncio.Lock()
+        # 같은 사용자의 쓰기는 순서대로, 다른 사용자끼리는 동시에 처리
+        # (락을 잡거나 기다리는 코루틴이 없어지면 항목도 사라짐)
+        self._user_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+    
+    async def _run(self, func, *args, **kwargs):
+        """블로킹 함수를 스레드풀에서 실행 (스레드풀 대기 시간 기록)"""
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        
+        def run():
+            metrics.observe("storage.queue_wait", time.perf_counter() - submitted)
+            return func(*args, **kwargs)
+        
+        return await loop.run_in_executor(self._executor, run)
+    
+    async def _get_manager(self) -> StorageBackend:
+        """백엔드 생성 (최초 1회, 연결도 스레드풀에서 수행)"""
+        if self._manager is None:
+            async with self._connect_lock:
+                if self._manager is None:
+                    self._manager = await self._run(self._factory)
+        return self._manager
+    
+    async def _call(self, method: str, *args, **kwargs):
+        """백엔드 메서드 호출 (호출 수/지연시간 기록)"""
+        manager = await self._get_manager()
+        metrics.incr(f"storage.{method}.calls")
+        started = time.perf_counter()
+        try:
+            return await self._run(getattr(manager, method), *args, **kwargs)
+        except Exception:
+            metrics.incr(f"storage.{method}.errors")
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.observe(f"storage.{method}", elapsed)
+            add_storage_time(elapsed)
+    
+    def get_current_week_info(self) -> tuple[str, datetime, datetime]:
+        """현재 주차 정보 반환 (I/O 없음)"""
+        if self._manager is not None:
+            return self._manager.get_current_week_info()
+        return get_week_info(datetime.now(self.tz))
     
-    def calculate_weekly_penalties(self) -> List[Dict[str, Any]]:
-        """주간 벌금 계산 (일요일 00:00에 실행)"""
-        status_list = self.get_weekly_status()
+    async def warm_up(self) -> None:
+        """저장소 연결과 멤버/현재 주 데이터 미리 읽기
         
-        penalties = []
-        for status in status_list:
-            if not status["completed"]:
-                penalty = status["remaining"] * PENALTY_PER_MISS
-                penalties.append({
-                    "user_id": status["user_id"],
-                    "user_name": status["user_name"],
-                    "missed_count": status["remaining"],
-                    "penalty": penalty
-                })
+        봇이 게이트웨이에 접속하는 동안 백그라운드로 실행해
+        첫 커맨드가 인증/시트 열기/전체 읽기를 기다리지 않게 한다.
+        실패하면 첫 커맨드에서 다시 연결을 시도한다.
+        """
+        started = time.perf_counter()
+        try:
+            await self.get_weekly_snapshot()
+        except Exception as e:
+            print(f"⚠️ 저장소 미리 준비 실패 (첫 요청에서 다시 시도): {e}")
+            return
+        elapsed = time.perf_counter() - started
+        metrics.observe("storage.warm_up", elapsed)
+        print(f"🔥 저장소 미리 준비 완료 ({elapsed:.1f}초)")
+    
+    @property
+    def generation(self) -> int:
+        """쓰기 세대 (인증/등록/벌금 적용이 일어날 때마다 증가)"""
+        return self._generation
+    
+    def invalidate_snapshot(self) -> None:
+        """주간 현황 스냅샷 폐기 (진행 중인 계산 결과도 버려짐)"""
+        self._generation += 1
+        self._snapshot = None
+    
+    async def revalidate(self) -> bool:
+        """저장소 외부 수정 확인 (수정됐으면 현황 스냅샷, 통계, 중복 인증 색인도 폐기)"""
+        if self._manager is None:
+            return False  # 아직 연결 전이면 첫 요청 때 어차피 새로 읽음
+        if not await self._call("check_external_changes"):
+            return False
+        self._drop_caches()
+        return True
+    
+    async def reload(self) -> None:
+        """저장소 캐시까지 모두 버리고 다음 조회 때 다시 읽기 (manage.py 가져오기 뒤 /시트새로고침)"""
+        if self._manager is not None:
+            await self._call("invalidate_caches")
+        self._drop_caches()
+    
+    def _drop_caches(self) -> None:
+        self.invalidate_snapshot()
+        self._history = None
+        self._idempotency.clear()
+        print("🔄 주간 현황 스냅샷, 통계, 중복 인증 색인 폐기")
+    
+    async def get_weekly_snapshot(self) -> WeeklySnapshot:
+        """현재 주 현황 스냅샷 (변경이 없으면 저장소를 거치지 않고 반환)"""
+        week_info = self.get_current_week_info()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.week_name == week_info[0]:
+            metrics.cache("weekly_snapshot", True)
+            return snapshot
         
-        return penalties
+        async with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.week_name == week_info[0]:
+                metrics.cache("weekly_snapshot", True)
+                return snapshot
+            metrics.cache("weekly_snapshot", False)
+            generation = self._generation
+            status_list = await self._call("get_weekly_status", week_info[0])
+            snapshot = WeeklySnapshot(week_info, status_list, generation)
+            # 계산하는 동안 쓰기가 있었으면 이번 결과만 쓰고 보관하지 않음
+            if generation == self._generation:
+                self._snapshot = snapshot
+            return snapshot
     
-    def apply_penalties(self, penalties: List[Dict[str, Any]]) -> None:
-        """벌금 적용 (누적벌금에 추가)"""
-        members_sheet = self._get_or_create_sheet("멤버", [
-            "사용자ID", "사용자명", "누적벌금", "가입일"
-        ])
+    async def get_history(self) -> HistoryStore:
+        """전체 인증 기록 통계 저장소 (최초 1회 전체를 읽고 이후 인증은 바로 추가)"""
+        history = self._history
+        if history is not None:
+            metrics.cache("history", True)
+            return history
         
-        members = members_sheet.get_all_records()
+        async with self._history_lock:
+            if self._history is not None:
+                metrics.cache("history", True)
+                return self._history
+            metrics.cache("history", False)
+            generation = self._generation
+            rows = await self._call("get_record_columns", HISTORY_COLUMNS)
+            history = await self._run(HistoryStore, rows)
+            # 읽는 동안 쓰기가 있었으면 빠진 기록이 있을 수 있으므로 보관하지 않음
+            if generation == self._generation:
+                self._history = history
+            return history
+    
+    async def get_user_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """사용자 통계 (연속 달성, 월별 인증 수, 미달 주차, 벌금장부 합계)"""
+        history = await self.get_history()
+        current_week = week_number(self.get_current_week_info()[0])
+        stats = await self._run(history.user_stats, str(user_id), current_week)
+        if stats is None:
+            return None
+        # 벌금은 기록으로 다시 계산하지 않고 실제 부과/납부된 장부 합계를 씀
+        totals = await self._call("penalty_totals", str(user_id))
+        stats.update(penalty_total=totals["charged"], paid_total=totals["paid"], balance=totals["balance"])
+        return stats
+    
+    async def get_leaderboard(self, weeks: int = 4, limit: int = 10) -> List[Dict[str, Any]]:
+        """최근 weeks주 인증 순위"""
+        history = await self.get_history()
+        current_week = week_number(self.get_current_week_info()[0])
+        return await self._run(history.leaderboard, current_week, weeks, limit)
+    
+    def _user_lock(self, user_id: str) -> asyncio.Lock:
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = self._user_locks[user_id] = asyncio.Lock()
+        return lock
+    
+    async def _ensure_week_keys(self, week_name: str) -> None:
+        """중복 확인용 (사용자, 회차) 집합을 이번 주 기록으로 채우기 (주마다 1회)"""
+        if self._idempotency.has_week(week_name):
+            return
+        async with self._idempotency_lock:
+            if not self._idempotency.has_week(week_name):
+                records = await self._call("get_week_records", week_name)
+                self._idempotency.load_week(week_name, records)
+    
+    def completed_interaction(self, interaction_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        """이미 처리한 인터랙션이면 그때의 결과 (I/O 없음)"""
+        if interaction_id is None:
+            return None
+        return self._idempotency.result(interaction_id)
+    
+    async def add_verification(
+        self, 
+        user_id: str, 
+        user_name: str, 
+        count: int, 
+        image_url: Optional[str] = None,
+        penalty_paid: int = 0,
+        note: str = "",
+        exercise: str = "",
+        minutes: Optional[float] = None,
+        speed: Optional[float] = None,
+        kcal: Optional[float] = None,
+        interaction_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """운동 인증 기록 추가
         
-        for penalty in penalties:
-            user_id = str(penalty["user_id"])
-            for i, member in enumerate(members):
-                if str(member["사용자ID"]) == user_id:
-                    new_total = member["누적벌금"] + penalty["penalty"]
-                    # 행 번호는 1-indexed이고 헤더가 있으므로 +2
-                    members_sheet.update_cell(i + 2, 3, new_total)
-                    break
+        같은 인터랙션이 다시 오면 저장 없이 처음 결과를 돌려주고,
+        이번 주에 이미 인증한 회차면 저장소 쓰기 전에 거절한다.
+        """
+        user_id = str(user_id)
+        async with self._user_lock(user_id):
+            # 같은 인터랙션이 락을 기다리는 동안 처리됐을 수 있으므로 락 안에서 확인
+            previous = self.completed_interaction(interaction_id)
+            if previous is not None:
+                metrics.incr("idempotency.interaction")
+                return {**previous, "duplicate": True}
+            
+            week_name, _, _ = self.get_current_week_info()
+            await self._ensure_week_keys(week_name)
+            if self._idempotency.contains(user_id, count):
+                metrics.incr("idempotency.count")
+                result = {
+                    "success": False,
+                    "duplicate": True,
+                    "message": f"⚠️ 이번 주 {count}회차는 이미 인증되었습니다."
+                }
+            else:
+                try:
+                    result = await self._call(
+                        "add_verification", user_id, user_name, count,
+                        image_url=image_url, penalty_paid=penalty_paid, note=note,
+                        exercise=exercise, minutes=minutes, speed=speed, kcal=kcal
+                    )
+                except Exception:
+                    # 기록은 추가된 뒤 벌금 납부 기록에서 실패했을 수 있음
+                    self.invalidate_snapshot()
+                    raise
+                if result["success"]:
+                    # 저장됐을 때만 스냅샷 폐기 (규칙에 걸려 거절된 인증은 쓴 것이 없음)
+                    self.invalidate_snapshot()
+                    self._idempotency.add(result["week"], user_id, count)
+                    if self._history is not None:
+                        self._history.append(result["record"])
+            
+            if interaction_id is not None:
+                self._idempotency.remember(interaction_id, result)
+            return result
+    
+    async def audit_weeks(self, week_names: List[str]) -> Dict[str, Any]:
+        """여러 주차 기록을 현재 규칙으로 다시 검사"""
+        return await self._call("audit_weeks", week_names)
+    
+    async def get_user_weekly_count(self, user_id: str, week_name: Optional[str] = None) -> int:
+        """사용자 주간 인증 횟수 조회 (기본: 현재 주)"""
+        return await self._call("get_user_weekly_count", user_id, week_name)
+    
+    async def get_weekly_status(self, week_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """주간 전체 멤버 현황 (기본: 현재 주)"""
+        return await self._call("get_weekly_status", week_name)
+    
+    async def get_week_records(self, week_name: str) -> List[Dict[str, Any]]:
+        """주차의 인증 기록 (보관 시트 포함)"""
+        return await self._call("get_week_records", week_name)
+    
+    async def get_photo_refs(self) -> List[tuple]:
+        """전체 인증 기록의 (주차, 사용자ID, 이미지URL) (사진 재사용 색인 준비용)"""
+        return await self._call("get_record_columns", PHOTO_COLUMNS)
+    
+    async def register_member(self, user_id: str, user_name: str) -> Dict[str, Any]:
+        """멤버 등록"""
+        async with self._user_lock(str(user_id)):
+            result = await self._call("register_member", user_id, user_name)
+        if result["success"]:
+            self.invalidate_snapshot()
+        return result
+    
+    async def get_user_penalty(self, user_id: str) -> Dict[str, Any]:
+        """사용자 벌금 현황 조회"""
+        return await self._call("get_user_penalty", user_id)
+    
+    async def calculate_weekly_penalties(self, week_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """주간 벌금 계산"""
+        return await self._call("calculate_weekly_penalties", week_name)
+    
+    async def apply_penalties(self, penalties: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """벌금 적용 (변경된 행 목록 반환)"""
+        try:
+            return await self._call("apply_penalties", penalties)
+        finally:
+            self.invalidate_snapshot()
+    
+    async def last_settled_week(self) -> Optional[str]:
+        """마지막으로 결산을 마친 주차 (없으면 None)"""
+        return await self._call("last_settled_week")
+    
+    async def mark_settled(self, week_name: str) -> None:
+        """주차 결산 완료 기록"""
+        await self._call("mark_settled", week_name)
+    
+    async def rollover_records(self) -> Dict[str, int]:
+        """지난 주차 기록을 보관 시트로 옮기기"""
+        try:
+            return await self._call("rollover_records")
+        finally:
+            self.invalidate_snapshot()
+    
+    async def flush(self) -> None:
+        """버퍼에 남은 행 즉시 전송"""
+        if self._manager is not None:
+            await self._run(self._manager.flush)
+    
+    def shutdown(self) -> None:
+        """스레드풀 종료 후 버퍼에 남은 행 전송"""
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+        if self._manager is not None:
+            self._manager.close()
+
+
+def create_storage_backend(guild_id: Optional[int] = None) -> StorageBackend:
+    """방 설정에 맞는 저장소 백엔드 생성
+    
+    sqlite: 로컬 DB가 명령을 처리하고 스프레드시트는 백그라운드로 복제
+    sheets: 스프레드시트를 직접 사용
+    """
+    guild = GUILDS[DEFAULT_GUILD_ID if guild_id is None else guild_id]
+    mirror_factory = functools.partial(SheetsManager, guild["sheets_id"])
+    if STORAGE_BACKEND == "sqlite":
+        return SQLiteBackend(guild["sqlite_path"], mirror_factory=mirror_factory)
+    return mirror_factory()
+
+
+def _guild_key(guild_id: Optional[int]) -> int:
+    """설정된 방인지 확인 (None이면 기본 방)"""
+    if guild_id is None:
+        return DEFAULT_GUILD_ID
+    if guild_id not in GUILDS:
+        raise ValueError(f"설정되지 않은 서버입니다: {guild_id}")
+    return guild_id
+
+
+# 방별 인스턴스
+_sheets_managers: Dict[int, SheetsManager] = {}
+
+def get_sheets_manager(guild_id: Optional[int] = None) -> SheetsManager:
+    """방별 SheetsManager 반환"""
+    guild_id = _guild_key(guild_id)
+    if guild_id not in _sheets_managers:
+        _sheets_managers[guild_id] = SheetsManager(GUILDS[guild_id]["sheets_id"])
+    return _sheets_managers[guild_id]
+
+
+_async_sheets_managers: Dict[int, AsyncSheetsManager] = {}
+_shared_executor: Optional[ThreadPoolExecutor] = None
+
+def get_async_sheets_manager(guild_id: Optional[int] = None) -> AsyncSheetsManager:
+    """방별 AsyncSheetsManager 반환 (연결은 첫 호출 시 스레드풀에서 수행)
+    
+    캐시는 방마다 따로 두고, 스레드풀과 gspread 클라이언트는 모든 방이 공유한다.
+    Sheets 할당량이 서비스 계정 단위라 방이 늘어도 동시 요청 수는 그대로 둔다.
+    """
+    global _shared_executor
+    guild_id = _guild_key(guild_id)
+    manager = _async_sheets_managers.get(guild_id)
+    if manager is None:
+        if _shared_executor is None:
+            _shared_executor = ThreadPoolExecutor(
+                max_workers=max(1, SHEETS_MAX_WORKERS),
+                thread_name_prefix="sheets"
+            )
+        manager = AsyncSheetsManager(
+            factory=functools.partial(create_storage_backend, guild_id),
+            executor=_shared_executor
+        )
+        _async_sheets_managers[guild_id] = manager
+    return manager
+
 
+def get_all_async_sheets_managers() -> Dict[int, AsyncSheetsManager]:
+    """설정된 모든 방의 AsyncSheetsManager"""
+    return {guild_id: get_async_sheets_manager(guild_id) for guild_id in GUILDS}
 
-# 싱글톤 인스턴스
-_sheets_manager = None
 
-def get_sheets_manager() -> SheetsManager:
-    """SheetsManager 싱글톤 반환"""
-    global _sheets_manager
-    if _sheets_manager is None:
-        _sheets_manager = SheetsManager()
-    return _sheets_manager
+def shutdown_sheets_manager() -> None:
+    """봇 종료 시 Sheets 작업 정리"""
+    if _shared_executor is not None:
+        _shared_executor.shutdown(wait=True)
+    for manager in _async_sheets_managers.values():
+        manager.shutdown()
@@ -0,0 +1,846 @@
+"""
+저장소 백엔드 모듈
+인증/멤버/벌금 저장 인터페이스와 로컬 SQLite 구현
+"""
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Callable, Sequence
+import pytz
+
+from config import (
+    TIMEZONE,
+    WEEKLY_REQUIRED_COUNT,
+    PENALTY_PER_MISS,
+    REPLICATION_INTERVAL,
+    WEEK_START_DAY
+)
+from history import week_number
+from rules import rules
+
+
+# 인증기록 행의 열 이름 (시트 헤더와 같은 순서)
+RECORD_COLUMNS = [
+    "날짜시간", "주차", "사용자ID", "사용자명",
+    "회차", "이미지URL", "벌금납부", "비고",
+    "운동종류", "운동시간", "속도", "칼로리"
+]
+
+
+# 벌금장부 행의 열 이름 (금액은 부과 +, 납부 -, 잔액은 해당 행까지의 사용자 잔액)
+LEDGER_COLUMNS = ["날짜시간", "주차", "사용자ID", "사용자명", "종류", "금액", "잔액", "비고"]
+LEDGER_CHARGE = "벌금"
+LEDGER_OPENING = "이월"
+# 주차 결산을 마쳤다는 표시 (사용자ID 없이 금액 0으로 방마다 주차당 한 줄)
+LEDGER_SETTLED = "결산"
+
+
+def payment_kind(count: int) -> str:
+    """회차 인증에 딸린 벌금 납부의 장부 종류 (회차마다 한 번)"""
+    return f"납부({count}회차)"
+
+
+def get_week_info(now: datetime) -> tuple[str, datetime, datetime]:
+    """주어진 시각이 속한 주차 정보 반환 (주차명, 시작일, 종료일)"""
+    # WEEK_START_DAY(기본 일요일) 00:00에 주 시작
+    days_since_start = (now.weekday() - WEEK_START_DAY) % 7
+    week_start = now - timedelta(days=days_since_start)
+    week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_end = week_start + timedelta(days=6, hours=23, minutes=59, seconds=59)
+    
+    week_name = week_start.strftime("%Y-W%W")
+    return week_name, week_start, week_end
+
+
+class PenaltyLedger:
+    """벌금장부 색인
+    
+    장부는 행을 추가하기만 하고, 색인은 (사용자ID, 주차, 종류) 키 집합과
+    사용자별 잔액/부과 합계/납부 합계를 행이 추가될 때마다 갱신한다.
+    잔액 조회에 장부 전체를 다시 더하지 않는다.
+    """
+    
+    def __init__(self, entries: List[Dict[str, Any]] = ()):
+        self.keys: set[tuple[str, str, str]] = set()
+        self.balances: Dict[str, int] = {}
+        self.charged: Dict[str, int] = {}
+        self.paid: Dict[str, int] = {}
+        for entry in entries:
+            self.add(entry)
+    
+    @staticmethod
+    def key(entry: Dict[str, Any]) -> tuple[str, str, str]:
+        return (str(entry["사용자ID"]), str(entry["주차"]), str(entry["종류"]))
+    
+    def __contains__(self, entry: Dict[str, Any]) -> bool:
+        return self.key(entry) in self.keys
+    
+    def add(self, entry: Dict[str, Any]) -> int:
+        """항목 반영 후 사용자 잔액 반환"""
+        user_id = str(entry["사용자ID"])
+        amount = int(entry["금액"])
+        self.keys.add(self.key(entry))
+        self.balances[user_id] = self.balances.get(user_id, 0) + amount
+        if amount >= 0:
+            self.charged[user_id] = self.charged.get(user_id, 0) + amount
+        else:
+            self.paid[user_id] = self.paid.get(user_id, 0) - amount
+        return self.balances[user_id]
+    
+    def balance(self, user_id: str) -> int:
+        return self.balances.get(str(user_id), 0)
+
+
+class StorageBackend(ABC):
+    """저장소 백엔드 인터페이스
+    
+    인증 시간 검증, 벌금 계산처럼 저장 방식과 무관한 규칙은 여기서 처리하고
+    실제 읽기/쓰기만 각 백엔드가 구현한다.
+    행(row)은 인증기록/멤버 시트의 열 순서를 따른다.
+    """
+    
+    def __init__(self):
+        self.tz = pytz.timezone(TIMEZONE)
+        self._ledger: Optional[PenaltyLedger] = None
+        self._ledger_lock = threading.RLock()
+    
+    def now(self) -> datetime:
+        """현재 시각 (설정된 시간대 기준)"""
+        return datetime.now(self.tz)
+    
+    def get_current_week_info(self) -> tuple[str, datetime, datetime]:
+        """현재 주차 정보 반환 (주차명, 시작일, 종료일)"""
+        return get_week_info(self.now())
+    
+    # --- 백엔드별 구현 ---
+    
+    @abstractmethod
+    def append_verification_row(self, row: List[Any]) -> None:
+        """인증기록 행 추가"""
+    
+    @abstractmethod
+    def append_member_row(self, row: List[Any]) -> bool:
+        """멤버 행 추가 (이미 있는 사용자ID면 추가하지 않고 False)"""
+    
+    @abstractmethod
+    def set_member_penalties(self, totals: Dict[str, int]) -> List[Dict[str, Any]]:
+        """멤버별 누적벌금 일괄 변경 (변경된 멤버 목록 반환)"""
+    
+    @abstractmethod
+    def append_ledger_rows(self, rows: List[List[Any]]) -> None:
+        """벌금장부 행 추가"""
+    
+    @abstractmethod
+    def get_ledger(self) -> List[Dict[str, Any]]:
+        """벌금장부 전체 (추가된 순서)"""
+    
+    @abstractmethod
+    def get_member(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """멤버 조회 (사용자ID, 사용자명, 누적벌금, 가입일)"""
+    
+    @abstractmethod
+    def get_members(self) -> List[Dict[str, Any]]:
+        """전체 멤버 (등록 순서)"""
+    
+    @abstractmethod
+    def get_week_records(self, week_name: str) -> List[Dict[str, Any]]:
+        """주차의 인증 기록"""
+    
+    @abstractmethod
+    def get_record_columns(self, columns: Sequence[str]) -> List[tuple]:
+        """보관된 주차를 포함한 전체 인증 기록의 지정한 열만 행 튜플로 (오래된 순)"""
+    
+    @abstractmethod
+    def get_user_weekly_count(self, user_id: str, week_name: Optional[str] = None) -> int:
+        """사용자 주간 인증 횟수 조회 (기본: 현재 주)"""
+    
+    @abstractmethod
+    def get_weekly_status(self, week_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """주간 전체 멤버 현황 (기본: 현재 주)"""
+    
+    # --- 공통 동작 ---
+    
+    def add_verification(
+        self,
+        user_id: str,
+        user_name: str,
+        count: int,
+        image_url: Optional[str] = None,
+        penalty_paid: int = 0,
+        note: str = "",
+        exercise: str = "",
+        minutes: Optional[float] = None,
+        speed: Optional[float] = None,
+        kcal: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """운동 인증 기록 추가 (운동 규칙/인증 시간대 검사 후 저장)"""
+        now = self.now()
+        week_name, _, _ = self.get_current_week_info()
+        
+        row = [
+            now.strftime("%Y-%m-%d %H:%M:%S"),
+            week_name,
+            user_id,  # 문자열로 저장
+            user_name,
+            count,
+            image_url or "",
+            penalty_paid,
+            note,
+            exercise or "",
+            "" if minutes is None else minutes,
+            "" if speed is None else speed,
+            "" if kcal is None else kcal
+        ]
+        record = dict(zip(RECORD_COLUMNS, row))
+        
+        # 주간 횟수 제한이 있는 운동만 이번 주 기록을 함께 확인
+        week_records = self.get_week_records(week_name) if rules.weekly_limit(exercise) else []
+        violations = rules.check(record, week_records)
+        if violations:
+            return {
+                "success": False,
+                "message": "❌ 인증 기준을 충족하지 않습니다.\n" + "\n".join(f"- {v}" for v in violations)
+            }
+        
+        self.append_verification_row(row)
+        if penalty_paid > 0:
+            self.record_ledger([{
+                "주차": week_name,
+                "사용자ID": user_id,
+                "사용자명": user_name,
+                "종류": payment_kind(count),
+                "금액": -penalty_paid,
+                "비고": note
+            }])
+        
+        return {
+            "success": True,
+            "message": f"✅ {user_name}님 {count}회차 운동 인증 완료!",
+            "week": week_name,
+            "count": count,
+            "record": record
+        }
+    
+    def audit_weeks(self, week_names: List[str]) -> Dict[str, Any]:
+        """여러 주차 기록을 현재 규칙으로 다시 검사
+        
+        주차별 기록을 모아 한 번에 검사하고 검사한 기록 수와 규칙을 어긴 기록 목록을 반환한다.
+        """
+        records: List[Dict[str, Any]] = []
+        for week_name in week_names:
+            records.extend(self.get_week_records(week_name))
+        return {"checked": len(records), "flagged": rules.audit(records)}
+    
+    def register_member(self, user_id: str, user_name: str) -> Dict[str, Any]:
+        """멤버 등록"""
+        now = self.now()
+        if not self.append_member_row([user_id, user_name, 0, now.strftime("%Y-%m-%d")]):
+            return {"success": False, "message": "이미 등록된 멤버입니다."}
+        return {"success": True, "message": f"✅ {user_name}님 멤버 등록 완료!"}
+    
+    def ledger(self) -> PenaltyLedger:
+        """벌금장부 색인 (최초 1회 장부를 읽어 만듦)
+        
+        장부가 비어 있으면 멤버 시트의 누적벌금을 이월 항목으로 옮겨 시작한다.
+        """
+        with self._ledger_lock:
+            if self._ledger is None:
+                ledger = PenaltyLedger(self.get_ledger())
+                self._ledger = ledger
+                if not ledger.keys:
+                    week_name, _, _ = self.get_current_week_info()
+                    self.record_ledger([
+                        {
+                            "주차": week_name,
+                            "사용자ID": member["사용자ID"],
+                            "사용자명": member["사용자명"],
+                            "종류": LEDGER_OPENING,
+                            "금액": member["누적벌금"],
+                            "비고": "장부 도입 전 누적벌금"
+                        }
+                        for member in self.get_members() if member["누적벌금"]
+                    ], sync_members=False)
+            return self._ledger
+    
+    def record_ledger(self, entries: List[Dict[str, Any]], sync_members: bool = True) -> List[Dict[str, Any]]:
+        """벌금장부에 항목 추가 (같은 사용자/주차/종류 항목이 이미 있으면 건너뜀)
+        
+        추가된 항목(잔액 포함)을 반환한다. sync_members면 멤버 시트의 누적벌금 열에
+        장부 잔액을 그대로 옮겨 적는다 (읽고 더해서 쓰지 않음).
+        """
+        with self._ledger_lock:
+            ledger = self.ledger()
+            timestamp = self.now().strftime("%Y-%m-%d %H:%M:%S")
+            added = []
+            for entry in entries:
+                if entry in ledger:
+                    continue
+                entry = {**entry, "날짜시간": timestamp, "비고": entry.get("비고", "")}
+                entry["잔액"] = ledger.add(entry)
+                added.append(entry)
+            if not added:
+                return []
+            try:
+                self.append_ledger_rows([[entry[c] for c in LEDGER_COLUMNS] for entry in added])
+            except Exception:
+                # 저장되지 않은 항목이 색인에 남지 않도록 다음 조회 때 장부를 다시 읽음
+                self._ledger = None
+                raise
+            if sync_members:
+                self.set_member_penalties({
+                    str(entry["사용자ID"]): ledger.balance(entry["사용자ID"]) for entry in added
+                })
+            return added
+    
+    def penalty_totals(self, user_id: str) -> Dict[str, int]:
+        """사용자의 벌금장부 합계 (부과, 납부, 잔액)"""
+        ledger = self.ledger()
+        return {
+            "charged": ledger.charged.get(str(user_id), 0),
+            "paid": ledger.paid.get(str(user_id), 0),
+            "balance": ledger.balance(user_id)
+        }
+    
+    def get_user_penalty(self, user_id: str) -> Dict[str, Any]:
+        """사용자 벌금 현황 조회 (잔액은 장부 색인에서)"""
+        member = self.get_member(user_id)
+        
+        if not member:
+            return {"success": False, "message": "등록되지 않은 멤버입니다."}
+        
+        week_count = self.get_user_weekly_count(user_id)
+        remaining = max(0, WEEKLY_REQUIRED_COUNT - week_count)
+        totals = self.penalty_totals(user_id)
+        
+        return {
+            "success": True,
+            "user_name": member["사용자명"],
+            "total_penalty": totals["balance"],
+            "charged": totals["charged"],
+            "paid": totals["paid"],
+            "weekly_count": week_count,
+            "remaining": remaining,
+            "potential_penalty": remaining * PENALTY_PER_MISS
+        }
+    
+    def calculate_weekly_penalties(self, week_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """주간 벌금 계산 (일요일 00:00에 실행)"""
+        if week_name is None:
+            week_name, _, _ = self.get_current_week_info()
+        status_list = self.get_weekly_status(week_name)
+        
+        penalties = []
+        for status in status_list:
+            if not status["completed"]:
+                penalty = status["remaining"] * PENALTY_PER_MISS
+                penalties.append({
+                    "user_id": status["user_id"],
+                    "user_name": status["user_name"],
+                    "week": week_name,
+                    "missed_count": status["remaining"],
+                    "penalty": penalty
+                })
+        
+        return penalties
+    
+    def apply_penalties(self, penalties: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """벌금 부과를 장부에 추가
+        
+        (사용자, 주차)마다 한 번만 부과되므로 결산이 두 번 실행돼도 다시 부과하지 않는다.
+        새로 부과된 벌금 목록(penalty와 함께 balance 포함)을 반환한다.
+        """
+        week_name, _, _ = self.get_current_week_info()
+        by_key = {}
+        for penalty in penalties:
+            if not self.get_member(penalty["user_id"]):
+                continue
+            entry = {
+                "주차": penalty.get("week") or week_name,
+                "사용자ID": str(penalty["user_id"]),
+                "사용자명": penalty["user_name"],
+                "종류": LEDGER_CHARGE,
+                "금액": penalty["penalty"],
+                "비고": f"{penalty['missed_count']}회 미달성"
+            }
+            by_key[PenaltyLedger.key(entry)] = (penalty, entry)
+        
+        added = self.record_ledger([entry for _, entry in by_key.values()])
+        applied = []
+        for entry in added:
+            penalty, _ = by_key[PenaltyLedger.key(entry)]
+            applied.append({**penalty, "balance": entry["잔액"]})
+        return applied
+    
+    def last_settled_week(self) -> Optional[str]:
+        """마지막으로 결산을 마친 주차 (벌금장부의 결산 항목, 없으면 None)"""
+        weeks = [
+            week for _, week, kind in self.ledger().keys
+            if kind == LEDGER_SETTLED and week_number(week) is not None
+        ]
+        return max(weeks, key=week_number) if weeks else None
+    
+    def mark_settled(self, week_name: str) -> None:
+        """주차 결산 완료를 벌금장부에 기록 (이미 기록된 주차면 건너뜀)"""
+        self.record_ledger([{
+            "주차": week_name,
+            "사용자ID": "",
+            "사용자명": "",
+            "종류": LEDGER_SETTLED,
+            "금액": 0,
+            "비고": "주간 결산 완료"
+        }], sync_members=False)
+        self.flush()
+    
+    def rollover_records(self) -> Dict[str, int]:
+        """지난 주차 기록 보관 (보관이 필요 없는 백엔드는 아무것도 하지 않음)"""
+        return {}
+    
+    def flush(self) -> None:
+        """대기 중인 쓰기 전송"""
+    
+    def check_external_changes(self) -> bool:
+        """저장소가 봇 밖에서 수정됐는지 확인 (봇만 쓰는 저장소는 항상 False)"""
+        return False
+    
+    def invalidate_caches(self) -> None:
+        """외부 수정 뒤 캐시 폐기 (벌금 장부는 다음 조회 때 다시 읽음)"""
+        with self._ledger_lock:
+            self._ledger = None
+    
+    def close(self) -> None:
+        """종료 전 정리"""
+        self.flush()
+
+
+def build_weekly_status(members: List[Dict[str, Any]], counts: Dict[str, int]) -> List[Dict[str, Any]]:
+    """멤버 목록과 사용자별 최대 회차로 주간 현황 구성"""
+    status_list = []
+    for member in members:
+        count = counts.get(member["사용자ID"], 0)
+        remaining = max(0, WEEKLY_REQUIRED_COUNT - count)
+        status_list.append({
+            "user_id": member["사용자ID"],
+            "user_name": member["사용자명"],
+            "count": count,
+            "remaining": remaining,
+            "completed": count >= WEEKLY_REQUIRED_COUNT
+        })
+    return status_list
+
+
+class SQLiteBackend(StorageBackend):
+    """로컬 SQLite 저장소
+    
+    명령 처리 경로의 읽기/쓰기는 모두 로컬 DB에서 끝나고,
+    변경분은 outbox 테이블에 쌓였다가 SheetsReplicator가 스프레드시트로 복제한다.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS verifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            week TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            user_name TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            image_url TEXT NOT NULL DEFAULT '',
+            penalty_paid INTEGER NOT NULL DEFAULT 0,
+            note TEXT NOT NULL DEFAULT '',
+            exercise TEXT NOT NULL DEFAULT '',
+            minutes REAL,
+            speed REAL,
+            kcal REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_verifications_week_user
+            ON verifications (week, user_id);
+        CREATE TABLE IF NOT EXISTS members (
+            user_id TEXT PRIMARY KEY,
+            user_name TEXT NOT NULL,
+            total_penalty INTEGER NOT NULL DEFAULT 0,
+            joined TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS ledger (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            week TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            user_name TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            balance INTEGER NOT NULL,
+            note TEXT NOT NULL DEFAULT '',
+            UNIQUE (user_id, week, kind)
+        );
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL
+        );
+    """
+    
+    # 나중에 추가된 인증기록 열 (예전 DB는 시작할 때 열을 추가)
+    ADDED_COLUMNS = {
+        "exercise": "TEXT NOT NULL DEFAULT ''",
+        "minutes": "REAL",
+        "speed": "REAL",
+        "kcal": "REAL"
+    }
+    
+    # 인증기록 열 이름 -> verifications 테이블 열
+    RECORD_FIELDS = {
+        "날짜시간": "timestamp",
+        "주차": "week",
+        "사용자ID": "user_id",
+        "사용자명": "user_name",
+        "회차": "count",
+        "이미지URL": "image_url",
+        "벌금납부": "penalty_paid",
+        "비고": "note",
+        "운동종류": "exercise",
+        "운동시간": "minutes",
+        "속도": "speed",
+        "칼로리": "kcal"
+    }
+    
+    VERIFICATION_INSERT = """INSERT INTO verifications
+        (timestamp, week, user_id, user_name, count, image_url, penalty_paid, note,
+         exercise, minutes, speed, kcal)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+    
+    LEDGER_INSERT = """INSERT OR IGNORE INTO ledger
+        (timestamp, week, user_id, user_name, kind, amount, balance, note)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+    
+    # PRAGMA user_version: 1부터 보관 시트까지 가져온 DB (그 전에는 현재 주만 가져왔음)
+    IMPORT_VERSION = 1
+    
+    def __init__(self, path: str, mirror_factory: Optional[Callable[[], StorageBackend]] = None):
+        super().__init__()
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(self.SCHEMA)
+            self._migrate()
+        
+        self._replicator = None
+        if mirror_factory is not None:
+            self._replicator = SheetsReplicator(self, mirror_factory)
+            if self.is_empty() or self._import_version() < self.IMPORT_VERSION:
+                # 새 DB면 스프레드시트 내용을 가져와 시작하고,
+                # 현재 주만 가져왔던 예전 DB는 빠진 보관 주차를 채움
+                self.import_from(self._replicator.get_mirror())
+            self._replicator.start()
+    
+    def _migrate(self) -> None:
+        """예전 스키마의 verifications 테이블에 빠진 열 추가"""
+        existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(verifications)")}
+        for column, definition in self.ADDED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE verifications ADD COLUMN {column} {definition}")
+    
+    @staticmethod
+    def _verification_values(row: List[Any]) -> List[Any]:
+        """인증기록 행을 INSERT 값으로 변환 (예전 8열 행은 빈 값으로 채움)"""
+        values = list(row) + [""] * (len(RECORD_COLUMNS) - len(row))
+        values[2] = str(values[2])
+        # 숫자 열의 빈 값은 NULL로 저장
+        return [None if i > 8 and v == "" else v for i, v in enumerate(values)]
+    
+    def is_empty(self) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM members) + (SELECT COUNT(*) FROM verifications)"
+            ).fetchone()
+            return row[0] == 0
+    
+    def _import_version(self) -> int:
+        with self._lock:
+            return self._conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def import_from(self, source: StorageBackend) -> None:
+        """다른 백엔드의 멤버/벌금장부와 보관 주차를 포함한 전체 기록 가져오기 (복제 대상에 넣지 않음)
+        
+        /통계, /인증검사가 지난 주차도 보도록 전체 기록을 가져온다.
+        이미 DB에 있는 주차의 기록은 건너뛰므로 예전 DB에 다시 실행해도 중복되지 않는다.
+        """
+        members = source.get_members()
+        with self._lock:
+            local_weeks = {row[0] for row in self._conn.execute("SELECT DISTINCT week FROM verifications")}
+        week_index = RECORD_COLUMNS.index("주차")
+        records = [
+            row for row in source.get_record_columns(RECORD_COLUMNS)
+            if row[week_index] not in local_weeks
+        ]
+        ledger = source.get_ledger()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO members (user_id, user_name, total_penalty, joined) VALUES (?, ?, ?, ?)",
+                [(m["사용자ID"], m["사용자명"], m["누적벌금"], m["가입일"]) for m in members]
+            )
+            self._conn.executemany(
+                self.VERIFICATION_INSERT,
+                [self._verification_values(list(row)) for row in records]
+            )
+            self._conn.executemany(
+                self.LEDGER_INSERT,
+                [[entry[c] for c in LEDGER_COLUMNS] for entry in ledger]
+            )
+            self._conn.execute(f"PRAGMA user_version = {self.IMPORT_VERSION}")
+        print(f"📥 SQLite 초기화: 멤버 {len(members)}명, 기록 {len(records)}건, 벌금장부 {len(ledger)}건")
+    
+    def _enqueue(self, kind: str, payload: Any) -> None:
+        """복제할 변경분 기록 (호출 측 트랜잭션 안에서 실행)"""
+        if self._replicator is not None:
+            self._conn.execute(
+                "INSERT INTO outbox (kind, payload) VALUES (?, ?)",
+                (kind, json.dumps(payload, ensure_ascii=False))
+            )
+    
+    def append_verification_row(self, row: List[Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(self.VERIFICATION_INSERT, self._verification_values(row))
+            self._enqueue("verification", row)
+    
+    def append_member_row(self, row: List[Any]) -> bool:
+        user_id, user_name, total_penalty, joined = row
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO members (user_id, user_name, total_penalty, joined) VALUES (?, ?, ?, ?)",
+                (str(user_id), user_name, total_penalty, joined)
+            )
+            if cursor.rowcount == 0:
+                return False
+            self._enqueue("member", row)
+            return True
+    
+    def append_ledger_rows(self, rows: List[List[Any]]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                self.LEDGER_INSERT,
+                [[str(v) if i == 2 else v for i, v in enumerate(row)] for row in rows]
+            )
+            self._enqueue("ledger", rows)
+    
+    def get_ledger(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM ledger ORDER BY id").fetchall()
+        return [
+            {
+                "날짜시간": row["timestamp"],
+                "주차": row["week"],
+                "사용자ID": row["user_id"],
+                "사용자명": row["user_name"],
+                "종류": row["kind"],
+                "금액": row["amount"],
+                "잔액": row["balance"],
+                "비고": row["note"]
+            }
+            for row in rows
+        ]
+    
+    def set_member_penalties(self, totals: Dict[str, int]) -> List[Dict[str, Any]]:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE members SET total_penalty = ? WHERE user_id = ?",
+                [(total, user_id) for user_id, total in totals.items()]
+            )
+            self._enqueue("penalty", totals)
+        return [{"user_id": user_id, "total_penalty": total} for user_id, total in totals.items()]
+    
+    @staticmethod
+    def _member(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "사용자ID": row["user_id"],
+            "사용자명": row["user_name"],
+            "누적벌금": row["total_penalty"],
+            "가입일": row["joined"]
+        }
+    
+    def get_member(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM members WHERE user_id = ?", (str(user_id),)
+            ).fetchone()
+        return self._member(row) if row else None
+    
+    def get_members(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM members ORDER BY rowid").fetchall()
+        return [self._member(row) for row in rows]
+    
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "날짜시간": row["timestamp"],
+            "주차": row["week"],
+            "사용자ID": row["user_id"],
+            "사용자명": row["user_name"],
+            "회차": row["count"],
+            "이미지URL": row["image_url"],
+            "벌금납부": row["penalty_paid"],
+            "비고": row["note"],
+            "운동종류": row["exercise"],
+            "운동시간": "" if row["minutes"] is None else row["minutes"],
+            "속도": "" if row["speed"] is None else row["speed"],
+            "칼로리": "" if row["kcal"] is None else row["kcal"]
+        }
+    
+    def get_week_records(self, week_name: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM verifications WHERE week = ? ORDER BY id", (week_name,)
+            ).fetchall()
+        return [self._record(row) for row in rows]
+    
+    def get_record_columns(self, columns: Sequence[str]) -> List[tuple]:
+        selected = ", ".join(self.RECORD_FIELDS[column] for column in columns)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {selected} FROM verifications ORDER BY id").fetchall()
+        return [tuple(row) for row in rows]
+    
+    def get_user_weekly_count(self, user_id: str, week_name: Optional[str] = None) -> int:
+        if week_name is None:
+            week_name, _, _ = self.get_current_week_info()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(count) FROM verifications WHERE week = ? AND user_id = ?",
+                (week_name, str(user_id))
+            ).fetchone()
+        return row[0] or 0
+    
+    def get_weekly_status(self, week_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        if week_name is None:
+            week_name, _, _ = self.get_current_week_info()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, MAX(count) FROM verifications WHERE week = ? GROUP BY user_id",
+                (week_name,)
+            ).fetchall()
+        return build_weekly_status(self.get_members(), {row[0]: row[1] for row in rows})
+    
+    def rollover_records(self) -> Dict[str, int]:
+        """로컬 DB는 인덱스로 주차별 조회가 가능하므로 스프레드시트 보관만 요청"""
+        with self._lock, self._conn:
+            self._enqueue("rollover", {})
+        return {}
+    
+    def pending_changes(self, limit: int = 500) -> List[sqlite3.Row]:
+        """복제 대기 중인 변경분 (오래된 순)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, kind, payload FROM outbox ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+    
+    def ack_changes(self, last_id: int) -> None:
+        """복제 완료된 변경분 삭제"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM outbox WHERE id <= ?", (last_id,))
+    
+    def flush(self) -> None:
+        if self._replicator is not None:
+            self._replicator.drain()
+    
+    def close(self) -> None:
+        if self._replicator is not None:
+            self._replicator.stop()
+        with self._lock:
+            self._conn.close()
+
+
+class SheetsReplicator:
+    """SQLite 변경분을 스프레드시트로 복제하는 백그라운드 스레드
+    
+    outbox를 오래된 순으로 읽어 같은 종류끼리 묶어 보내고,
+    스프레드시트 쓰기가 끝난 뒤에만 outbox에서 지운다.
+    실패하면 다음 주기에 다시 시도하므로 스프레드시트가 잠시 늦어질 뿐 명령 처리는 계속된다.
+    """
+    
+    def __init__(
+        self,
+        source: SQLiteBackend,
+        mirror_factory: Callable[[], StorageBackend],
+        interval: float = REPLICATION_INTERVAL
+    ):
+        self._source = source
+        self._mirror_factory = mirror_factory
+        self._mirror: Optional[StorageBackend] = None
+        self.interval = interval
+        self._stop = threading.Event()
+        self._drain_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name="sheets-replicator", daemon=True)
+    
+    def get_mirror(self) -> StorageBackend:
+        """복제 대상 백엔드 (최초 사용 시 연결)"""
+        if self._mirror is None:
+            self._mirror = self._mirror_factory()
+        return self._mirror
+    
+    def start(self) -> None:
+        self._thread.start()
+    
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.drain()
+            except Exception as e:
+                print(f"❌ 스프레드시트 복제 실패 (다음 주기에 재시도): {e}")
+    
+    def _apply(self, mirror: StorageBackend, kind: str, payloads: List[Any]) -> None:
+        if kind == "verification":
+            for row in payloads:
+                mirror.append_verification_row(row)
+        elif kind == "member":
+            for row in payloads:
+                mirror.append_member_row(row)
+        elif kind == "ledger":
+            mirror.append_ledger_rows([row for rows in payloads for row in rows])
+        elif kind == "penalty":
+            totals: Dict[str, int] = {}
+            for payload in payloads:
+                totals.update(payload)
+            mirror.set_member_penalties(totals)
+        elif kind == "rollover":
+            mirror.flush()
+            mirror.rollover_records()
+        mirror.flush()
+    
+    def drain(self) -> int:
+        """대기 중인 변경분을 모두 복제하고 복제한 건수 반환"""
+        with self._drain_lock:
+            if self._mirror is None and not self._source.pending_changes(limit=1):
+                return 0
+            mirror = self.get_mirror()
+            replicated = 0
+            while True:
+                changes = self._source.pending_changes()
+                if not changes:
+                    return replicated
+                # 같은 종류가 이어지는 구간 단위로 보내고 확인
+                start = 0
+                while start < len(changes):
+                    kind = changes[start]["kind"]
+                    end = start
+                    while end < len(changes) and changes[end]["kind"] == kind:
+                        end += 1
+                    group = changes[start:end]
+                    self._apply(mirror, kind, [json.loads(c["payload"]) for c in group])
+                    self._source.ack_changes(group[-1]["id"])
+                    replicated += len(group)
+                    start = end
+    
+    def stop(self) -> None:
+        """스레드 정지 후 남은 변경분 복제 시도"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=self.interval + 1)
+        try:
+            self.drain()
+        except Exception as e:
+            print(f"❌ 종료 전 스프레드시트 복제 실패: {e}")
+        if self._mirror is not None:
+            self._mirror.close()